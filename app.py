@@ -6,11 +6,11 @@ import faiss
 from langchain_community.vectorstores import FAISS
 from langchain_community.docstore.in_memory import InMemoryDocstore
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
 import openai
 import colorlog
 from src.api import app  # Import the configured Flask app with routes from api.py
 from src.core import load_documents_into_vectordb, load_vectordb, save_vectordb
+from src.embedding_cache import get_embeddings_model
 
 # Load environment variables and set OpenAI API key
 load_dotenv()
@@ -34,9 +34,10 @@ if __name__ == '__main__':
         vector_store = load_vectordb(index_path)
 
         if vector_store is None:
-            index = faiss.IndexFlatL2(len(OpenAIEmbeddings().embed_query("hello world")))
+            embeddings_model = get_embeddings_model()
+            index = faiss.IndexFlatL2(len(embeddings_model.embed_query("hello world")))
             vector_store = FAISS(
-                embedding_function=OpenAIEmbeddings(),
+                embedding_function=embeddings_model,
                 index=index,
                 docstore=InMemoryDocstore(),
                 index_to_docstore_id={}
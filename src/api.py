@@ -1,32 +1,65 @@
 import logging
 import colorlog
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory
+import gzip
+import hashlib
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 import uuid
 import openai
-from .prompt_manager import generate_requirements, generate_summary_assessment
+from .prompt_manager import (
+    REQUIREMENTS_ARTIFACT,
+    REQUIREMENTS_PROMPT_VERSION,
+    generate_requirements,
+    stream_requirements,
+)
 from .progress_tracking import progress_tracker
 from .core import (
+    REQUIREMENT_CLUSTERING,
     allowed_file,
+    cluster_requirements,
+    evaluate_requirements_pipeline,
     generate_evaluations,
     get_project_folder,
     load_projects,
     parse_requirements,
     save_projects,
-    strip_metadata,
 )
-from .req_res_processor import EvaluationResult, evaluate_technical_proposal
+from .req_res_processor import EvaluationResult, TechnicalEvaluator, evaluate_technical_proposal
+from .schema_compiler import REQ_RES_SCHEMA_PATH, SchemaValidationError, get_evaluation_plan
+from .summary_processor import (
+    build_summary_inputs,
+    generate_summaries,
+    plan_summary_regeneration,
+    stream_summaries,
+)
+from .blob_store import add_reference, read_derived, store_blob, write_derived
+from .document_model import has_page_extractor, load_document
+from .prefetch import (
+    UPLOAD_PREFETCH,
+    get_prefetch_status,
+    schedule_prefetch,
+    upload_progress_key,
+    wait_for_prefetch,
+)
+from .project_index import project_indexes
+from .proposal_segmenter import route_section_context
+from .table_extractor import load_tables
+from .upload_handler import MAX_UPLOAD_BYTES, StreamingUploadRequest, UploadError, upload_sessions, verify_type
 from .utils import (
-    flatten_evaluation_object,
+    file_sha256,
     get_mime_type,
-    read_pdf,
 )
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 
+try:
+    import brotli
+except ImportError:  # Optional; responses are gzip-compressed without it
+    brotli = None
+
 handler = colorlog.StreamHandler()
 handler.setFormatter(colorlog.ColoredFormatter(
     '%(log_color)s%(levelname)s:%(name)s:%(message)s'
@@ -38,8 +71,18 @@ logger.setLevel(logging.INFO)
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 app = Flask(__name__, static_folder=os.path.join("..", "frontend", "dist", "browser"))
+# Uploaded files are hashed and size-checked as they are parsed; bodies past the
+# limit (plus room for the multipart framing) are refused before being read
+app.request_class = StreamingUploadRequest
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 1024 * 1024
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+# JSON responses at least this large are compressed when the client accepts it
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+# gzip level (1-9) and brotli quality (0-11); mid levels keep compression fast
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_angular(path):
@@ -53,16 +96,46 @@ def set_cross_origin_headers(response):
     response.headers["Cross-Origin-Embedder-Policy"] = "require-corp"
     return response
 
+@app.after_request
+def compress_json_response(response):
+    """
+    Compresses large JSON bodies with brotli or gzip, whichever the client accepts.
+
+    Responses with a strong ETag are left as they are, since a strong
+    validator must identify one exact byte representation.
+    """
+    etag, weak = response.get_etag()
+    if (
+        response.status_code != 200
+        or (etag and not weak)
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype != "application/json"
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < RESPONSE_COMPRESSION_MIN_BYTES:
+        return response
+    if brotli is not None and request.accept_encodings["br"]:
+        response.set_data(brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY))
+        response.headers["Content-Encoding"] = "br"
+    elif request.accept_encodings["gzip"]:
+        response.set_data(gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
 # Load the pre-defined question sets with error handling
 try:
-    with open("evaluations/tech_eval_req_res.json") as f:
-        question_set_1 = json.load(f)
+    # Compiled once here and recompiled on demand when the file changes
+    get_evaluation_plan(REQ_RES_SCHEMA_PATH)
     logger.info("Loaded tech_eval_req_res.json successfully.")
 
     with open("evaluations/tech_eval_work_products.json") as f:
         question_set_2 = json.load(f)
     logger.info("Loaded tech_eval_work_products.json successfully.")
-except (FileNotFoundError, json.JSONDecodeError) as e:
+except (FileNotFoundError, json.JSONDecodeError, SchemaValidationError) as e:
     logger.error(f"Error loading JSON files: {e}")
     raise SystemExit("Failed to load question sets. Exiting.")
 
@@ -70,6 +143,38 @@ except (FileNotFoundError, json.JSONDecodeError) as e:
 results_directory = "results"
 os.makedirs(results_directory, exist_ok=True)
 
+def json_etag(*parts):
+    """Build a strong ETag from JSON-serializable values"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _stored_requirements(metadata, request_path, force=False):
+    """
+    Looks up requirements already derived from the project's request file.
+
+    The project's own are used when they were derived from the same file with
+    the current prompt; otherwise ones another project derived from the same
+    file are adopted into metadata (not saved). An empty list is a failed
+    extraction and never counts.
+
+    Returns:
+        Tuple of (source of requirements derived now, the stored requirements or None)
+    """
+    requirements_source = {
+        "requestHash": file_sha256(request_path),
+        "promptVersion": REQUIREMENTS_PROMPT_VERSION,
+    }
+    if force:
+        return requirements_source, None
+    if metadata.get("derived_requirements") and metadata.get("derived_requirements_source") == requirements_source:
+        return requirements_source, metadata["derived_requirements"]
+    shared = read_derived(requirements_source["requestHash"], REQUIREMENTS_ARTIFACT)
+    if shared:
+        metadata["derived_requirements"] = shared
+        metadata["derived_requirements_source"] = requirements_source
+        return requirements_source, shared
+    return requirements_source, None
+
 def check_project_documents(project_id):
     """Check if both request and response documents exist for a project"""
     metadata_file = os.path.join(get_project_folder(project_id), "metadata.json")
@@ -90,12 +195,29 @@ def get_evaluation_progress(project_id):
     except Exception as e:
         logger.error(f"Error getting progress: {str(e)}")
         return jsonify({"error": str(e)}), 500
+
+@app.route("/api/projects/<project_id>/upload-progress", methods=["GET"])
+def get_upload_progress(project_id):
+    """Get the current progress of processing (OCR) an uploaded document"""
+    try:
+        return jsonify(progress_tracker.get_progress(upload_progress_key(project_id)))
+    except Exception as e:
+        logger.error(f"Error getting upload progress: {str(e)}")
+        return jsonify({"error": str(e)}), 500
     
 # Derive requirements from a project's request document
 @app.route("/api/projects/<project_id>/derive-requirements", methods=["GET"])
 def check_documents(project_id):
-    """Check if project has both documents and derive requirements if they do"""
+    """
+    Check if project has both documents and derive requirements if they do.
+
+    Requirements are stored with the request document's content hash and the
+    prompt version, and returned without an LLM call while both still match.
+    Pass ?force=true to regenerate. Responses carry an ETag for conditional GETs.
+    """
     try:
+        # Requirements being derived by an upload prefetch are picked up from metadata
+        wait_for_prefetch(project_id)
         has_both_documents = check_project_documents(project_id)
 
         if has_both_documents:
@@ -115,32 +237,57 @@ def check_documents(project_id):
                     404,
                 )
 
-            # Read the PDF
-            try:
-                sole_source_request = read_pdf(request_path)
-            except Exception as pdf_error:
-                logger.error(f"Error reading PDF: {str(pdf_error)}")
-                return jsonify({"error": f"Error reading PDF: {str(pdf_error)}"}), 500
-
-            # Generate and parse requirements
-            derived_requirements_str = generate_requirements(
-                sole_source_request
-            )
-            logger.info(f"Derived requirements: {derived_requirements_str}")
-            requirements = parse_requirements(derived_requirements_str)
-
-            # Store derived requirements in project metadata
-            metadata["derived_requirements"] = requirements
-            with open(metadata_file, "w") as f:
-                json.dump(metadata, f)
-
-            return jsonify(
+            force = request.args.get("force", "").lower() in ("1", "true", "yes")
+            previous_source = metadata.get("derived_requirements_source")
+            requirements_source, requirements = _stored_requirements(metadata, request_path, force)
+            cached = requirements is not None
+
+            if cached:
+                if previous_source != requirements_source:
+                    # Adopted from another project with the same request file
+                    with open(metadata_file, "w") as f:
+                        json.dump(metadata, f)
+                logger.info(f"Using stored derived requirements for project {project_id}")
+            else:
+                # Read the PDF
+                try:
+                    sole_source_request = load_document(request_path).text()
+                except Exception as pdf_error:
+                    logger.error(f"Error reading PDF: {str(pdf_error)}")
+                    return jsonify({"error": f"Error reading PDF: {str(pdf_error)}"}), 500
+
+                # Generate and parse requirements
+                derived_requirements_str = generate_requirements(
+                    sole_source_request
+                )
+                logger.info(f"Derived requirements: {derived_requirements_str}")
+                requirements = parse_requirements(derived_requirements_str)
+
+                # Store derived requirements in project metadata; an empty parse is
+                # not recorded as derived from this request, so the next call retries
+                metadata["derived_requirements"] = requirements
+                if requirements:
+                    write_derived(requirements_source["requestHash"], REQUIREMENTS_ARTIFACT, requirements)
+                    metadata["derived_requirements_source"] = requirements_source
+                else:
+                    logger.warning(f"No requirements parsed for project {project_id}, not caching them")
+                    metadata.pop("derived_requirements_source", None)
+                with open(metadata_file, "w") as f:
+                    json.dump(metadata, f)
+
+            response = jsonify(
                 {
                     "has_both_documents": True,
                     "requirements_derived": True,
                     "requirements": requirements,
+                    "cached": cached,
                 }
             )
+            # Weak, as compression changes the bytes but not the data
+            response.set_etag(json_etag(requirements_source, requirements), weak=True)
+            # Let clients and proxies keep the body but always revalidate it
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response.make_conditional(request)
 
         return jsonify(
             {
@@ -164,7 +311,14 @@ def check_documents(project_id):
 # Generate answers to derived requirements
 @app.route("/api/projects/<project_id>/evaluate-derived-requirements", methods=["POST"])
 def evaluate_derived_requirements(project_id):
-    """Endpoint to evaluate derived requirements"""
+    """
+    Endpoint to evaluate derived requirements.
+
+    With ?dedupe=true (or REQUIREMENT_CLUSTERING set), requirements that restate
+    each other are clustered and only one per cluster is evaluated; the cluster
+    mapping is stored as derived_requirements_clusters. By default every
+    requirement is evaluated.
+    """
     try:
 
         # Get file paths from metadata
@@ -175,12 +329,25 @@ def evaluate_derived_requirements(project_id):
         requirements = metadata.get("derived_requirements", [])
         logger.info(f"Derived requirements: {requirements}")
 
+        clusters = None
+        dedupe = request.args.get("dedupe", str(REQUIREMENT_CLUSTERING))
+        if dedupe.lower() in ("1", "true", "yes"):
+            try:
+                clusters = cluster_requirements(requirements)
+            except Exception as e:
+                # Fall back to evaluating every requirement
+                logger.error(f"Error clustering derived requirements: {str(e)}")
+
         metadata["derived_requirements_evaluation"] = []
+        if clusters is not None:
+            metadata["derived_requirements_clusters"] = clusters
+        else:
+            metadata.pop("derived_requirements_clusters", None)
         with open(metadata_file, "w") as f:
             json.dump(metadata, f)
 
         return generate_evaluations(
-            project_id, "derived_requirements_evaluation", requirements
+            project_id, "derived_requirements_evaluation", requirements, clusters=clusters
         )
 
     except Exception as e:
@@ -191,6 +358,98 @@ def evaluate_derived_requirements(project_id):
         )
 
 
+# Derive requirements and evaluate them in one pipelined pass
+@app.route("/api/projects/<project_id>/derive-and-evaluate-requirements", methods=["POST"])
+def derive_and_evaluate_requirements(project_id):
+    """
+    Derive requirements and evaluate each one as soon as it is extracted.
+
+    The requirements completion is streamed and every requirement is handed to
+    the evaluation pool the moment its JSON object closes, so extraction and
+    evaluation overlap. Stored requirements are reused while the request
+    document and prompt version match, unless ?force=true is passed.
+    Progress is reported through the progress endpoint.
+    """
+    try:
+        wait_for_prefetch(project_id)
+        if not check_project_documents(project_id):
+            return jsonify({"error": "Both request and response documents are required"}), 400
+
+        metadata_file = os.path.join(get_project_folder(project_id), "metadata.json")
+        with open(metadata_file, "r") as f:
+            metadata = json.load(f)
+
+        request_path = os.path.abspath(metadata.get("requestPath"))
+        response_path = os.path.abspath(metadata.get("responsePath"))
+        for path in (request_path, response_path):
+            if not os.path.exists(path):
+                logger.error(f"File not found at: {path}")
+                return jsonify({"error": f"File not found at: {path}"}), 404
+
+        force = request.args.get("force", "").lower() in ("1", "true", "yes")
+        requirements_source, stored_requirements = _stored_requirements(metadata, request_path, force)
+        cached = stored_requirements is not None
+
+        try:
+            sole_source_response = load_document(response_path).text()
+            if cached:
+                requirements = stored_requirements
+                logger.info(f"Using stored derived requirements for project {project_id}")
+            else:
+                requirements = stream_requirements(load_document(request_path).text())
+        except Exception as pdf_error:
+            logger.error(f"Error reading PDF: {str(pdf_error)}")
+            return jsonify({"error": f"Error reading PDF: {str(pdf_error)}"}), 500
+
+        metadata["derived_requirements_evaluation"] = []
+        # Pipelined evaluation scores every requirement, so no cluster mapping applies
+        metadata.pop("derived_requirements_clusters", None)
+        if not cached:
+            # Requirements are only stored once extraction has fully finished
+            metadata.pop("derived_requirements", None)
+            metadata.pop("derived_requirements_source", None)
+        with open(metadata_file, "w") as f:
+            json.dump(metadata, f)
+
+        try:
+            requirements, evaluation_results = evaluate_requirements_pipeline(
+                project_id, requirements, sole_source_response, metadata, metadata_file
+            )
+        except Exception:
+            if not cached:
+                # The pipeline kept the requirements extracted before the failure; their
+                # source is marked partial so they are derived again rather than served
+                metadata["derived_requirements_source"] = {**requirements_source, "partial": True}
+                with open(metadata_file, "w") as f:
+                    json.dump(metadata, f)
+            raise
+
+        metadata["derived_requirements"] = requirements
+        if requirements:
+            metadata["derived_requirements_source"] = requirements_source
+        with open(metadata_file, "w") as f:
+            json.dump(metadata, f)
+        if not cached and requirements:
+            write_derived(requirements_source["requestHash"], REQUIREMENTS_ARTIFACT, requirements)
+        progress_tracker.complete_progress(project_id)
+
+        return jsonify(
+            {
+                "success": True,
+                "requirements": requirements,
+                "evaluation_results": evaluation_results,
+                "cached": cached,
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Error deriving and evaluating requirements: {str(e)}")
+        progress_tracker.set_error(project_id, str(e))
+        return (
+            jsonify({"error": str(e), "message": "Error deriving and evaluating requirements"}),
+            500,
+        )
+
 # Generate answers to technical evaluation Work Products form
 @app.route("/api/projects/<project_id>/evaluate-work-products", methods=["POST"])
 def evaluate_work_products(project_id):
@@ -240,13 +499,21 @@ def format_section_name(section_name):
 # Generate answers to technical evaluation Request and Response form
 @app.route("/api/projects/<project_id>/evaluate-req-res", methods=["POST"])
 def evaluate_requirements_response(project_id):
-    """Endpoint to evaluate requirements response"""
+    """
+    Endpoint to evaluate requirements response.
+
+    A project without answers yet inherits those of any project that evaluated
+    the same response file against the same form schema; pass ?force=true to
+    evaluate anyway.
+    """
     try:
         # Get file paths from metadata
         metadata_file = os.path.join(get_project_folder(project_id), "metadata.json")
         with open(metadata_file, "r") as f:
             metadata = json.load(f)
 
+        force = request.args.get("force", "").lower() in ("1", "true", "yes")
+        inherit = not force and not metadata.get("req_res_evaluation")
         metadata["req_res_evaluation"] = []
 
         response_path = os.path.abspath(metadata.get("responsePath"))
@@ -255,31 +522,42 @@ def evaluate_requirements_response(project_id):
             return jsonify({"error": f"Response file not found at: {response_path}"}), 404
 
         try:
-            sole_source_response = read_pdf(response_path)
+            response_document = load_document(response_path)
+            response_pages = response_document.pages()
+            sole_source_response = "".join(response_pages)
         except Exception as pdf_error:
             logger.error(f"Error reading PDF: {str(pdf_error)}")
             return jsonify({"error": f"Error reading PDF: {str(pdf_error)}"}), 500
-        
-        with open('evaluations/tech_eval_req_res.json', 'r') as f:
-            schema = json.load(f)
 
-        # Calculate total questions for progress tracking (including subsections)
-        total_questions = 0
-        for section in schema.get("evaluationQuestions", {}).values():
-            # Count main section questions
-            total_questions += len(section.get("questions", []))
-            
-            # Count subsection questions
-            for subsection in section.get("subsections", {}).values():
-                total_questions += len(subsection.get("questions", []))
+        # Answers are shared per response file and form schema
+        answers_artifact = f"req-res-{file_sha256(REQ_RES_SCHEMA_PATH)[:16]}.json"
+        shared = read_derived(response_document.content_hash, answers_artifact) if inherit else None
+        if shared is not None:
+            logger.info(f"Using stored Request and Response answers for project {project_id}")
+            metadata["req_res_evaluation"] = shared
+            with open(metadata_file, "w") as f:
+                json.dump(metadata, f)
+            return jsonify({"success": True, "evaluation_results": shared, "cached": True})
 
-        progress_tracker.initialize_progress(project_id, total_questions)
+        try:
+            response_tables = load_tables(response_path)
+        except Exception as e:
+            logger.error(f"Error loading tables: {str(e)}")
+            response_tables = None
+        
+        plan = get_evaluation_plan(REQ_RES_SCHEMA_PATH)
+
+        # Total questions for progress tracking (including subsections) are precomputed
+        progress_tracker.initialize_progress(project_id, plan.total_questions)
 
         # Modify the evaluate_technical_proposal function to accept a progress callback
         evaluation_results = evaluate_technical_proposal(
-            schema, 
+            plan.schema, 
             sole_source_response,
             project_id=project_id,
+            plan=plan,
+            pages=response_pages,
+            tables=response_tables,
             progress_callback=lambda section, count: progress_tracker.update_progress(
                 project_id, 
                 count, 
@@ -317,6 +595,7 @@ def evaluate_requirements_response(project_id):
         metadata["req_res_evaluation"] = serializable_results
         with open(metadata_file, "w") as f:
             json.dump(metadata, f)
+        write_derived(response_document.content_hash, answers_artifact, serializable_results)
 
         # Mark progress as complete
         progress_tracker.complete_progress(project_id)
@@ -336,6 +615,103 @@ def evaluate_requirements_response(project_id):
 
 
 
+# Re-evaluate a single Request and Response form question and its dependents
+@app.route("/api/projects/<project_id>/reevaluate-req-res", methods=["POST"])
+def reevaluate_requirements_response(project_id):
+    """
+    Endpoint to re-evaluate one question of the Request and Response form.
+
+    Accepts either {"path": "section.subsection.questionId"} or
+    {"section": ..., "subsection": ..., "questionId": ...} (subsection optional)
+    and patches the stored req_res_evaluation in place.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if data.get("path"):
+            parts = data["path"].split(".")
+            if len(parts) not in (2, 3):
+                return jsonify({"error": f"Invalid question path: {data['path']}"}), 400
+            section_name, question_id = parts[0], parts[-1]
+            subsection_name = parts[1] if len(parts) == 3 else None
+        else:
+            section_name = data.get("section")
+            subsection_name = data.get("subsection")
+            question_id = data.get("questionId")
+        if not section_name or not question_id:
+            return jsonify({"error": "A section and questionId are required"}), 400
+
+        metadata_file = os.path.join(get_project_folder(project_id), "metadata.json")
+        with open(metadata_file, "r") as f:
+            metadata = json.load(f)
+
+        stored_results = metadata.get("req_res_evaluation") or {}
+        stored_section = stored_results.get("sections", {}).get(section_name)
+        if stored_section is not None and subsection_name:
+            stored_section = stored_section.get("subsections", {}).get(subsection_name)
+        if stored_section is None:
+            return jsonify({"error": "No stored evaluation found for this section; run evaluate-req-res first"}), 404
+
+        plan = get_evaluation_plan(REQ_RES_SCHEMA_PATH)
+        section_config = plan.section_config(section_name, subsection_name)
+        if section_config is None or question_id not in plan.questions_by_section.get(
+            section_config.get("id"), {}
+        ):
+            return jsonify({"error": f"Question not found: {section_name}.{subsection_name or ''}.{question_id}"}), 404
+
+        response_path = os.path.abspath(metadata.get("responsePath"))
+        if not os.path.exists(response_path):
+            logger.error(f"Response file not found at: {response_path}")
+            return jsonify({"error": f"Response file not found at: {response_path}"}), 404
+
+        try:
+            response_pages = load_document(response_path).pages()
+            sole_source_response = "".join(response_pages)
+        except Exception as pdf_error:
+            logger.error(f"Error reading PDF: {str(pdf_error)}")
+            return jsonify({"error": f"Error reading PDF: {str(pdf_error)}"}), 500
+
+        # Subsections see the same routed context and tables as in a full run
+        # (see evaluate_technical_proposal), so answers stay comparable
+        proposal_text = sole_source_response
+        if subsection_name:
+            try:
+                response_tables = load_tables(response_path)
+            except Exception as e:
+                logger.error(f"Error loading tables: {str(e)}")
+                response_tables = None
+            proposal_text, _ = route_section_context(
+                response_pages, section_config.get("id"), response_tables
+            )
+
+        evaluator = TechnicalEvaluator(plan=plan, pages=response_pages)
+        updated = evaluator.reevaluate_question(
+            section_config,
+            question_id,
+            proposal_text,
+            stored_section.get("responses", {})
+        )
+        updated = {qid: serialize_response(result) for qid, result in updated.items()}
+
+        # Re-read metadata so concurrent edits to other sections are not lost
+        with open(metadata_file, "r") as f:
+            metadata = json.load(f)
+        target = metadata["req_res_evaluation"]["sections"][section_name]
+        if subsection_name:
+            target = target["subsections"][subsection_name]
+        target.setdefault("responses", {}).update(updated)
+        with open(metadata_file, "w") as f:
+            json.dump(metadata, f)
+
+        return jsonify({"success": True, "updated": updated})
+
+    except Exception as e:
+        logger.error(f"Error re-evaluating requirements response: {str(e)}")
+        return jsonify({
+            "error": str(e),
+            "message": "Error re-evaluating requirements response"
+        }), 500
+
+
 @app.route("/api/projects/<project_id>/generate_summary", methods=["POST"])
 def generate_summary(project_id):
     try:
@@ -348,50 +724,25 @@ def generate_summary(project_id):
         with open(metadata_file, "r") as f:
             metadata = json.load(f)
 
-        flatReqResData = flatten_evaluation_object(
-            metadata.get("req_res_evaluation", {})
-        )
-
-        logger.info(f"Flattened req_res_evaluation: {flatReqResData}")
-
-        evaluation_results = {
-            "req_res_evaluation": flatReqResData,
-            "work_products_evaluation": metadata.get("work_products_evaluation"),
-            "derived_requirements_evaluation": metadata.get(
-                "derived_requirements_evaluation"
-            ),
-        }
-
-        summaries = {}
-        current_step = 0
-        
-        # Generate individual summaries with progress updates
-        for key, value in evaluation_results.items():
-            progress_tracker.update_progress(
-                project_id, 
-                current_step + 1,
-                f"Generating summary for {key.replace('_', ' ').title()}"
+        summary_inputs = build_summary_inputs(metadata)
+        force = bool((request.get_json(silent=True) or {}).get("force"))
+        fingerprints, reused = plan_summary_regeneration(summary_inputs, metadata, force)
+        if reused:
+            logger.info(f"Reusing unchanged summaries: {list(reused.keys())}")
+
+        # Category summaries run concurrently, the combined summary runs last
+        summaries = generate_summaries(
+            summary_inputs,
+            reused=reused,
+            progress_callback=lambda count, message: progress_tracker.update_progress(
+                project_id, count, message
             )
-            
-            cleaned_responses = strip_metadata(value)
-            summaries[f"summary_{key}"] = generate_summary_assessment(
-                cleaned_responses
-            )
-            logger.info(f"Generated summary for {key} successfully.")
-            current_step += 1
-
-        # Generate combined summary with progress update
-        progress_tracker.update_progress(
-            project_id, 
-            4,
-            "Generating combined summary"
         )
-        
-        combined_summary = generate_summary_assessment(list(summaries.values()))
-        summaries["combined_summary"] = combined_summary
+        combined_summary = summaries["combined_summary"]
 
-        # Update the JSON file with the summaries
+        # Update the JSON file with the summaries and the inputs they were built from
         metadata["summaries"] = summaries
+        metadata["summary_fingerprints"] = fingerprints
         with open(metadata_file, "w") as f:
             json.dump(metadata, f)
 
@@ -403,6 +754,7 @@ def generate_summary(project_id):
                 "success": True,
                 "summaries": summaries,
                 "combined_summary": combined_summary,
+                "reused": sorted(reused.keys()),
             }
         )
 
@@ -411,6 +763,55 @@ def generate_summary(project_id):
         progress_tracker.set_error(project_id, str(e))
         return jsonify({"error": str(e), "message": "Error generating summary"}), 500
 
+def format_sse(event, payload):
+    """Format a server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+# Stream summary tokens to the client as server-sent events
+@app.route("/api/projects/<project_id>/generate_summary/stream", methods=["POST"])
+def stream_summary(project_id):
+    metadata_file = os.path.join(get_project_folder(project_id), "metadata.json")
+    if not os.path.exists(metadata_file):
+        return jsonify({"error": "Project metadata not found"}), 404
+
+    with open(metadata_file, "r") as f:
+        metadata = json.load(f)
+    summary_inputs = build_summary_inputs(metadata)
+    force = bool((request.get_json(silent=True) or {}).get("force"))
+    fingerprints, reused = plan_summary_regeneration(summary_inputs, metadata, force)
+
+    def generate():
+        logger.info(f"Streaming summary for project {project_id}...")
+        progress_tracker.initialize_progress(project_id, 4)
+        completed = 0
+        try:
+            for event in stream_summaries(summary_inputs, reused=reused):
+                if event["event"] == "summary":
+                    completed += 1
+                    progress_tracker.update_progress(
+                        project_id, completed, f"Generated {event['key'].replace('_', ' ')}"
+                    )
+                elif event["event"] == "done":
+                    # Re-read metadata so edits made while streaming are not lost
+                    with open(metadata_file, "r") as f:
+                        metadata = json.load(f)
+                    metadata["summaries"] = event["summaries"]
+                    metadata["summary_fingerprints"] = fingerprints
+                    with open(metadata_file, "w") as f:
+                        json.dump(metadata, f)
+                    progress_tracker.complete_progress(project_id)
+                yield format_sse(event["event"], event)
+        except Exception as e:
+            logger.error(f"Error streaming summary: {str(e)}")
+            progress_tracker.set_error(project_id, str(e))
+            yield format_sse("error", {"error": str(e), "message": "Error generating summary"})
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # DASHBOARD ENDPOINTS
 @app.route("/api/projects", methods=["GET"])
 def get_projects():
@@ -444,72 +845,256 @@ def create_project():
 
 @app.route("/api/projects/<project_id>/data")
 def get_project_data(project_id):
+    """
+    Returns the project metadata.
+
+    ?fields=a,b limits the response to those top-level keys. The response
+    carries an ETag and Last-Modified from the metadata file, so unchanged
+    data is answered with 304 without reading the file.
+    """
     project_folder = get_project_folder(project_id)
+    fields = [field.strip() for field in request.args.get("fields", "").split(",") if field.strip()]
 
     # Load project metadata from a JSON file in the project folder
     metadata_file = os.path.join(project_folder, "metadata.json")
+    try:
+        stat = os.stat(metadata_file)
+    except FileNotFoundError:
+        stat = None
+
+    if stat is not None:
+        # Weak, as compression changes the bytes but not the data
+        etag = json_etag(stat.st_mtime_ns, stat.st_size, fields)
+        last_modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+        # HTTP dates have whole seconds, so a date only proves the client's copy is
+        # current when the file is strictly older; a write in the same second as
+        # the client's copy must not be answered with 304
+        if request.if_none_match.contains_weak(etag) or (
+            not request.if_none_match
+            and request.if_modified_since
+            and last_modified < request.if_modified_since
+        ):
+            response = Response(status=304)
+        else:
+            with open(metadata_file, "r") as f:
+                metadata = json.load(f)
+            response = jsonify({key: metadata[key] for key in fields if key in metadata} if fields else metadata)
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        # Let the dashboard keep the body but always revalidate it
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    metadata = {
+        "requestName": None,
+        "responseName": None,
+        "requestUrl": None,
+        "responseUrl": None,
+        "stats": {
+            "techEvalScore": 0,
+            "workProductScore": 0,
+            "requirementsScore": 0,
+            "totalScore": 0,
+        },
+    }
+    return jsonify({key: metadata[key] for key in fields if key in metadata} if fields else metadata)
+
+
+@app.route("/api/projects/<project_id>/prefetch", methods=["GET"])
+def prefetch_status(project_id):
+    """Reports the upload prefetch of a project and each of its steps"""
+    return jsonify(get_prefetch_status(project_id))
+
+
+@app.route("/api/projects/<project_id>/search", methods=["GET"])
+def search_response(project_id):
+    """
+    Finds the passages of the project's response closest to a query.
+
+    The response index is built on first use and reused until the response changes.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing query"}), 400
+    try:
+        k = min(max(int(request.args.get("k", "5")), 1), 50)
+    except ValueError:
+        return jsonify({"error": "k must be a number"}), 400
+
+    try:
+        metadata_file = os.path.join(get_project_folder(project_id), "metadata.json")
+        with open(metadata_file, "r") as f:
+            metadata = json.load(f)
+
+        response_path = os.path.abspath(metadata.get("responsePath") or "")
+        if not metadata.get("responsePath") or not os.path.exists(response_path):
+            return jsonify({"error": "Response document not found"}), 404
+
+        return jsonify({"results": project_indexes.search(response_path, query, k)})
+    except Exception as e:
+        logger.error(f"Error searching response: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+def _register_upload(project_id, type, original_name, temp_path, content_hash, head):
+    """
+    Stores a received file as a project's request or response document.
+
+    Checks the content against the extension, moves the file into the blob
+    store and records it in the project metadata.
+    """
+    project_folder = get_project_folder(project_id)
+    filename = secure_filename(
+        f"{type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{original_name}"
+    )
+    filepath = os.path.join(project_folder, filename)
+    extension = filename.rsplit(".", 1)[1].lower()
+    verify_type(temp_path, head, extension)
+
+    # Store the bytes once by content; the project file refers to the blob
+    content_hash, _, duplicate = store_blob(temp_path, extension, content_hash)
+    add_reference(content_hash, extension, filepath)
+
+    # Update project metadata
+    metadata_file = os.path.join(project_folder, "metadata.json")
+    metadata = {}
     if os.path.exists(metadata_file):
         with open(metadata_file, "r") as f:
-            return jsonify(json.load(f))
+            metadata = json.load(f)
+
+    metadata[f"{type}Name"] = original_name
+    metadata[f"{type}Path"] = filepath
+    metadata[f"{type}Url"] = f"/api/documents/{project_id}/{filename}"
+    metadata[f"{type}ContentHash"] = content_hash
+
+    # Extract the page text and tables once per content; a duplicate upload reuses them.
+    # With prefetch on this runs in the background instead of holding up the upload.
+    if not UPLOAD_PREFETCH and has_page_extractor(filepath):
+        try:
+            document = load_document(filepath, progress_id=upload_progress_key(project_id))
+            metadata[f"{type}PageCount"] = document.page_count
+            load_tables(filepath)
+        except Exception as e:
+            logger.error(f"Error extracting text from {filename}: {str(e)}")
+
+    with open(metadata_file, "w") as f:
+        json.dump(metadata, f)
+
+    # Opt-in: process the documents and derive requirements before they are asked for
+    schedule_prefetch(project_id)
 
     return jsonify(
         {
-            "requestName": None,
-            "responseName": None,
-            "requestUrl": None,
-            "responseUrl": None,
-            "stats": {
-                "techEvalScore": 0,
-                "workProductScore": 0,
-                "requirementsScore": 0,
-                "totalScore": 0,
-            },
+            "message": "File uploaded successfully",
+            "filename": filename,
+            "url": f"/api/documents/{project_id}/{filename}",
+            "duplicate": duplicate,
         }
     )
 
 
 @app.route("/api/upload/<type>", methods=["POST"])
 def upload_file(type):
-    if "file" not in request.files or "projectId" not in request.form:
-        return jsonify({"error": "Missing file or project ID"}), 400
+    """
+    Uploads a document in one multipart request.
 
-    project_id = request.form["projectId"]
-    file = request.files["file"]
+    The file is hashed, sniffed and size-checked while the body is parsed
+    (see StreamingUploadRequest); bodies over MAX_UPLOAD_MB are refused.
+    """
+    try:
+        try:
+            files, form = request.files, request.form
+        except UploadError as e:
+            return jsonify({"error": str(e)}), e.status
 
-    if file.filename == "":
-        return jsonify({"error": "No selected file"}), 400
+        if "file" not in files or "projectId" not in form:
+            return jsonify({"error": "Missing file or project ID"}), 400
 
-    if file and allowed_file(file.filename):
-        project_folder = get_project_folder(project_id)
-        filename = secure_filename(
-            f"{type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-        )
-        filepath = os.path.join(project_folder, filename)
-        file.save(filepath)
+        project_id = form["projectId"]
+        file = files["file"]
+        if file.filename == "":
+            return jsonify({"error": "No selected file"}), 400
 
-        # Update project metadata
-        metadata_file = os.path.join(project_folder, "metadata.json")
-        metadata = {}
-        if os.path.exists(metadata_file):
-            with open(metadata_file, "r") as f:
-                metadata = json.load(f)
+        if file and allowed_file(file.filename):
+            upload = file.stream
+            upload.flush()
+            try:
+                return _register_upload(project_id, type, file.filename, upload.path,
+                                        upload.digest.hexdigest(), upload.head)
+            except UploadError as e:
+                return jsonify({"error": str(e)}), e.status
 
-        metadata[f"{type}Name"] = file.filename
-        metadata[f"{type}Path"] = filepath
-        metadata[f"{type}Url"] = f"/api/documents/{project_id}/{filename}"
+        return jsonify({"error": "Invalid file type"}), 400
+    finally:
+        # Removes the received files unless they were moved into the blob store
+        request.discard_uploads()
 
-        with open(metadata_file, "w") as f:
-            json.dump(metadata, f)
 
-        return jsonify(
-            {
-                "message": "File uploaded successfully",
-                "filename": filename,
-                "url": f"/api/documents/{project_id}/{filename}",
-            }
-        )
+# Start a resumable upload of a large document
+@app.route("/api/upload-sessions", methods=["POST"])
+def create_upload_session():
+    """
+    Opens a resumable upload.
+
+    Expects {"projectId", "type", "filename", "size"}. Chunks are then PUT to
+    /api/upload-sessions/<id>?offset=N in order, and the upload is finished
+    with POST /api/upload-sessions/<id>/complete. GET on the session returns
+    the received offset to resume from.
+    """
+    data = request.json or {}
+    missing = [key for key in ("projectId", "type", "filename", "size") if not data.get(key)]
+    if missing:
+        return jsonify({"error": f"Missing {', '.join(missing)}"}), 400
+    if not allowed_file(data["filename"]):
+        return jsonify({"error": "Invalid file type"}), 400
+    try:
+        session = upload_sessions.create(data["projectId"], data["type"], data["filename"], int(data["size"]))
+        return jsonify(session), 201
+    except (UploadError, ValueError) as e:
+        return jsonify({"error": str(e)}), getattr(e, "status", 400)
+
 
-    return jsonify({"error": "Invalid file type"}), 400
+@app.route("/api/upload-sessions/<session_id>", methods=["GET", "PUT", "DELETE"])
+def upload_session(session_id):
+    try:
+        if request.method == "GET":
+            return jsonify(upload_sessions.status(session_id))
+        if request.method == "DELETE":
+            upload_sessions.cancel(session_id)
+            return jsonify({"success": True})
+
+        # The offset comes from ?offset= or a "bytes start-end/total" Content-Range header
+        offset = request.args.get("offset")
+        content_range = request.headers.get("Content-Range", "")
+        if offset is None and content_range.startswith("bytes "):
+            offset = content_range[len("bytes "):].split("-", 1)[0]
+        if offset is None or not offset.isdigit():
+            return jsonify({"error": "Missing chunk offset"}), 400
+        return jsonify(upload_sessions.append(session_id, int(offset), request.stream))
+    except UploadError as e:
+        body = {"error": str(e)}
+        if e.status == 409:
+            try:
+                body["received"] = upload_sessions.status(session_id)["received"]
+            except UploadError:
+                pass
+        return jsonify(body), e.status
+
+
+@app.route("/api/upload-sessions/<session_id>/complete", methods=["POST"])
+def complete_upload_session(session_id):
+    try:
+        session, part_path, content_hash, head = upload_sessions.complete(session_id)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+    try:
+        return _register_upload(session["projectId"], session["type"], session["filename"],
+                                part_path, content_hash, head)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
 
 # Download a file from a project folder
 @app.route("/api/documents/<project_id>/<filename>")
@@ -582,14 +1167,20 @@ def clear_generated_data(project_id):
             metadata = json.load(f)
         if "derived_requirements" in metadata:
             del metadata["derived_requirements"]
+        if "derived_requirements_source" in metadata:
+            del metadata["derived_requirements_source"]
         if "derived_requirements_evaluation" in metadata:
             del metadata["derived_requirements_evaluation"]
+        if "derived_requirements_clusters" in metadata:
+            del metadata["derived_requirements_clusters"]
         if "work_products_evaluation" in metadata:
             del metadata["work_products_evaluation"]
         if "req_res_evaluation" in metadata:
             del metadata["req_res_evaluation"]
         if "summaries" in metadata:
             del metadata["summaries"]
+        if "summary_fingerprints" in metadata:
+            del metadata["summary_fingerprints"]
         
         with open(metadata_file, "w") as f:
             json.dump(metadata, f)
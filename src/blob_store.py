@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import re
+import shutil
+from typing import Any, Optional, Tuple
+
+from .utils import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# Uploaded file contents, stored once per distinct content
+BLOB_STORE_DIR = os.getenv(
+    "BLOB_STORE_DIR", os.path.join(os.getenv("BASE_UPLOAD_FOLDER", "uploads"), ".blobs")
+)
+
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def blob_path(content_hash: str, extension: str) -> str:
+    """Where the blob with this hash and file extension is stored"""
+    return os.path.join(BLOB_STORE_DIR, content_hash[:2], f"{content_hash}.{extension.lower()}")
+
+
+def derived_dir(content_hash: str) -> str:
+    """Folder for artifacts computed from a blob (tables, indexes, requirements, answers)"""
+    if not _HASH_PATTERN.match(content_hash or ""):
+        raise ValueError(f"Invalid blob hash: {content_hash!r}")
+    return os.path.join(BLOB_STORE_DIR, content_hash[:2], f"{content_hash}.derived")
+
+
+def _link(source: str, target: str) -> None:
+    """Makes target refer to source: a hard link, else a symlink, else a copy"""
+    if os.path.lexists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(source), target)
+        except OSError:
+            shutil.copyfile(source, target)
+
+
+def store_blob(temp_path: str, extension: str, content_hash: Optional[str] = None) -> Tuple[str, str, bool]:
+    """
+    Moves a newly written file into the blob store, or drops it if the content is already there.
+
+    Args:
+        temp_path: The written file; it is consumed
+        extension: File extension the blob is stored under
+        content_hash: SHA-256 of the file when already computed while writing it
+
+    Returns:
+        Tuple of (content hash, blob path, whether the content was already stored)
+    """
+    content_hash = content_hash or file_sha256(temp_path)
+    path = blob_path(content_hash, extension)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(temp_path)
+        logger.info(f"Upload matches stored blob {content_hash[:12]}")
+        return content_hash, path, True
+    os.replace(temp_path, path)
+    return content_hash, path, False
+
+
+def add_reference(content_hash: str, extension: str, project_path: str) -> None:
+    """
+    Makes a project file refer to a stored blob.
+
+    The project keeps its own file name, so existing paths and download URLs
+    work, while the bytes exist once however many projects use them.
+    """
+    _link(blob_path(content_hash, extension), project_path)
+
+
+def read_derived(content_hash: str, name: str) -> Optional[Any]:
+    """Loads a JSON artifact stored for a blob, or None if there is none"""
+    try:
+        with open(os.path.join(derived_dir(content_hash), name), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable derived artifact {name} of {content_hash[:12]}: {e}")
+        return None
+
+
+def write_derived(content_hash: str, name: str, data: Any) -> str:
+    """Stores a JSON artifact for a blob, replacing any previous one atomically"""
+    folder = derived_dir(content_hash)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+    return path
@@ -3,7 +3,10 @@ import json
 import logging
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
+import numpy as np
 from flask import jsonify
 import langchain
 import langchain_community
@@ -30,7 +33,9 @@ from langchain_core.retrievers import BaseRetriever
 
 from src.prompt_manager import evaluate_question
 
-from .utils import chunk_text, read_pdf
+from .document_model import load_document
+from .embedding_cache import get_embeddings_model
+from .utils import chunk_pages, pack_embedding_batches, parse_requirements, read_pdf_pages
 from .progress_tracking import progress_tracker
 
 logger = logging.getLogger(__name__)
@@ -55,7 +60,112 @@ except (FileNotFoundError, json.JSONDecodeError) as e:
 results_directory = 'results'
 os.makedirs(results_directory, exist_ok=True)
 
-def generate_evaluations(project_id, filename, question_set):
+# Requirements evaluated concurrently by the derive-and-evaluate pipeline
+REQUIREMENTS_EVAL_MAX_WORKERS = int(os.getenv('REQUIREMENTS_EVAL_MAX_WORKERS', '4'))
+# Set to "true" to evaluate near-duplicate derived requirements once by default
+REQUIREMENT_CLUSTERING = os.getenv('REQUIREMENT_CLUSTERING', 'false').lower() in ('1', 'true', 'yes')
+# Cosine similarity at which two derived requirements may share one evaluation; kept
+# high because OpenAI embeddings score different requirements on one topic near 0.9
+REQUIREMENT_CLUSTER_THRESHOLD = float(os.getenv('REQUIREMENT_CLUSTER_THRESHOLD', '0.97'))
+# Share of content words two requirements must have in common to share an evaluation
+REQUIREMENT_CLUSTER_MIN_OVERLAP = float(os.getenv('REQUIREMENT_CLUSTER_MIN_OVERLAP', '0.8'))
+
+_REQUIREMENT_NUMBER = re.compile(r'\d+(?:[.,]\d+)*')
+_REQUIREMENT_WORD = re.compile(r'[a-z]+')
+_REQUIREMENT_STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'for', 'in', 'on', 'at', 'by', 'with', 'be',
+    'is', 'are', 'shall', 'must', 'should', 'will', 'all', 'any', 'each', 'that', 'this',
+    'its', 'their', 'as', 'from', 'offeror', 'contractor', 'vendor', 'provide', 'provides',
+}
+
+def _requirement_terms(query):
+    """Numbers and content words of a requirement, for the lexical clustering guard"""
+    text = (query or '').lower()
+    numbers = frozenset(_REQUIREMENT_NUMBER.findall(text))
+    words = frozenset(
+        word for word in _REQUIREMENT_WORD.findall(text) if word not in _REQUIREMENT_STOPWORDS
+    )
+    return numbers, words
+
+def _lexically_equivalent(terms, other_terms, min_overlap=REQUIREMENT_CLUSTER_MIN_OVERLAP):
+    """True when two requirements state the same numbers and mostly the same words"""
+    (numbers, words), (other_numbers, other_words) = terms, other_terms
+    if numbers != other_numbers:
+        return False
+    if not words or not other_words:
+        return words == other_words
+    return len(words & other_words) / len(words | other_words) >= min_overlap
+
+def cluster_requirements(requirements, threshold=REQUIREMENT_CLUSTER_THRESHOLD, embeddings_model=None):
+    """
+    Groups requirements that restate each other by embedding similarity.
+
+    Requirements are visited in order; each joins the most similar cluster
+    whose representative it matches at or above the threshold and states the
+    same numbers with mostly the same words (so "monthly reports" and
+    "quarterly reports" stay apart). Otherwise it starts a new cluster and
+    becomes its representative.
+
+    Requirements are referred to by list position, not by their id, since
+    ids come from the model and may repeat or be missing.
+
+    Args:
+        requirements: List of {id, query} dicts
+        threshold: Cosine similarity at which a requirement joins a cluster
+        embeddings_model: Embeddings implementation, cached OpenAIEmbeddings by default
+
+    Returns:
+        list: Clusters as {"representative": position, "members": [positions],
+        "similarity": {position: score}}, with every requirement in exactly one cluster
+    """
+    if len(requirements) < 2:
+        return [
+            {"representative": index, "members": [index], "similarity": {}}
+            for index in range(len(requirements))
+        ]
+
+    embeddings_model = embeddings_model or get_embeddings_model()
+    vectors = np.array(
+        embeddings_model.embed_documents([req["query"] for req in requirements]),
+        dtype=np.float32
+    )
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+
+    terms = [_requirement_terms(req.get("query")) for req in requirements]
+
+    clusters = []
+    leaders = []
+    for index in range(len(requirements)):
+        joined = False
+        if leaders:
+            scores = vectors[leaders] @ vectors[index]
+            for best in np.argsort(-scores):
+                if scores[best] < threshold:
+                    break
+                if _lexically_equivalent(terms[leaders[best]], terms[index]):
+                    cluster = clusters[best]
+                    cluster["members"].append(index)
+                    cluster["similarity"][str(index)] = round(float(scores[best]), 4)
+                    joined = True
+                    break
+        if joined:
+            continue
+        leaders.append(index)
+        clusters.append({"representative": index, "members": [index], "similarity": {}})
+
+    logger.info(f"Clustered {len(requirements)} requirements into {len(clusters)} groups")
+    return clusters
+
+def generate_evaluations(project_id, filename, question_set, clusters=None):
+    """
+    Evaluates each question against the project's response document.
+
+    When clusters are given (see cluster_requirements), only each cluster's
+    representative is evaluated and its answer is copied to the other members,
+    marked with "clusterRepresentative", the position of the question the
+    answer came from. Clusters refer to questions by position.
+    """
     try:
         logger.info(f"Generating evaluations for {filename}...")
         # Get file paths from metadata
@@ -78,7 +188,7 @@ def generate_evaluations(project_id, filename, question_set):
 
         # Read the PDF
         try:
-            sole_source_response = read_pdf(response_path)
+            sole_source_response = load_document(response_path).text()
         except Exception as pdf_error:
             logger.error(f"Error reading PDF: {str(pdf_error)}")
             progress_tracker.set_error(project_id, f"Error reading PDF: {str(pdf_error)}")
@@ -87,8 +197,26 @@ def generate_evaluations(project_id, filename, question_set):
         evaluation_results = []
         logger.info(f"generate_evaluations for: {question_set}...")
 
+        positions = list(range(len(question_set)))
+        members_by_representative = {}
+        if clusters:
+            members_by_representative = {
+                cluster["representative"]: [
+                    member for member in cluster["members"]
+                    if member != cluster["representative"] and 0 <= member < len(question_set)
+                ]
+                for cluster in clusters
+            }
+            positions = sorted(
+                position for position in members_by_representative if 0 <= position < len(question_set)
+            )
+            total_questions = len(positions)
+            progress_tracker.initialize_progress(project_id, total_questions)
+
+        results_by_position = {}
         # Call your evaluate_work_products function
-        for idx, question in enumerate(question_set):
+        for idx, position in enumerate(positions):
+            question = question_set[position]
             try:
                 # Update progress with current question
                 question_number = idx + 1
@@ -103,7 +231,15 @@ def generate_evaluations(project_id, filename, question_set):
                     question, sole_source_response
                 )
                 parsed_response = parse_ai_response(question, answer_with_justification)
-                evaluation_results.append(parsed_response)
+                results_by_position[position] = parsed_response
+                for member in members_by_representative.get(position, []):
+                    results_by_position[member] = {
+                        **question_set[member],
+                        "answer": parsed_response["answer"],
+                        "justification": parsed_response["justification"],
+                        "clusterRepresentative": position,
+                    }
+                evaluation_results = [results_by_position[p] for p in sorted(results_by_position)]
                 logger.info(
                     f"Evaluated question {question_number}/{total_questions} in {filename} successfully."
                 )
@@ -130,6 +266,74 @@ def generate_evaluations(project_id, filename, question_set):
         progress_tracker.set_error(project_id, error_msg)
         return jsonify({"error": str(e), "message": "Error evaluating"}), 500
 
+def evaluate_requirements_pipeline(project_id, requirements, sole_source_response, metadata, metadata_file):
+    """
+    Evaluates requirements while they are still being produced.
+
+    Each requirement is sent to the worker pool as soon as the iterable yields
+    it, so extraction and evaluation overlap. Results are written to
+    derived_requirements_evaluation in requirement order as they complete. A
+    requirement whose evaluation fails gets an entry with an empty answer and
+    the error. If the iterable itself fails, the requirements consumed so far
+    are stored as derived_requirements, their evaluations finish, and the
+    error is raised.
+
+    Args:
+        project_id: The project being evaluated, for progress tracking
+        requirements: Iterable of {id, query} dicts, e.g. from stream_requirements
+        sole_source_response: The vendor response text
+        metadata: The project metadata, updated in place
+        metadata_file: Path the metadata is saved to
+
+    Returns:
+        tuple: (requirements consumed, evaluation results ordered by id)
+    """
+    lock = threading.Lock()
+    derived_requirements = []
+    evaluation_results = []
+
+    def save_results():
+        evaluation_results.sort(key=lambda result: result.get("id", 0))
+        metadata["derived_requirements_evaluation"] = evaluation_results
+        with open(metadata_file, "w") as f:
+            json.dump(metadata, f)
+
+    def evaluate(requirement):
+        try:
+            answer_with_justification = evaluate_question(requirement, sole_source_response)
+            parsed_response = parse_ai_response(requirement, answer_with_justification)
+        except Exception as e:
+            logger.error(f"Error evaluating requirement {requirement.get('id')}: {e}")
+            # Kept in the results so the requirement is not silently missing
+            parsed_response = {**requirement, "answer": "", "justification": "", "error": str(e)}
+        with lock:
+            evaluation_results.append(parsed_response)
+            save_results()
+            progress_tracker.update_progress(
+                project_id,
+                len(evaluation_results),
+                f"Evaluated requirement {len(evaluation_results)} of {len(derived_requirements)}"
+            )
+
+    progress_tracker.initialize_progress(project_id, 0)
+    try:
+        with ThreadPoolExecutor(max_workers=REQUIREMENTS_EVAL_MAX_WORKERS) as executor:
+            for requirement in requirements:
+                with lock:
+                    derived_requirements.append(requirement)
+                    progress_tracker.set_total(project_id, len(derived_requirements))
+                # Evaluate a copy so the derived requirement keeps only {id, query}
+                executor.submit(evaluate, dict(requirement))
+            logger.info(f"Extracted {len(derived_requirements)} requirements, waiting for evaluations")
+    except Exception:
+        # The executor has finished the submitted evaluations; keep what they were for
+        with lock:
+            metadata["derived_requirements"] = list(derived_requirements)
+            save_results()
+        raise
+
+    return derived_requirements, evaluation_results
+
 def save_vectordb(vector_db, index_path='vectorstore/faiss_index'):
     """
     Saves the FAISS index and metadata to disk.
@@ -143,7 +347,7 @@ def load_vectordb(index_path='vectorstore/faiss_index'):
     Loads the FAISS index and metadata from disk.
     """
     if os.path.exists(index_path):
-        vector_db = FAISS.load_local(index_path, OpenAIEmbeddings(), allow_dangerous_deserialization=True)
+        vector_db = FAISS.load_local(index_path, get_embeddings_model(), allow_dangerous_deserialization=True)
         logger.info(f"VectorDB loaded from {index_path}.")
         return vector_db
     else:
@@ -188,14 +392,6 @@ def check_project_documents(project_id):
             return bool(metadata.get('requestName')) and bool(metadata.get('responseName'))
     return False
 
-def parse_requirements(requirements_str):
-    """Parse requirements from a string."""
-    try:
-        cleaned_str = re.sub(r"```json|```", "", requirements_str).strip()
-        return json.loads(cleaned_str) if cleaned_str else []
-    except json.JSONDecodeError:
-        return []
-        
 def strip_metadata(responses):
     """Removes 'id' and 'query' keys from each response object."""
     return [{k: v for k, v in response.items() if k not in ['id', 'query']} for response in responses]
@@ -232,17 +428,47 @@ def load_documents_into_vectordb(docs_directory, vector_store):
     for filename in pdf_files:
         doc_path = os.path.join(docs_directory, filename)
         try:
-            text = read_pdf(doc_path)
-            if not text:
+            pages = read_pdf_pages(doc_path)
+            if not any(pages):
                 logger.warning(f"No text extracted from {filename}. Skipping this file.")
                 continue
 
-            chunks = chunk_text(text)
+            chunks = chunk_pages(pages)
+            for chunk in chunks:
+                chunk["source"] = filename
             create_and_store_embeddings(chunks, vector_store)
             logger.info(f"Successfully loaded and processed {filename} into the VectorDB.")
         except Exception as e:
             logger.error(f"Error processing file '{filename}': {e}")
 
+def embed_chunks(chunks, embeddings_model=None):
+    """
+    Embeds text chunks, packing them into as few requests as the batch limits allow.
+
+    Args:
+        chunks: Strings or chunk_pages dicts
+        embeddings_model: Embeddings implementation, cached OpenAIEmbeddings by default
+
+    Returns:
+        tuple: (texts, embeddings, metadatas), where each chunk dict's offsets
+        and pages become its metadata for citations
+    """
+    texts = [chunk["text"] if isinstance(chunk, dict) else chunk for chunk in chunks]
+    metadatas = [
+        {key: value for key, value in chunk.items() if key != "text"} if isinstance(chunk, dict) else {}
+        for chunk in chunks
+    ]
+    batches = pack_embedding_batches(texts)
+    logger.info(f"Creating embeddings for {len(texts)} chunks in {len(batches)} requests.")
+
+    embeddings_model = embeddings_model or get_embeddings_model()
+    embeddings = [None] * len(texts)
+    for batch in batches:
+        vectors = embeddings_model.embed_documents([texts[index] for index in batch], chunk_size=len(batch))
+        for index, vector in zip(batch, vectors):
+            embeddings[index] = vector
+    return texts, embeddings, metadatas
+
 def create_and_store_embeddings(chunks, vector_db):
     """
     Creates embeddings for the given text chunks and stores them in the VectorDB.
@@ -252,17 +478,11 @@ def create_and_store_embeddings(chunks, vector_db):
         return
 
     try:
-        # Convert chunks to Document objects
-        documents = [Document(page_content=chunk) for chunk in chunks]
-        logger.info(f"Creating embeddings for {len(documents)} chunks.")
-
-        # Use OpenAIEmbeddings directly for embedding creation
-        embeddings_model = OpenAIEmbeddings()
-        embeddings = embeddings_model.embed_documents([doc.page_content for doc in documents])
-        
-        # Store the documents with embeddings in the vector store
-        vector_db.add_documents(documents)  # Only pass the documents
-        logger.info(f"Stored {len(documents)} chunks in the VectorDB.")
+        texts, embeddings, metadatas = embed_chunks(chunks)
+
+        # Store the precomputed embeddings rather than having the store embed again
+        vector_db.add_embeddings(list(zip(texts, embeddings)), metadatas=metadatas)
+        logger.info(f"Stored {len(texts)} chunks in the VectorDB.")
     except Exception as e:
         logger.error(f"Error creating embeddings or storing in VectorDB: {e}")
         raise e
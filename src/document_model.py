@@ -0,0 +1,259 @@
+import bisect
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .blob_store import derived_dir
+from .ocr import ocr_available, ocr_pages
+from .utils import file_sha256, read_pdf_pages
+from .word_extractor import read_doc_pages, read_docx_pages
+
+logger = logging.getLogger(__name__)
+
+# Page indexes kept in memory; the page text itself stays on disk
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "32"))
+
+# Bumped when the stored layout changes so older entries are rebuilt
+DOCUMENT_MODEL_VERSION = 1
+
+# File extension to function returning the text of each page
+PAGE_EXTRACTORS: Dict[str, Callable[[str], List[str]]] = {
+    "pdf": read_pdf_pages,
+    "docx": read_docx_pages,
+    "doc": read_doc_pages,
+}
+
+
+class PageIndexedDocument:
+    """
+    The text of an uploaded document, stored once and read by page.
+
+    The concatenated text lives in a UTF-8 file next to a small index of
+    where each page starts, both in characters (for offsets into the joined
+    text, as used by chunkers and citations) and in bytes (to seek straight
+    to a page). Only the index is held in memory.
+
+    Attributes:
+        content_hash: SHA-256 of the source file's bytes
+        char_offsets: Character offset of each page start, plus the total length
+        byte_offsets: Byte offset of each page start in the text file, plus its size
+        text_path: Path of the stored text
+        ocr_applied: Whether image-only pages were run through OCR
+    """
+
+    def __init__(self, content_hash: str, char_offsets: Sequence[int], byte_offsets: Sequence[int], text_path: str,
+                 ocr_applied: bool = False):
+        self.content_hash = content_hash
+        self.char_offsets = list(char_offsets)
+        self.byte_offsets = list(byte_offsets)
+        self.text_path = text_path
+        self.ocr_applied = ocr_applied
+
+    @property
+    def page_count(self) -> int:
+        return len(self.char_offsets) - 1
+
+    @property
+    def empty_pages(self) -> List[int]:
+        """Zero-based pages without any text"""
+        return [index for index in range(self.page_count) if self.byte_offsets[index] == self.byte_offsets[index + 1]]
+
+    def __len__(self) -> int:
+        """Length of the document text in characters"""
+        return self.char_offsets[-1]
+
+    def _read_bytes(self, start: int, end: int) -> str:
+        with open(self.text_path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start).decode("utf-8")
+
+    def page(self, index: int) -> str:
+        """Text of one zero-based page"""
+        if not 0 <= index < self.page_count:
+            raise IndexError(f"Page {index} out of range for a {self.page_count}-page document")
+        return self._read_bytes(self.byte_offsets[index], self.byte_offsets[index + 1])
+
+    def page_range(self, first: int, last: int) -> str:
+        """Joined text of pages first..last inclusive, read in one seek"""
+        first, last = max(first, 0), min(last, self.page_count - 1)
+        if first > last:
+            return ""
+        return self._read_bytes(self.byte_offsets[first], self.byte_offsets[last + 1])
+
+    def iter_pages(self, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Yields (page index, page text) for pages [start, end) without reading the rest.
+        """
+        end = self.page_count if end is None else min(end, self.page_count)
+        if start >= end:
+            return
+        with open(self.text_path, "rb") as f:
+            f.seek(self.byte_offsets[start])
+            for index in range(start, end):
+                yield index, f.read(self.byte_offsets[index + 1] - self.byte_offsets[index]).decode("utf-8")
+
+    def pages(self) -> List[str]:
+        """All page texts, for callers that need them together"""
+        return [text for _, text in self.iter_pages()]
+
+    def text(self) -> str:
+        """The full document text, identical to joining the pages"""
+        return self._read_bytes(0, self.byte_offsets[-1])
+
+    def page_for_offset(self, offset: int) -> int:
+        """
+        Zero-based page containing a character offset into the joined text.
+
+        Empty pages share their start offset with the next page, so an offset
+        there resolves to the page that actually holds the character.
+        """
+        if not 0 <= offset < len(self):
+            raise IndexError(f"Offset {offset} out of range for a {len(self)}-character document")
+        return bisect.bisect_right(self.char_offsets, offset) - 1
+
+    def page_span(self, start: int, end: int) -> Tuple[int, int]:
+        """First and last zero-based pages covered by the character range [start, end)"""
+        return self.page_for_offset(start), self.page_for_offset(max(end - 1, start))
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": DOCUMENT_MODEL_VERSION,
+            "contentHash": self.content_hash,
+            "charOffsets": self.char_offsets,
+            "byteOffsets": self.byte_offsets,
+            "ocr": self.ocr_applied,
+        }
+
+
+def has_page_extractor(path: str) -> bool:
+    """Whether load_document can read a file of this type"""
+    return path.rsplit(".", 1)[-1].lower() in PAGE_EXTRACTORS
+
+
+def _entry_paths(content_hash: str) -> Tuple[str, str]:
+    """Page text and index are stored with the document blob's derived artifacts"""
+    folder = derived_dir(content_hash)
+    return os.path.join(folder, "pages.txt"), os.path.join(folder, "pages.json")
+
+
+def build_document(pages: Sequence[str], content_hash: str, ocr_applied: bool = False) -> PageIndexedDocument:
+    """
+    Stores extracted page text under its content hash and returns the document.
+
+    Files are written to temporary names and renamed, so concurrent builds of
+    the same content leave one complete entry.
+    """
+    text_path, index_path = _entry_paths(content_hash)
+    os.makedirs(os.path.dirname(text_path), exist_ok=True)
+    char_offsets, byte_offsets = [0], [0]
+    temp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(text_path + temp_suffix, "wb") as f:
+        for page_text in pages:
+            encoded = (page_text or "").encode("utf-8")
+            f.write(encoded)
+            char_offsets.append(char_offsets[-1] + len(page_text or ""))
+            byte_offsets.append(byte_offsets[-1] + len(encoded))
+    document = PageIndexedDocument(content_hash, char_offsets, byte_offsets, text_path, ocr_applied)
+    with open(index_path + temp_suffix, "w") as f:
+        json.dump(document.to_dict(), f)
+    os.replace(text_path + temp_suffix, text_path)
+    # The index goes last: its presence marks a complete entry
+    os.replace(index_path + temp_suffix, index_path)
+    return document
+
+
+def _load_entry(content_hash: str) -> Optional[PageIndexedDocument]:
+    text_path, index_path = _entry_paths(content_hash)
+    if not (os.path.exists(index_path) and os.path.exists(text_path)):
+        return None
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable document index {index_path}, rebuilding: {e}")
+        return None
+    if index.get("version") != DOCUMENT_MODEL_VERSION or index["byteOffsets"][-1] != os.path.getsize(text_path):
+        return None
+    return PageIndexedDocument(
+        content_hash, index["charOffsets"], index["byteOffsets"], text_path, index.get("ocr", False)
+    )
+
+
+def _extract_pages(path: str, extension: str, progress_id: Optional[str]) -> Tuple[List[str], bool]:
+    """
+    Extracts a document's pages, running PDF pages without a text layer through OCR.
+
+    Returns:
+        Tuple of (page texts, whether OCR was applied); OCR counts as applied
+        only when every image-only page was recognised, so pages that failed
+        (e.g. without the tesseract or poppler binaries) are retried later
+    """
+    pages = list(PAGE_EXTRACTORS[extension](path))
+    if extension != "pdf" or not ocr_available():
+        return pages, False
+    empty = [index for index, page_text in enumerate(pages) if not (page_text or "").strip()]
+    if not empty:
+        return pages, True
+    logger.info(f"Running OCR on {len(empty)} image-only pages of '{path}'")
+    recognised = ocr_pages(path, empty, progress_id)
+    for index, page_text in recognised.items():
+        pages[index] = page_text
+    return pages, len(recognised) == len(empty)
+
+
+# (path, size, mtime) to loaded document, most recently used last
+_documents: "OrderedDict[Tuple[str, int, float], PageIndexedDocument]" = OrderedDict()
+_documents_lock = threading.Lock()
+
+
+def load_document(path: str, progress_id: Optional[str] = None) -> PageIndexedDocument:
+    """
+    Returns the page-indexed text of an uploaded document, extracting it only once.
+
+    Documents are keyed by content hash, so re-uploading the same file reuses
+    the stored text. Repeat loads of an unchanged file skip hashing as well.
+    A document stored with image-only pages before OCR was available is
+    extracted again once it is.
+
+    Args:
+        path: Path to the uploaded document
+        progress_id: Progress tracker key to report OCR progress under, if any
+
+    Returns:
+        PageIndexedDocument
+
+    Raises:
+        FileNotFoundError: If the document does not exist
+        ValueError: If there is no page extractor for the file type
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Document '{path}' not found.")
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    with _documents_lock:
+        if key in _documents:
+            _documents.move_to_end(key)
+            return _documents[key]
+
+    extension = path.rsplit(".", 1)[-1].lower()
+    if extension not in PAGE_EXTRACTORS:
+        raise ValueError(f"No page extractor for '.{extension}' documents")
+
+    content_hash = file_sha256(path)
+    document = _load_entry(content_hash)
+    if document is not None and extension == "pdf" and not document.ocr_applied \
+            and document.empty_pages and ocr_available():
+        document = None
+    if document is None:
+        pages, ocr_applied = _extract_pages(path, extension, progress_id)
+        document = build_document(pages, content_hash, ocr_applied)
+        logger.info(f"Stored {document.page_count} pages of '{path}' as {content_hash[:12]}")
+
+    with _documents_lock:
+        _documents[key] = document
+        while len(_documents) > DOCUMENT_CACHE_SIZE:
+            _documents.popitem(last=False)
+    return document
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+logger = logging.getLogger(__name__)
+
+# Set to "false" to call the embeddings API for every text
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "true").lower() not in ("0", "false", "no")
+# Where cached vectors are stored, one directory per embedding model
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join("vectorstore", "embedding_cache"))
+# Size of each model's vector file; least recently used vectors are replaced beyond it
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+
+_DIGEST_SIZE = 32
+
+
+def text_digest(text: str) -> bytes:
+    """Cache key of a text: the SHA-256 of its UTF-8 bytes"""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Content-hash to vector cache backed by memory-mapped files.
+
+    Vectors live in a float32 matrix with one row per slot, next to a matrix
+    of the text digests in each slot and a last-used counter per slot. Only
+    the digest-to-slot dict is held in memory; vectors are paged in by the OS
+    as they are read. When every slot is taken, the least recently used
+    entries are overwritten.
+
+    Files are created on the first insert, once the vector dimension is known.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = EMBEDDING_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._slots: Dict[bytes, int] = {}
+        self._vectors = self._digests = self._ticks = None
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self._open()
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _memmaps(self, dim: int, capacity: int, mode: str):
+        self._vectors = np.memmap(os.path.join(self.directory, "vectors.f32"), dtype=np.float32,
+                                  mode=mode, shape=(capacity, dim))
+        self._digests = np.memmap(os.path.join(self.directory, "digests.bin"), dtype=f"S{_DIGEST_SIZE}",
+                                  mode=mode, shape=(capacity,))
+        self._ticks = np.memmap(os.path.join(self.directory, "ticks.i64"), dtype=np.int64,
+                                mode=mode, shape=(capacity,))
+
+    def _open(self):
+        if not os.path.exists(self._meta_path):
+            return
+        try:
+            with open(self._meta_path, "r") as f:
+                meta = json.load(f)
+            self._memmaps(meta["dim"], meta["capacity"], "r+")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable embedding cache at {self.directory}: {e}")
+            self._vectors = self._digests = self._ticks = None
+            return
+        used = np.flatnonzero(self._ticks)
+        self._slots = {bytes(self._digests[slot]).ljust(_DIGEST_SIZE, b"\0"): int(slot) for slot in used}
+        self._tick = int(self._ticks.max()) if len(used) else 0
+        logger.info(f"Opened embedding cache at {self.directory} with {len(self._slots)} vectors")
+
+    def _create(self, dim: int):
+        capacity = max(1, self.max_bytes // (dim * 4))
+        os.makedirs(self.directory, exist_ok=True)
+        self._memmaps(dim, capacity, "w+")
+        with open(self._meta_path, "w") as f:
+            json.dump({"dim": dim, "capacity": capacity}, f)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get_many(self, digests: Sequence[bytes]) -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """
+        Looks up many digests at once.
+
+        Returns:
+            Tuple of (a vector or None per digest, indexes of the misses)
+        """
+        with self._lock:
+            found = [self._slots.get(digest) for digest in digests]
+            hit_indexes = [index for index, slot in enumerate(found) if slot is not None]
+            if hit_indexes:
+                # Another process sharing the files may have reused a slot since it was indexed
+                stored = self._digests[[found[index] for index in hit_indexes]]
+                expected = np.array([digests[index] for index in hit_indexes], dtype=f"S{_DIGEST_SIZE}")
+                for index in np.asarray(hit_indexes)[stored != expected]:
+                    self._slots.pop(digests[index], None)
+                    found[index] = None
+            hit_slots = [slot for slot in found if slot is not None]
+            vectors = np.array(self._vectors[hit_slots]) if hit_slots else None
+            if hit_slots:
+                self._tick += 1
+                self._ticks[hit_slots] = self._tick
+            results, missing, row = [], [], 0
+            for index, slot in enumerate(found):
+                if slot is None:
+                    results.append(None)
+                    missing.append(index)
+                else:
+                    results.append(vectors[row])
+                    row += 1
+            self.hits += len(hit_slots)
+            self.misses += len(missing)
+            return results, missing
+
+    def put_many(self, digests: Sequence[bytes], vectors: Sequence[Sequence[float]]) -> None:
+        """Stores vectors, replacing the least recently used entries when full"""
+        if not digests:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self._vectors is None:
+                self._create(matrix.shape[1])
+            if matrix.shape[1] != self._vectors.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match cache dimension {self._vectors.shape[1]}"
+                )
+            new = {}
+            for digest, vector in zip(digests, matrix):
+                if digest not in self._slots:
+                    new[digest] = vector
+            # A batch larger than the cache keeps its last entries
+            new_items = list(new.items())[-len(self._ticks):]
+            if not new_items:
+                return
+            free = np.flatnonzero(self._ticks == 0)[:len(new_items)]
+            shortfall = len(new_items) - len(free)
+            if shortfall > 0:
+                # Only occupied slots are candidates; empty ones are already in free
+                ticks = np.array(self._ticks)
+                ticks[free] = np.iinfo(np.int64).max
+                evicted = np.argpartition(ticks, shortfall - 1)[:shortfall]
+                for slot in evicted:
+                    self._slots.pop(bytes(self._digests[slot]).ljust(_DIGEST_SIZE, b"\0"), None)
+                free = np.concatenate([free, evicted])
+                logger.info(f"Evicted {shortfall} least recently used vectors from {self.directory}")
+            self._tick += 1
+            for slot, (digest, vector) in zip(free, new_items):
+                slot = int(slot)
+                self._vectors[slot] = vector
+                self._digests[slot] = digest
+                self._ticks[slot] = self._tick
+                self._slots[digest] = slot
+            self._vectors.flush()
+            self._digests.flush()
+            self._ticks.flush()
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._slots), "hits": self.hits, "misses": self.misses}
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that only calls the underlying model for uncached texts.
+
+    Duplicate texts within a call are embedded once.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str], chunk_size: Optional[int] = None) -> List[List[float]]:
+        digests = [text_digest(text) for text in texts]
+        vectors, missing = self.cache.get_many(digests)
+        if missing:
+            unique = {}
+            for index in missing:
+                unique.setdefault(digests[index], texts[index])
+            kwargs = {"chunk_size": chunk_size} if chunk_size else {}
+            embedded = self.embeddings.embed_documents(list(unique.values()), **kwargs)
+            self.cache.put_many(list(unique), embedded)
+            by_digest = dict(zip(unique, embedded))
+            for index in missing:
+                vectors[index] = by_digest[digests[index]]
+            logger.info(f"Embedded {len(unique)} texts, {len(texts) - len(missing)} of {len(texts)} from cache")
+        return [list(map(float, vector)) for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embeddings_model(embeddings: Optional[Embeddings] = None) -> Embeddings:
+    """
+    Returns the embeddings model to use, wrapped in the shared cache for its model name.
+
+    Args:
+        embeddings: Underlying model, OpenAIEmbeddings by default
+    """
+    embeddings = embeddings or OpenAIEmbeddings()
+    if not EMBEDDING_CACHE:
+        return embeddings
+    model_name = str(getattr(embeddings, "model", type(embeddings).__name__))
+    dimensions = getattr(embeddings, "dimensions", None)
+    if dimensions:
+        model_name += f"-{dimensions}"
+    directory = os.path.join(EMBEDDING_CACHE_DIR, re.sub(r"[^A-Za-z0-9._-]", "_", model_name))
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = EmbeddingCache(directory)
+        return CachedEmbeddings(embeddings, _caches[directory])
@@ -0,0 +1,192 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Set to "false" to send every question to the model
+FAST_PATH_EXTRACTION = os.getenv("FAST_PATH_EXTRACTION", "true").lower() not in ("0", "false", "no")
+
+# Characters of surrounding text kept as evidence for an extracted value
+SNIPPET_CONTEXT_CHARS = 40
+
+
+@dataclass(frozen=True)
+class FieldExtraction:
+    """
+    A value read from the proposal text without a model call.
+
+    Attributes:
+        value: The extracted value, formatted for the form field
+        page: Zero-based index of the page the value was found on
+        snippet: The matched text with a little surrounding context
+    """
+    value: Any
+    page: int
+    snippet: str
+
+
+# Extractor name to function returning (value, match start, match end) candidates for a page
+EXTRACTORS: Dict[str, Callable[[str, Mapping[str, Any]], List[tuple]]] = {}
+
+
+def register_extractor(name: str):
+    """Registers an extractor under a question id or an aiEvaluation.extractor name"""
+    def decorator(func):
+        EXTRACTORS[name] = func
+        return func
+    return decorator
+
+
+def extractor_for(question_config: Mapping[str, Any]) -> Optional[str]:
+    """
+    Returns the registered extractor for a question, if any.
+
+    An explicit aiEvaluation.extractor name wins over the question id; setting it
+    to an empty string disables the fast path for that question.
+    """
+    ai_evaluation = question_config.get("aiEvaluation") or {}
+    name = ai_evaluation.get("extractor", question_config.get("id"))
+    return name if name in EXTRACTORS else None
+
+
+def extract_field(question_config: Mapping[str, Any], pages: Sequence[str]) -> Optional[FieldExtraction]:
+    """
+    Answers a question from the proposal pages with its registered extractor.
+
+    Args:
+        question_config: The question configuration
+        pages: The proposal text, one entry per page
+
+    Returns:
+        FieldExtraction, or None when the question has no extractor, nothing
+        matches, or the matches disagree and the model should decide
+    """
+    if not FAST_PATH_EXTRACTION:
+        return None
+    name = extractor_for(question_config)
+    if name is None:
+        return None
+
+    found = []
+    for page_index, page_text in enumerate(pages):
+        for value, start, end in EXTRACTORS[name](page_text or "", question_config):
+            found.append((value, page_index, page_text, start, end))
+
+    distinct = {str(value) for value, *_ in found}
+    if len(distinct) != 1:
+        if len(distinct) > 1:
+            logger.info(f"Extractor {name} found conflicting values {sorted(distinct)}, using the model")
+        return None
+
+    value, page_index, page_text, start, end = found[0]
+    snippet = page_text[max(start - SNIPPET_CONTEXT_CHARS, 0):end + SNIPPET_CONTEXT_CHARS]
+    return FieldExtraction(value=value, page=page_index, snippet=" ".join(snippet.split()))
+
+
+_MONTHS = (
+    r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?|"
+    r"Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)"
+)
+DATE_PATTERN = (
+    r"(?:\d{1,2}[/-]\d{1,2}[/-]\d{4}|\d{4}-\d{2}-\d{2}|"
+    + _MONTHS + r"\.?\s+\d{1,2},?\s+\d{4}|\d{1,2}\s+" + _MONTHS + r"\.?\s+\d{4})"
+)
+_DATE_FORMATS = (
+    "%m/%d/%Y", "%m-%d-%Y", "%Y-%m-%d",
+    "%B %d %Y", "%b %d %Y", "%d %B %Y", "%d %b %Y",
+)
+
+
+def parse_date(text: str) -> Optional[datetime]:
+    """Parses the date formats matched by DATE_PATTERN"""
+    cleaned = " ".join(text.replace(",", " ").replace(".", " ").split())
+    if cleaned[:4].lower() == "sept":
+        cleaned = "Sep" + cleaned[4:]
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def _form_date_format(question_config: Mapping[str, Any]) -> str:
+    """Converts the schema's date format (e.g. MM-dd-yyyy) to a strftime pattern"""
+    form_format = question_config.get("format") or "MM-dd-yyyy"
+    return form_format.replace("yyyy", "%Y").replace("MM", "%m").replace("dd", "%d")
+
+
+def _format_date(text: str, question_config: Mapping[str, Any]) -> Optional[str]:
+    parsed = parse_date(text)
+    return parsed.strftime(_form_date_format(question_config)) if parsed else None
+
+
+CONTRACT_NUMBER_PATTERN = re.compile(
+    # PDF text extraction often puts a space before the hyphens
+    r"\bContract\s*(?:No\.?|Number|Num\.?|#)\s*[:#]?\s*([A-Z0-9]{2,}(?: ?-[A-Z0-9]+)+|[A-Z0-9]{8,})",
+    re.IGNORECASE,
+)
+
+
+@register_extractor("contractNumber")
+def extract_contract_number(text, question_config):
+    return [
+        (match.group(1).replace(" ", "").upper(), match.start(), match.end())
+        for match in CONTRACT_NUMBER_PATTERN.finditer(text)
+        if any(char.isdigit() for char in match.group(1))
+    ]
+
+
+TOTAL_HOURS_PATTERN = re.compile(
+    r"\btotal\s+(?:proposed\s+)?(?:labor\s+)?hours\b\s*(?:[:=]|of|is|are)?\s*(\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?"
+    r"|\b(\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?\s+total\s+(?:proposed\s+)?(?:labor\s+)?hours\b",
+    re.IGNORECASE,
+)
+
+
+@register_extractor("proposedHours")
+def extract_total_labor_hours(text, question_config):
+    return [
+        (int((match.group(1) or match.group(2)).replace(",", "")), match.start(), match.end())
+        for match in TOTAL_HOURS_PATTERN.finditer(text)
+    ]
+
+
+RESPONSE_DATE_PATTERN = re.compile(
+    r"\b(?:responses?\s+(?:are\s+|is\s+)?due|due\s+date|respond\s+(?:by|no\s+later\s+than)|"
+    r"required\s+response\s+date)\b[^.\n]{0,30}?(" + DATE_PATTERN + r")",
+    re.IGNORECASE,
+)
+
+
+@register_extractor("responseDate")
+def extract_response_date(text, question_config):
+    candidates = []
+    for match in RESPONSE_DATE_PATTERN.finditer(text):
+        value = _format_date(match.group(1), question_config)
+        if value:
+            candidates.append((value, match.start(), match.end()))
+    return candidates
+
+
+PERIOD_OF_PERFORMANCE_PATTERN = re.compile(
+    r"\bperiod\s+of\s+performance\b[^.\n]{0,40}?(" + DATE_PATTERN + r")\s*"
+    r"(?:-|–|to|through|thru)\s*(" + DATE_PATTERN + r")",
+    re.IGNORECASE,
+)
+
+
+@register_extractor("deliveryPeriod")
+def extract_period_of_performance(text, question_config):
+    candidates = []
+    for match in PERIOD_OF_PERFORMANCE_PATTERN.finditer(text):
+        start_date, end_date = parse_date(match.group(1)), parse_date(match.group(2))
+        if start_date and end_date and start_date <= end_date:
+            value = f"{start_date.strftime('%m-%d-%Y')} to {end_date.strftime('%m-%d-%Y')}"
+            candidates.append((value, match.start(), match.end()))
+    return candidates
+
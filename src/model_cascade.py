@@ -0,0 +1,155 @@
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Mapping, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+STRONG_MODEL_NAME = os.getenv("MODEL_NAME")
+# Cheaper model tried first on cascaded questions; the cascade is off when unset
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME")
+
+# "fast" uses only the fast model, "cascade" tries the fast model and escalates to
+# the strong one on low confidence or failed validation, "strong" skips the fast model
+MODEL_ROUTES = ("fast", "cascade", "strong")
+DEFAULT_MODEL_ROUTE = "strong"
+
+T = TypeVar("T")
+
+
+def resolve_route(question_config: Mapping[str, Any], routing: Optional[Mapping[str, Any]] = None) -> str:
+    """
+    Picks the model route for a question.
+
+    A question's own "modelRoute" wins, then the routing table's entry for its
+    responseType, then the table's default.
+
+    Args:
+        question_config: The question configuration
+        routing: The schema's metadata.modelRouting table, if any
+
+    Returns:
+        One of MODEL_ROUTES
+    """
+    routing = routing or {}
+    route = (
+        question_config.get("modelRoute")
+        or routing.get("responseTypes", {}).get(question_config.get("responseType"))
+        or routing.get("default")
+        or DEFAULT_MODEL_ROUTE
+    )
+    if route not in MODEL_ROUTES:
+        raise ValueError(f"Unknown model route '{route}' for question {question_config.get('id')}")
+    return route
+
+
+class CascadeStats:
+    """
+    Thread-safe per-response-type counts of how cascaded calls were answered
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._types = {}
+
+    def record(self, response_type: str, route: str, answered_by: str, reason: Optional[str] = None) -> None:
+        with self._lock:
+            counts = self._types.setdefault(response_type, {
+                "questions": 0, "fastCalls": 0, "strongCalls": 0,
+                "answeredFast": 0, "escalated": 0, "escalationReasons": {},
+            })
+            counts["questions"] += 1
+            if route != "strong":
+                counts["fastCalls"] += 1
+            if answered_by == "strong":
+                counts["strongCalls"] += 1
+            else:
+                counts["answeredFast"] += 1
+            if reason and route == "cascade":
+                counts["escalated"] += 1
+                counts["escalationReasons"][reason] = counts["escalationReasons"].get(reason, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Per-response-type counts with escalation rates, plus totals"""
+        with self._lock:
+            types = {
+                key: {**counts, "escalationReasons": dict(counts["escalationReasons"])}
+                for key, counts in self._types.items()
+            }
+        for counts in types.values():
+            counts["escalationRate"] = (
+                round(counts["escalated"] / counts["fastCalls"], 4) if counts["fastCalls"] else None
+            )
+        totals = {
+            key: sum(counts[key] for counts in types.values())
+            for key in ("questions", "fastCalls", "strongCalls", "answeredFast", "escalated")
+        }
+        return {
+            "fastModel": FAST_MODEL_NAME,
+            "strongModel": STRONG_MODEL_NAME,
+            **totals,
+            "escalationRate": round(totals["escalated"] / totals["fastCalls"], 4) if totals["fastCalls"] else None,
+            "responseTypes": types,
+        }
+
+
+# Counts across every evaluation in this process
+cascade_stats = CascadeStats()
+
+
+def run_cascade(
+    route: str,
+    attempt: Callable[[str], T],
+    escalation_reason: Callable[[T], Optional[str]],
+    response_type: str,
+    strong_model: Optional[str] = STRONG_MODEL_NAME,
+    stats: Optional[CascadeStats] = None,
+) -> T:
+    """
+    Runs a model call along a route, escalating from the fast to the strong model.
+
+    Args:
+        route: One of MODEL_ROUTES
+        attempt: Makes the call with the given model name and returns its result
+        escalation_reason: Returns why a fast result is not good enough, or None to keep it
+        response_type: The question's responseType, for statistics
+        strong_model: Model used for strong and escalated calls
+        stats: Optional per-run statistics, recorded in addition to cascade_stats
+
+    Returns:
+        The result of the last call made
+    """
+    if not FAST_MODEL_NAME or FAST_MODEL_NAME == strong_model:
+        route = "strong"
+
+    recorders: List[CascadeStats] = [cascade_stats] + ([stats] if stats else [])
+    if route == "strong":
+        result = attempt(strong_model)
+        for recorder in recorders:
+            recorder.record(response_type, route, "strong")
+        return result
+
+    try:
+        result = attempt(FAST_MODEL_NAME)
+        reason = escalation_reason(result)
+    except Exception as e:
+        if route == "fast":
+            raise
+        logger.warning(f"Fast model call failed, escalating: {str(e)}")
+        reason = "error"
+
+    if reason is None or route == "fast":
+        if reason:
+            logger.warning(f"Keeping fast model result for {response_type} despite {reason}")
+        for recorder in recorders:
+            recorder.record(response_type, route, "fast")
+        return result
+
+    logger.info(f"Escalating {response_type} question to {strong_model}: {reason}")
+    result = attempt(strong_model)
+    for recorder in recorders:
+        recorder.record(response_type, route, "strong", reason)
+    return result
@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Sequence
+
+from .progress_tracking import progress_tracker
+from .utils import process_pool_context
+
+try:
+    import pytesseract
+    from pdf2image import convert_from_path
+except ImportError:  # Optional; image-only pages stay empty without them
+    pytesseract = None
+    convert_from_path = None
+
+logger = logging.getLogger(__name__)
+
+# Set to "false" to leave image-only pages empty
+OCR_ENABLED = os.getenv("OCR_ENABLED", "true").lower() not in ("0", "false", "no")
+# Worker processes for OCR, shared by all documents; each page is rendered and recognised in a worker
+OCR_PROCESSES = int(os.getenv("OCR_PROCESSES", str(min(os.cpu_count() or 1, 4))))
+# Resolution pages are rendered at before recognition
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+# Tesseract language codes, e.g. "eng" or "eng+fra"
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+# Recognised text by rendered page hash, so the same scan is only read once
+OCR_CACHE_DIR = os.getenv(
+    "OCR_CACHE_DIR", os.path.join(os.getenv("BASE_UPLOAD_FOLDER", "uploads"), ".ocr")
+)
+
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def _get_ocr_pool() -> ProcessPoolExecutor:
+    """The shared OCR worker pool, started on first use"""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ProcessPoolExecutor(max_workers=max(1, OCR_PROCESSES), mp_context=process_pool_context())
+        return _ocr_pool
+
+
+def _reset_ocr_pool() -> None:
+    """Drops a broken pool so the next call starts a fresh one"""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=False)
+        _ocr_pool = None
+
+
+def ocr_available() -> bool:
+    """Whether OCR is enabled and its libraries are installed"""
+    return OCR_ENABLED and pytesseract is not None
+
+
+def _ocr_page(pdf_path: str, index: int, dpi: int, language: str, cache_dir: str):
+    """
+    Renders and recognises one zero-based page, returning (text, cached).
+
+    Runs in a worker process. The cache key is the hash of the rendered
+    pixels and OCR settings, so identical scans hit the cache whichever file
+    they come from.
+    """
+    image = convert_from_path(pdf_path, dpi=dpi, first_page=index + 1, last_page=index + 1)[0]
+    digest = hashlib.sha256(f"{dpi}:{language}:{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    cache_path = os.path.join(cache_dir, f"{digest.hexdigest()}.txt")
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read(), True
+
+    text = pytesseract.image_to_string(image, lang=language)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, cache_path)
+    return text, False
+
+
+def ocr_pages(pdf_path: str, page_indexes: Sequence[int], progress_id: Optional[str] = None) -> Dict[int, str]:
+    """
+    Recognises the text of image-only PDF pages in parallel.
+
+    Args:
+        pdf_path: Path to the PDF
+        page_indexes: Zero-based pages to recognise
+        progress_id: Progress tracker key to report progress under, if any
+
+    Returns:
+        Recognised text by page index; pages that fail are left out
+    """
+    if not ocr_available() or not page_indexes:
+        return {}
+
+    os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+    started = time.perf_counter()
+    if progress_id:
+        progress_tracker.initialize_progress(progress_id, len(page_indexes))
+
+    results, cached = {}, 0
+    pool = _get_ocr_pool()
+    futures = {
+        pool.submit(_ocr_page, pdf_path, index, OCR_DPI, OCR_LANGUAGE, OCR_CACHE_DIR): index
+        for index in page_indexes
+    }
+    broken = False
+    for done, future in enumerate(as_completed(futures), start=1):
+        index = futures[future]
+        try:
+            text, from_cache = future.result()
+            results[index] = text
+            cached += from_cache
+        except BrokenProcessPool as e:
+            broken = True
+            logger.error(f"OCR worker died on page {index + 1} of '{pdf_path}': {e}")
+        except Exception as e:
+            logger.error(f"OCR failed for page {index + 1} of '{pdf_path}': {e}")
+        if progress_id:
+            progress_tracker.update_progress(progress_id, done, f"OCR page {index + 1}")
+    if broken:
+        _reset_ocr_pool()
+
+    if progress_id:
+        progress_tracker.complete_progress(progress_id)
+    logger.info(
+        f"OCR read {len(results)} of {len(page_indexes)} pages of '{pdf_path}' "
+        f"({cached} cached) in {time.perf_counter() - started:.2f}s"
+    )
+    return results
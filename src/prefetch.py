@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
+from .blob_store import read_derived, write_derived
+from .core import get_project_folder
+from .document_model import load_document
+from .project_index import project_indexes
+from .prompt_manager import REQUIREMENTS_ARTIFACT, REQUIREMENTS_PROMPT_VERSION, generate_requirements
+from .table_extractor import load_tables
+from .utils import parse_requirements
+
+logger = logging.getLogger(__name__)
+
+# Set to "true" to start document processing and requirement derivation as soon
+# as a project has both documents
+UPLOAD_PREFETCH = os.getenv("UPLOAD_PREFETCH", "false").lower() in ("1", "true", "yes")
+# Set to "false" to leave the response index to be built on first search
+PREFETCH_EMBEDDINGS = os.getenv("PREFETCH_EMBEDDINGS", "true").lower() not in ("0", "false", "no")
+# Projects prefetched at the same time
+PREFETCH_MAX_WORKERS = int(os.getenv("PREFETCH_MAX_WORKERS", "2"))
+# Longest an endpoint waits for a running prefetch before doing the work itself
+PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "300"))
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS, thread_name_prefix="prefetch")
+_prefetch_lock = threading.Lock()
+_prefetch_futures = {}  # project id -> Future of the running prefetch
+_prefetch_pending = set()  # projects uploaded to again while a prefetch ran
+_prefetch_status: Dict[str, Dict] = {}
+
+
+def upload_progress_key(project_id: str) -> str:
+    """Progress tracker key for upload processing, kept apart from the evaluation progress"""
+    return f"{project_id}:upload"
+
+
+def _set_step(project_id: str, step: str, state: str, started: Optional[float] = None) -> None:
+    with _prefetch_lock:
+        status = _prefetch_status.setdefault(project_id, {"status": "running", "steps": {}})
+        entry = {"status": state}
+        if started is not None:
+            entry["seconds"] = round(time.perf_counter() - started, 2)
+        status["steps"][step] = entry
+
+
+def _derive_requirements(project_id: str, metadata_file: str, request_path: str, request_hash: str) -> None:
+    """Derives and stores requirements unless matching ones are already stored"""
+    requirements_source = {"requestHash": request_hash, "promptVersion": REQUIREMENTS_PROMPT_VERSION}
+    with open(metadata_file, "r") as f:
+        metadata = json.load(f)
+    if metadata.get("derived_requirements") and metadata.get("derived_requirements_source") == requirements_source:
+        return
+
+    requirements = read_derived(request_hash, REQUIREMENTS_ARTIFACT)
+    if not requirements:
+        requirements = parse_requirements(generate_requirements(load_document(request_path).text()))
+        if not requirements:
+            # Left for the endpoint to retry rather than stored as the result
+            raise ValueError("No requirements could be parsed from the request")
+        write_derived(request_hash, REQUIREMENTS_ARTIFACT, requirements)
+
+    # Re-read so edits made while the model ran are kept
+    with open(metadata_file, "r") as f:
+        metadata = json.load(f)
+    if os.path.abspath(metadata.get("requestPath") or "") != request_path:
+        logger.info(f"Request of project {project_id} changed during prefetch, discarding requirements")
+        return
+    metadata["derived_requirements"] = requirements
+    metadata["derived_requirements_source"] = requirements_source
+    with open(metadata_file, "w") as f:
+        json.dump(metadata, f)
+    logger.info(f"Prefetched {len(requirements)} requirements for project {project_id}")
+
+
+def _prefetch(project_id: str) -> None:
+    metadata_file = os.path.join(get_project_folder(project_id), "metadata.json")
+    with open(metadata_file, "r") as f:
+        metadata = json.load(f)
+    request_path = os.path.abspath(metadata["requestPath"])
+    response_path = os.path.abspath(metadata["responsePath"])
+
+    progress_id = upload_progress_key(project_id)
+    steps = [
+        ("requestText", lambda: load_document(request_path, progress_id=progress_id)),
+        ("responseText", lambda: load_document(response_path, progress_id=progress_id)),
+        ("responseTables", lambda: load_tables(response_path)),
+    ]
+    if PREFETCH_EMBEDDINGS:
+        steps.append(("responseIndex", lambda: project_indexes.get_or_build(response_path)))
+    steps.append((
+        "requirements",
+        lambda: _derive_requirements(project_id, metadata_file, request_path, load_document(request_path).content_hash),
+    ))
+
+    failed = False
+    for step, work in steps:
+        started = time.perf_counter()
+        _set_step(project_id, step, "running")
+        try:
+            work()
+            _set_step(project_id, step, "completed", started)
+        except Exception as e:
+            failed = True
+            logger.error(f"Prefetch step {step} failed for project {project_id}: {e}")
+            _set_step(project_id, step, "error", started)
+    with _prefetch_lock:
+        _prefetch_status[project_id]["status"] = "error" if failed else "completed"
+
+
+def _run_prefetch(project_id: str) -> None:
+    try:
+        _prefetch(project_id)
+    finally:
+        with _prefetch_lock:
+            rerun = project_id in _prefetch_pending
+            _prefetch_pending.discard(project_id)
+            if rerun:
+                _prefetch_status[project_id] = {"status": "running", "steps": {}}
+                _prefetch_futures[project_id] = _prefetch_executor.submit(_run_prefetch, project_id)
+            else:
+                _prefetch_futures.pop(project_id, None)
+
+
+def schedule_prefetch(project_id: str) -> bool:
+    """
+    Starts background processing of a project's documents when prefetch is enabled.
+
+    Extracts and page-indexes both documents (with OCR where needed), extracts
+    the response tables, builds the response index and derives the
+    requirements, storing each where the endpoints look for it.
+    An upload during a running prefetch queues one more run afterwards.
+
+    Returns:
+        True if a prefetch was started or queued
+    """
+    if not UPLOAD_PREFETCH:
+        return False
+    metadata_file = os.path.join(get_project_folder(project_id), "metadata.json")
+    try:
+        with open(metadata_file, "r") as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not (metadata.get("requestPath") and metadata.get("responsePath")):
+        return False
+
+    with _prefetch_lock:
+        if project_id in _prefetch_futures:
+            _prefetch_pending.add(project_id)
+        else:
+            _prefetch_status[project_id] = {"status": "running", "steps": {}}
+            _prefetch_futures[project_id] = _prefetch_executor.submit(_run_prefetch, project_id)
+    logger.info(f"Scheduled prefetch for project {project_id}")
+    return True
+
+
+def wait_for_prefetch(project_id: str, timeout: float = PREFETCH_WAIT_SECONDS) -> None:
+    """Blocks until a running prefetch of the project finishes, so its work is not repeated"""
+    deadline = time.monotonic() + timeout
+    while True:
+        with _prefetch_lock:
+            future = _prefetch_futures.get(project_id)
+        remaining = deadline - time.monotonic()
+        if future is None or remaining <= 0:
+            return
+        wait([future], timeout=remaining)
+        # A queued rerun replaces the future once this one ends
+        with _prefetch_lock:
+            if _prefetch_futures.get(project_id) is future:
+                return
+
+
+def get_prefetch_status(project_id: str) -> Dict:
+    with _prefetch_lock:
+        status = _prefetch_status.get(project_id)
+        if status is None:
+            return {"status": "not_started", "steps": {}}
+        return {"status": status["status"], "steps": dict(status["steps"])}
@@ -39,6 +39,13 @@ class ProgressTracker:
                 progress.current_section = current_section
                 progress.last_update = datetime.now(timezone.utc)
 
+    def set_total(self, project_id: str, total_items: int) -> None:
+        with self._lock:
+            if project_id in self._progress:
+                progress = self._progress[project_id]
+                progress.total_items = total_items
+                progress.last_update = datetime.now(timezone.utc)
+
     def complete_progress(self, project_id: str) -> None:
         with self._lock:
             if project_id in self._progress:
@@ -0,0 +1,158 @@
+import logging
+import os
+import pickle
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+from .blob_store import derived_dir
+from .core import embed_chunks
+from .document_model import load_document
+from .embedding_cache import get_embeddings_model
+from .utils import chunk_pages
+
+logger = logging.getLogger(__name__)
+
+# Combined on-disk size of the indexes kept loaded; least recently used ones are unloaded beyond it
+PROJECT_INDEX_MEMORY_MB = int(os.getenv("PROJECT_INDEX_MEMORY_MB", "512"))
+# Folder among a response blob's derived artifacts holding its index
+PROJECT_INDEX_DIRNAME = "response_index"
+
+# Map index data from disk instead of reading it into memory; flat indexes need IO_FLAG_MMAP_IFC
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | getattr(faiss, "IO_FLAG_MMAP", 0) \
+    | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+
+
+def index_path_for(content_hash: str) -> str:
+    """Where the index of a document with this content hash is stored"""
+    return os.path.join(derived_dir(content_hash), PROJECT_INDEX_DIRNAME)
+
+
+def _read_index(index_file: str):
+    """Reads a FAISS index memory-mapped where the index type supports it"""
+    if _MMAP_FLAGS:
+        try:
+            return faiss.read_index(index_file, _MMAP_FLAGS)
+        except RuntimeError as e:
+            logger.info(f"Reading {index_file} into memory, it cannot be memory-mapped: {e}")
+    return faiss.read_index(index_file)
+
+
+class ProjectIndexManager:
+    """
+    Loads the FAISS indexes of project responses on demand within a memory budget.
+
+    Indexes are stored with the response blob's derived artifacts, in the
+    same layout as FAISS.save_local, so projects sharing a response file
+    share one index and a new upload simply has a different hash. Indexes
+    are loaded on first use (memory-mapped where FAISS allows) and kept in
+    an LRU; once their combined size exceeds the budget, the least recently
+    used are dropped. They are written when built, so dropping one only
+    frees memory.
+    """
+
+    def __init__(self, memory_budget_bytes: int = PROJECT_INDEX_MEMORY_MB * 1024 * 1024):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._resident: "OrderedDict[str, tuple]" = OrderedDict()  # content hash -> (store, size)
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(size for _, size in self._resident.values())
+
+    def _admit(self, content_hash: str, store: FAISS, size: int) -> None:
+        with self._lock:
+            self._resident[content_hash] = (store, size)
+            self._resident.move_to_end(content_hash)
+            while len(self._resident) > 1 and self.resident_bytes > self.memory_budget_bytes:
+                evicted, _ = self._resident.popitem(last=False)
+                logger.info(f"Unloaded response index {evicted[:12]}")
+
+    def get(self, content_hash: str) -> Optional[FAISS]:
+        """
+        Returns the index of a document, loading it if needed.
+
+        Returns:
+            The FAISS store, or None when the document has not been indexed
+        """
+        with self._lock:
+            resident = self._resident.get(content_hash)
+            if resident is not None:
+                self._resident.move_to_end(content_hash)
+                return resident[0]
+
+        folder = index_path_for(content_hash)
+        index_file, store_file = os.path.join(folder, "index.faiss"), os.path.join(folder, "index.pkl")
+        if not (os.path.exists(index_file) and os.path.exists(store_file)):
+            return None
+        index = _read_index(index_file)
+        with open(store_file, "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        store = FAISS(get_embeddings_model(), index, docstore, index_to_docstore_id)
+        self._admit(content_hash, store, os.path.getsize(index_file) + os.path.getsize(store_file))
+        logger.info(f"Loaded response index {content_hash[:12]} ({index.ntotal} chunks)")
+        return store
+
+    def build(self, document_path: str) -> FAISS:
+        """
+        Indexes a response document and writes the index next to its blob.
+        """
+        document = load_document(document_path)
+        chunks = chunk_pages(document.pages())
+        if not chunks:
+            raise ValueError(f"No text to index in '{document_path}'")
+        texts, embeddings, metadatas = embed_chunks(chunks)
+        store = FAISS.from_embeddings(list(zip(texts, embeddings)), get_embeddings_model(), metadatas=metadatas)
+
+        folder = index_path_for(document.content_hash)
+        temp_folder = f"{folder}.{os.getpid()}.tmp"
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        store.save_local(temp_folder)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(temp_folder, folder)
+
+        size = sum(os.path.getsize(os.path.join(folder, name)) for name in ("index.faiss", "index.pkl"))
+        self._admit(document.content_hash, store, size)
+        logger.info(f"Built response index {document.content_hash[:12]} ({len(chunks)} chunks)")
+        return store
+
+    def get_or_build(self, document_path: str) -> FAISS:
+        """Returns the index of a document, building it on first use"""
+        content_hash = load_document(document_path).content_hash
+        with self._lock:
+            build_lock = self._build_locks.setdefault(content_hash, threading.Lock())
+        with build_lock:
+            store = self.get(content_hash)
+            return store if store is not None else self.build(document_path)
+
+    def search(self, document_path: str, query: str, k: int = 5) -> List[Dict]:
+        """
+        Finds the chunks of a document closest to a query.
+
+        Returns:
+            {"text", "score", and the chunk's offsets and pages} dicts, best first
+        """
+        store = self.get_or_build(document_path)
+        return [
+            {"text": document.page_content, "score": float(score), **document.metadata}
+            for document, score in store.similarity_search_with_score(query, k=k)
+        ]
+
+    def invalidate(self, content_hash: str) -> None:
+        """Unloads a document's index"""
+        with self._lock:
+            self._resident.pop(content_hash, None)
+
+    def remove(self, content_hash: str) -> None:
+        """Unloads a document's index and deletes it from disk"""
+        self.invalidate(content_hash)
+        shutil.rmtree(index_path_for(content_hash), ignore_errors=True)
+
+
+# Global index manager instance
+project_indexes = ProjectIndexManager()
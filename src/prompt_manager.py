@@ -5,7 +5,17 @@ from dotenv import load_dotenv
 import openai
 import json
 import colorlog
-from .utils import read_pdf
+from concurrent.futures import ThreadPoolExecutor
+from .model_cascade import resolve_route, run_cascade
+from .utils import (
+    JsonObjectStreamParser,
+    estimate_tokens,
+    iter_unique_requirements,
+    merge_requirements,
+    parse_requirements,
+    read_pdf,
+    split_text_by_token_budget,
+)
 handler = colorlog.StreamHandler()
 handler.setFormatter(colorlog.ColoredFormatter(
     '%(log_color)s%(levelname)s:%(name)s:%(message)s'
@@ -20,12 +30,31 @@ load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 model_name  = os.getenv("MODEL_NAME")
 
-# Function to generate the requirements checklist/questions from the sole-source request
-def generate_requirements(sole_source_request):
-    prompt = f"""
+# Bump whenever the requirements prompt changes so stored requirements are regenerated
+REQUIREMENTS_PROMPT_VERSION = "3"
+# Derived-artifact name requirements are shared under, per request document blob
+REQUIREMENTS_ARTIFACT = f"requirements-v{REQUIREMENTS_PROMPT_VERSION}.json"
+
+# Requests larger than this (estimated tokens) are extracted in parallel chunks
+REQUIREMENTS_CHUNK_TOKENS = int(os.getenv("REQUIREMENTS_CHUNK_TOKENS", "6000"))
+REQUIREMENTS_MAX_WORKERS = int(os.getenv("REQUIREMENTS_MAX_WORKERS", "4"))
+# Chunks smaller than this are not split again when their extraction is cut off
+REQUIREMENTS_MIN_SPLIT_TOKENS = 500
+# Follow-up completions a cut-off requirements stream may continue with
+REQUIREMENTS_MAX_CONTINUATIONS = int(os.getenv("REQUIREMENTS_MAX_CONTINUATIONS", "3"))
+
+def build_requirements_prompt(sole_source_request, part=None, total_parts=None):
+    if part is None:
+        document_intro = "Here is the sole-source request document:"
+    else:
+        document_intro = (
+            f"Here is part {part} of {total_parts} of the sole-source request document. "
+            "List only the requirements stated or implied in this part:"
+        )
+    return f"""
     You are an expert contract analyst. Your task is to carefully analyze the following sole-source request and extract a comprehensive list of requirements, specifications, and goals that the vendor must meet. Consider technical, delivery, compliance, and any other important factors. Provide the list in a structured format, breaking down each requirement into a clear statement or question that can be used for further evaluation. Focus on identifying both explicit and implicit needs.
 
-    Here is the sole-source request document:
+    {document_intro}
     {sole_source_request}
 
      Please generate a list of requirements in the following JSON format:
@@ -37,21 +66,154 @@ def generate_requirements(sole_source_request):
     Ensure each requirement is a clear and concise statement.
     """
 
+# Function to generate the requirements checklist/questions from the sole-source request
+def generate_requirements(sole_source_request):
+    if estimate_tokens(sole_source_request) > REQUIREMENTS_CHUNK_TOKENS:
+        return json.dumps(generate_requirements_chunked(sole_source_request))
+
+    # One call, split and retried like a chunk if the output is cut off
+    return json.dumps(merge_requirements([_extract_chunk_requirements(sole_source_request)]))
+
+def _extract_chunk_requirements(chunk, part=None, total_parts=None):
+    """
+    Extracts requirements from one chunk, splitting it again if the output was cut off
+
+    Without part, the chunk is the whole request.
+    """
+    prompt = build_requirements_prompt(chunk, part, total_parts)
     response = openai.chat.completions.create(
-        model=model_name, 
-        messages=[{"role": "system", "content": prompt}], 
+        model=model_name,
+        messages=[{"role": "system", "content": prompt}],
         max_tokens=1500
     )
+    choice = response.choices[0]
+    requirements = parse_requirements(choice.message.content.strip())
 
-    return response.choices[0].message.content.strip()
+    if getattr(choice, "finish_reason", None) == "length":
+        chunk_tokens = estimate_tokens(chunk)
+        if chunk_tokens > REQUIREMENTS_MIN_SPLIT_TOKENS:
+            logger.warning(f"Requirements for part {part or 1} were cut off, splitting it and retrying")
+            halves = split_text_by_token_budget(chunk, chunk_tokens // 2 + 1)
+            # Halves of the whole request are prompted as parts of it
+            return [
+                requirement
+                for index, half in enumerate(halves, start=1)
+                for requirement in (
+                    _extract_chunk_requirements(half, part, total_parts) if part
+                    else _extract_chunk_requirements(half, index, len(halves))
+                )
+            ]
+        logger.warning(f"Requirements for part {part or 1} were cut off; kept {len(requirements)} complete entries")
+    return requirements
+
+def generate_requirements_chunked(sole_source_request):
+    """
+    Extracts requirements from a long request by splitting it into sections and
+    extracting from the chunks in parallel.
+
+    Args:
+        sole_source_request: The request document text
+
+    Returns:
+        list: Merged requirements with near-duplicates removed and ids reassigned
+    """
+    chunks = split_text_by_token_budget(sole_source_request, REQUIREMENTS_CHUNK_TOKENS)
+    logger.info(f"Extracting requirements from {len(chunks)} chunks")
+
+    with ThreadPoolExecutor(max_workers=min(REQUIREMENTS_MAX_WORKERS, len(chunks))) as executor:
+        chunk_requirements = list(executor.map(
+            lambda args: _extract_chunk_requirements(*args),
+            [(chunk, part, len(chunks)) for part, chunk in enumerate(chunks, start=1)]
+        ))
+
+    requirements = merge_requirements(chunk_requirements)
+    logger.info(
+        f"Merged {sum(len(r) for r in chunk_requirements)} chunk requirements into {len(requirements)}"
+    )
+    return requirements
+
+def stream_requirements(sole_source_request):
+    """
+    Yields requirements while they are still being extracted.
+
+    Short requests stream a single completion and yield each requirement as
+    soon as its JSON object closes; if that completion is cut off, the model
+    is asked to continue the list after the entries already yielded. Long
+    requests are extracted in parallel chunks and yielded chunk by chunk in
+    document order.
+
+    Args:
+        sole_source_request: The request document text
+
+    Yields:
+        dict: {id, query} requirements with near-duplicates removed and
+        sequential ids, matching generate_requirements
+    """
+    if estimate_tokens(sole_source_request) > REQUIREMENTS_CHUNK_TOKENS:
+        yield from iter_unique_requirements(_stream_chunk_requirements(sole_source_request))
+        return
+
+    messages = [{"role": "system", "content": build_requirements_prompt(sole_source_request)}]
+
+    def requirements():
+        yielded = []
+        for continuation in range(REQUIREMENTS_MAX_CONTINUATIONS + 1):
+            stream = openai.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                max_tokens=1500,
+                stream=True
+            )
+            parser = JsonObjectStreamParser()
+            cut_off = False
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    for requirement in parser.feed(choice.delta.content):
+                        yielded.append(requirement)
+                        yield requirement
+                if getattr(choice, "finish_reason", None) == "length":
+                    cut_off = True
+            if not cut_off:
+                return
+            # Only complete entries are replayed, so the model resumes after the last one
+            logger.warning(f"Streamed requirements were cut off after {len(yielded)} entries, continuing")
+            messages[1:] = [
+                {"role": "assistant", "content": json.dumps(yielded)},
+                {"role": "user", "content": "The list was cut off. Continue it with the requirements that "
+                                            "come after the last entry, as a JSON array of new entries only."}
+            ]
+        logger.warning("Streamed requirements were still cut off; kept the complete entries")
+
+    yield from iter_unique_requirements(requirements())
 
-def evaluate_req_res_question(question_config, sole_source_response):
+def _stream_chunk_requirements(sole_source_request):
+    chunks = split_text_by_token_budget(sole_source_request, REQUIREMENTS_CHUNK_TOKENS)
+    logger.info(f"Streaming requirements from {len(chunks)} chunks")
+
+    with ThreadPoolExecutor(max_workers=min(REQUIREMENTS_MAX_WORKERS, len(chunks))) as executor:
+        futures = [
+            executor.submit(_extract_chunk_requirements, chunk, part, len(chunks))
+            for part, chunk in enumerate(chunks, start=1)
+        ]
+        # Later chunks keep running while earlier ones are consumed
+        for future in futures:
+            yield from future.result()
+
+def evaluate_req_res_question(question_config, sole_source_response, model_routing=None, stats=None):
     """
     Enhanced evaluation function that provides structured responses matching form requirements
+
+    Cheap questions can be answered by the fast model and escalated to the strong
+    one on low confidence or failed validation (see model_cascade).
     
     Args:
         question_config: Dictionary containing question configuration from JSON
         sole_source_response: The vendor's response text
+        model_routing: The form's metadata.modelRouting table, if any
+        stats: Optional CascadeStats for the current run
     
     Returns:
         Dictionary matching the form structure for easy injection
@@ -124,19 +286,36 @@ def evaluate_req_res_question(question_config, sole_source_response):
     system_prompt = """You are a technical evaluator for government contracts. 
     Analyze the provided response and return a JSON object matching the specified structure."""
 
-    response = openai.chat.completions.create(
-        model=model_name,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": base_prompt}
-        ],
-        temperature=0.1,  # Lower temperature for more consistent responses
-        max_tokens=1500,
-        response_format={ "type": "json_object" }
-    )
+    def attempt(model):
+        response = openai.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": base_prompt}
+            ],
+            temperature=0.1,  # Lower temperature for more consistent responses
+            max_tokens=1500,
+            response_format={ "type": "json_object" }
+        )
+
+        # Parse the response into a structured format
+        return json.loads(response.choices[0].message.content)
+
+    def escalation_reason(evaluation):
+        if evaluation.get('confidence') == 'Low':
+            return 'lowConfidence'
+        if not validate_evaluation_result(evaluation, question_config):
+            return 'validation'
+        return None
 
-    # Parse the response into a structured format
-    evaluation = json.loads(response.choices[0].message.content)
+    evaluation = run_cascade(
+        resolve_route(question_config, model_routing),
+        attempt,
+        escalation_reason,
+        question_config['responseType'],
+        strong_model=model_name,
+        stats=stats
+    )
 
     # Transform the evaluation into form-compatible structure
     # form_data = transform_evaluation_to_form_data(evaluation, question_config)
@@ -286,13 +465,13 @@ def evaluate_question(question, sole_source_response):
     )
     return response.choices[0].message.content.strip()
 
-# Function to generate the final summary/assessment
-def generate_summary_assessment(analysis_results):
-    prompt = f"""
+# Function to build the summary/assessment prompt shared by the blocking and streaming paths
+def build_summary_prompt(analysis_results):
+    return f"""
     Based on the detailed analysis of the vendor's response to the sole-source request, your goal is to create a summary assessment. Review the answers to each requirement, noting where the vendor meets the expectations and where there are gaps. Highlight any missing information, areas where the vendor exceeds the requirements, and overall readiness or suitability of the vendor.
 
     Here is the analysis of each question:
-    {json.dumps(analysis_results, indent=2)}
+    {json.dumps(analysis_results, separators=(",", ":"))}
 
     Please provide the summary in this format:
     1. Overview: [General overview of the vendor's response]
@@ -302,9 +481,60 @@ def generate_summary_assessment(analysis_results):
     5. Overall Assessment: [Final judgment on the vendor's readiness and qualification for the sole-source request, including a recommended score out of 10]
     """
 
+# Function to condense one slice of a large analysis into notes for the final summary
+def generate_partial_summary(analysis_results, max_tokens=700):
+    prompt = f"""
+    You are condensing part of a detailed analysis of a vendor's response to a sole-source request. Another step will merge your notes with notes from the rest of the analysis into a final summary assessment, so be concise and keep only what that summary needs.
+
+    Here is this part of the analysis:
+    {json.dumps(analysis_results, separators=(",", ":"))}
+
+    Provide short notes under these headings:
+    Strengths: [Requirements or areas the vendor meets or exceeds]
+    Weaknesses: [Requirements or areas where the vendor fails to meet expectations]
+    Missing Information: [Requirements that are partially met or not addressed]
+    """
+
+    response = openai.chat.completions.create(
+        model=model_name,
+        messages=[{"role": "system", "content": prompt}],
+        max_tokens=max_tokens
+    )
+    return response.choices[0].message.content.strip()
+
+# Function to generate the final summary/assessment
+def generate_summary_assessment(analysis_results):
+    prompt = build_summary_prompt(analysis_results)
+
     response = openai.chat.completions.create(
         model=model_name, 
         messages=[{"role": "system", "content": prompt}], 
         max_tokens=1500
     )
     return response.choices[0].message.content.strip()
+
+# Function to stream the final summary/assessment token by token
+def stream_summary_assessment(analysis_results):
+    """
+    Streams the summary assessment as it is generated.
+
+    Args:
+        analysis_results: The evaluation results to summarize
+
+    Yields:
+        str: Content deltas in the order the model produces them
+    """
+    prompt = build_summary_prompt(analysis_results)
+
+    stream = openai.chat.completions.create(
+        model=model_name,
+        messages=[{"role": "system", "content": prompt}],
+        max_tokens=1500,
+        stream=True
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
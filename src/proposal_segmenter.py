@@ -0,0 +1,213 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .table_extractor import format_tables
+from .utils import SECTION_HEADING_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Set to "false" to send every subsection the full proposal text
+SECTION_ROUTING = os.getenv("SECTION_ROUTING", "true").lower() not in ("0", "false", "no")
+# Characters from the start of the proposal sent with every routed context
+SECTION_ROUTING_HEADER_CHARS = int(os.getenv("SECTION_ROUTING_HEADER_CHARS", "1500"))
+# Routed context larger than this share of the full text is not worth routing
+SECTION_ROUTING_MAX_SHARE = 0.8
+
+# Headings (or, failing that, repeated body mentions) that mark the content a section needs
+SECTION_ROUTES = {
+    "laborSection": re.compile(r"\blabou?r\b|\bstaffing\b|\bhours\b|\bpersonnel\b|\bworkforce\b", re.IGNORECASE),
+    "materialsSection": re.compile(
+        r"\bmaterials?\b|\bbill of materials\b|\bBOM\b|\bcomponents?\b|\bfabrication\b|\bsubcontract", re.IGNORECASE
+    ),
+    "travelSection": re.compile(r"\btravel\b|\btrips?\b|\bper diem\b|\blodging\b", re.IGNORECASE),
+    "odcSection": re.compile(
+        r"\bother direct costs?\b|\bODCs?\b|\bequipment\b|\bsoftware licen|\btooling\b", re.IGNORECASE
+    ),
+}
+# Body mentions needed for a segment whose heading does not match
+SECTION_ROUTING_MIN_MENTIONS = 3
+# How extracted tables reach routed sections: "append" adds matching tables to the
+# routed text, "only" sends the header and matching tables alone when any match,
+# and "off" leaves them out
+SECTION_TABLE_CONTEXT = os.getenv("SECTION_TABLE_CONTEXT", "append").lower()
+
+_HEADING_NUMBER = re.compile(r"^\s*(\d+(?:\.\d+)*)\.?\s")
+
+
+@dataclass(frozen=True)
+class Segment:
+    """
+    A heading-delimited span of the proposal.
+
+    Attributes:
+        heading: The heading line, stripped; empty for text before the first heading
+        number: The heading's outline number (e.g. "3.1"), if it has one
+        text: The segment text including its heading
+        first_page: Zero-based page the segment starts on
+        last_page: Zero-based page the segment ends on
+    """
+    heading: str
+    number: Optional[str]
+    text: str
+    first_page: int
+    last_page: int
+
+
+def _segment(heading: str, lines: List[str], first_page: int, last_page: int) -> Segment:
+    number = _HEADING_NUMBER.match(heading)
+    return Segment(
+        heading=heading.strip(),
+        number=number.group(1) if number else None,
+        text="".join(lines),
+        first_page=first_page,
+        last_page=last_page,
+    )
+
+
+@lru_cache(maxsize=8)
+def segment_proposal(pages: Tuple[str, ...]) -> Tuple[Segment, ...]:
+    """
+    Splits the proposal into heading-delimited segments, tracking their pages.
+
+    Cached by content, so each document is segmented once however many
+    sections are routed from it.
+
+    Args:
+        pages: The proposal text, one entry per page
+
+    Returns:
+        Segments in document order
+    """
+    segments = []
+    heading, lines, first_page, last_page = "", [], 0, 0
+    for page_index, page_text in enumerate(pages):
+        for line in (page_text or "").splitlines(keepends=True):
+            if lines and SECTION_HEADING_PATTERN.match(line):
+                segments.append(_segment(heading, lines, first_page, last_page))
+                heading, lines, first_page = line, [], page_index
+            elif not lines:
+                heading, first_page = line if SECTION_HEADING_PATTERN.match(line) else "", page_index
+            lines.append(line)
+            last_page = page_index
+        # Keep words on either side of a page break apart
+        if lines and not lines[-1].endswith("\n"):
+            lines.append("\n")
+    if lines:
+        segments.append(_segment(heading, lines, first_page, last_page))
+    return tuple(segments)
+
+
+def match_segments(segments: Sequence[Segment], section_id: str) -> List[Segment]:
+    """
+    Picks the segments a section's questions need.
+
+    A segment matches when its heading matches the section's route, or when its
+    body mentions the route at least SECTION_ROUTING_MIN_MENTIONS times. Numbered
+    sub-headings of a matching heading (3.1, 3.2 under 3) come along with it.
+
+    Args:
+        segments: Output of segment_proposal
+        section_id: The evaluation section id, e.g. "laborSection"
+
+    Returns:
+        Matching segments in document order; empty when the section has no route
+    """
+    route = SECTION_ROUTES.get(section_id)
+    if route is None:
+        return []
+
+    matched = []
+    parent_number = None
+    for segment in segments:
+        if parent_number and segment.number and segment.number.startswith(parent_number + "."):
+            matched.append(segment)
+            continue
+        parent_number = None
+        if segment.heading and route.search(segment.heading):
+            matched.append(segment)
+            parent_number = segment.number
+        elif len(route.findall(segment.text)) >= SECTION_ROUTING_MIN_MENTIONS:
+            matched.append(segment)
+    return matched
+
+
+def match_tables(tables: Sequence[Dict], section_id: str) -> List[Dict]:
+    """
+    Picks the extracted tables whose title, header or row labels match a section's route.
+    """
+    route = SECTION_ROUTES.get(section_id)
+    if route is None:
+        return []
+    matched = []
+    for table in tables or ():
+        labels = [table.get("title") or "", *(table.get("header") or [])]
+        labels.extend(row[0] for row in table.get("rows", []) if row)
+        if route.search(" ".join(labels)):
+            matched.append(table)
+    return matched
+
+
+def route_section_context(pages: Sequence[str], section_id: str,
+                          tables: Optional[Sequence[Dict]] = None) -> Tuple[str, Dict]:
+    """
+    Builds the proposal text sent to one evaluation section.
+
+    The text is the start of the proposal (title, solicitation and contractor
+    details) followed by the matching segments, each marked with its pages,
+    and the matching extracted tables as compact rows (see SECTION_TABLE_CONTEXT).
+    The full text is used when routing is off, nothing matches, or the matches
+    cover most of the document anyway.
+
+    Args:
+        pages: The proposal text, one entry per page
+        section_id: The evaluation section id
+        tables: Tables extracted from the proposal at upload, if any
+
+    Returns:
+        Tuple of (context text, routing details for the evaluation metadata)
+    """
+    full_text = "".join(pages)
+    if not SECTION_ROUTING or section_id not in SECTION_ROUTES:
+        return full_text, {"routed": False, "chars": len(full_text)}
+
+    header = full_text[:SECTION_ROUTING_HEADER_CHARS]
+    matched_tables = match_tables(tables, section_id) if SECTION_TABLE_CONTEXT != "off" else []
+    table_text = f"\n\nExtracted tables:\n{format_tables(matched_tables)}" if matched_tables else ""
+    if matched_tables and SECTION_TABLE_CONTEXT == "only":
+        context = header + table_text
+        logger.info(f"Routed {len(matched_tables)} tables ({len(context)} chars) to {section_id}")
+        return context, {"routed": True, "chars": len(context), "fullChars": len(full_text),
+                         "tables": len(matched_tables), "headings": []}
+
+    segments = match_segments(segment_proposal(tuple(pages)), section_id)
+    parts = [header]
+    for segment in segments:
+        pages_label = (
+            f"Page {segment.first_page + 1}" if segment.first_page == segment.last_page
+            else f"Pages {segment.first_page + 1}-{segment.last_page + 1}"
+        )
+        parts.append(f"\n[{pages_label}]\n{segment.text}")
+    context = "".join(parts)
+
+    if not segments or len(context) > SECTION_ROUTING_MAX_SHARE * len(full_text):
+        logger.info(f"Using the full proposal for {section_id}")
+        context = full_text + table_text
+        return context, {"routed": False, "chars": len(context), "segments": len(segments),
+                         "tables": len(matched_tables)}
+
+    context += table_text
+
+    logger.info(
+        f"Routed {len(segments)} segments ({len(context)} of {len(full_text)} chars) to {section_id}"
+    )
+    return context, {
+        "routed": True,
+        "chars": len(context),
+        "fullChars": len(full_text),
+        "tables": len(matched_tables),
+        "headings": [segment.heading for segment in segments if segment.heading],
+    }
@@ -1,12 +1,18 @@
 import os
 import re
-from typing import Dict, List, Union, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Union, Optional, Tuple
 import json
 from datetime import datetime
 import openai
 import logging
 from dataclasses import dataclass
 from dotenv import load_dotenv
+from .field_extractors import extract_field
+from .model_cascade import CascadeStats, resolve_route, run_cascade
+from .proposal_segmenter import route_section_context
+from .prompt_manager import validate_evaluation_result
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,6 +21,14 @@ logging.basicConfig(
 load_dotenv()
 model_name  = os.getenv("MODEL_NAME")
 
+# When to start a questioned-items call before its acceptability verdict is known:
+# "off" waits for the verdict, "always" speculates in every conditional section, and
+# "adaptive" speculates only in sections whose verdicts have been unacceptable at
+# least SPECULATION_MIN_HIT_RATE of the time
+SPECULATION_POLICY = os.getenv("SPECULATION_POLICY", "off").lower()
+SPECULATION_MIN_HIT_RATE = float(os.getenv("SPECULATION_MIN_HIT_RATE", "0.5"))
+SPECULATION_MAX_WORKERS = int(os.getenv("SPECULATION_MAX_WORKERS", "4"))
+
 @dataclass
 class EvaluationResult:
     value: Union[str, bool, dict, list]
@@ -34,15 +48,283 @@ class EvaluationResult:
             "questioned_items": self.questioned_items,
             "justification": self.justification
         }
+
+# Analysis recorded when a questioned-items question is skipped for an acceptable section
+NOT_QUESTIONED_ANALYSIS = {
+    "questionedHours": "No questioned hours as labor hours are technically acceptable",
+    "questionedMaterials": "No questioned materials as all materials are technically acceptable",
+    "questionedTravel": "No questioned travel as all travel elements are technically acceptable",
+    "questionedODCs": "No questioned ODCs as all ODCs are technically acceptable",
+}
+
+# Questions whose answers feed other questions in the same section, by section id
+QUESTION_DEPENDENTS = {
+    "laborSection": {"laborHoursSummary": ["questionedHours"]},
+    "materialsSection": {"materialsTechnicalAcceptability": ["questionedMaterials"]},
+    "travelSection": {"travelAcceptability": ["questionedTravel"]},
+    "odcSection": {
+        "odcList": ["odcAcceptability"],
+        "odcAcceptability": ["questionedODCs"],
+    },
+    "section4": {"areasToNegotiate": ["additionalComments"]},
+}
+
+class SpeculationStats:
+    """
+    Thread-safe per-section counts of acceptability verdicts and speculative calls
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sections = {}
+
+    def _section(self, section_id: str) -> Dict[str, int]:
+        return self._sections.setdefault(
+            section_id, {"verdicts": 0, "unacceptable": 0, "launched": 0, "hits": 0}
+        )
+
+    def record(self, section_id: str, unacceptable: bool, speculated: bool) -> None:
+        with self._lock:
+            counts = self._section(section_id)
+            counts["verdicts"] += 1
+            counts["unacceptable"] += int(unacceptable)
+            if speculated:
+                counts["launched"] += 1
+                counts["hits"] += int(unacceptable)
+
+    def unacceptable_rate(self, section_id: str) -> Optional[float]:
+        """Share of verdicts that needed the questioned-items call, or None without history"""
+        with self._lock:
+            counts = self._sections.get(section_id)
+            if not counts or not counts["verdicts"]:
+                return None
+            return counts["unacceptable"] / counts["verdicts"]
+
+    def to_dict(self) -> Dict:
+        """Per-section counts with hit rates, plus totals"""
+        with self._lock:
+            sections = {key: dict(counts) for key, counts in self._sections.items()}
+        launched = sum(counts["launched"] for counts in sections.values())
+        hits = sum(counts["hits"] for counts in sections.values())
+        for counts in sections.values():
+            counts["hitRate"] = round(counts["hits"] / counts["launched"], 4) if counts["launched"] else None
+        return {
+            "policy": SPECULATION_POLICY,
+            "launched": launched,
+            "hits": hits,
+            "wasted": launched - hits,
+            "hitRate": round(hits / launched, 4) if launched else None,
+            "sections": sections,
+        }
+
+# Verdict history across evaluations, used by the adaptive policy
+speculation_history = SpeculationStats()
+_speculation_executor = ThreadPoolExecutor(
+    max_workers=SPECULATION_MAX_WORKERS, thread_name_prefix="speculation"
+)
+
+def _response_value(response):
+    """Reads the value of a stored response, serialized or not"""
+    if isinstance(response, EvaluationResult):
+        return response.value
+    if isinstance(response, dict):
+        return response.get("value")
+    return None
+
+# Placeholder for the proposal text while building static prompt fragments
+_PROPOSAL_TEXT_SLOT = "\x00PROPOSAL_TEXT\x00"
+
+def build_evaluation_prompt_fragments(question_config: Dict) -> Tuple[str, str]:
+    """
+    Builds the static parts of a question prompt, which only depend on the question config
+    
+    Returns:
+        Tuple of (text before the proposal, text after the proposal)
+    """
+    base_prompt = f"""
+    Analyze the following proposal text and provide a JSON response for technical evaluation.
+    Keep the 'value' field concise and suitable for direct form input - use only the specific data requested.
+    Include detailed analysis and context in the 'analysis' field instead.
+    
+    Question: {question_config['query']}
+    Response Type: {question_config['responseType']}
+    
+    Proposal Text:
+    {_PROPOSAL_TEXT_SLOT}
+    
+    Evaluation Guidelines:
+    1. The 'value' field should contain ONLY the specific data requested, not full sentences
+    2. Put any explanation, context, or analysis in the 'analysis' field
+    3. Provide specific evidence from the proposal to support your evaluation
+    4. Follow federal acquisition guidelines
+    """
+
+    if question_config["id"] in ["proposedHours", "recommendedHours"]:
+        base_prompt += """
+        For labor hours evaluation:
+        1. Look for explicit mentions of total labor hours
+        2. Consider all labor categories and their individual hours
+        3. Verify against project timeline and deliverables
+        4. Ensure the number returned is the total hours, not per category
+        5. Include source location and justification for the hours determination
+        
+        Response format:
+        {
+            "value": number,
+            "confidence": "High/Medium/Low",
+            "sourceLocation": "specific section reference",
+            "analysis": "detailed explanation of how hours were determined",
+            "justification": "technical basis for the hours determination"
+        }
+        """
+
+    # Handle date type specifically
+    if question_config["responseType"] == "date":
+        base_prompt += """
+        Provide your response in the following JSON format:
+        {
+            "value": "MM-dd-yyyy",
+            "confidence": "High/Medium/Low",
+            "sourceLocation": "Reference to relevant proposal sections",
+            "analysis": "Context about the date"
+        }
+        
+        Example:
+        {
+            "value": "10-15-2024",
+            "confidence": "High",
+            "sourceLocation": "Section 2.1",
+            "analysis": "The response date is clearly stated in the document header"
+        }
+        """
+    
+    if question_config["responseType"] == "acceptability":
+        base_prompt += """
+        Provide your response in the following JSON format:
+        {
+            "status": "Acceptable" or "Not Acceptable",
+            "confidence": "High/Medium/Low",
+            "justification": "Brief technical justification",
+            "questionedItems": [] (if not acceptable),
+            "sourceLocation": "Reference to relevant proposal sections",
+            "analysis": "Detailed technical analysis and context"
+        }
+        """
+    elif question_config["responseType"] == "object":
+        base_prompt += f"""
+        Provide your response in the following JSON format:
+        {{
+            "value": {{
+                {', '.join(f'"{field["id"]}": "specific value only"' for field in question_config.get('subfields', []))}
+            }},
+            "confidence": "High/Medium/Low",
+            "sourceLocation": "Reference to relevant proposal sections",
+            "analysis": "Detailed context and explanation"
+        }}
+        
+        Example:
+        {{
+            "value": {{
+                "name": "John Smith",
+                "code": "ABC123",
+                "telephone": "555-0123"
+            }},
+            "confidence": "High",
+            "sourceLocation": "Section 2.1",
+            "analysis": "Detailed explanation of the POC's role and qualifications..."
+        }}
+        """
+    elif question_config["responseType"] == "text":
+        base_prompt += """
+        Provide your response in the following JSON format:
+        {
+            "value": "specific data only, no full sentences",
+            "confidence": "High/Medium/Low",
+            "sourceLocation": "Reference to relevant proposal sections",
+            "analysis": "Detailed context and explanation"
+        }
+        
+        Example for a contract number:
+        {
+            "value": "N00014-22-C-1234",
+            "confidence": "High",
+            "sourceLocation": "Page 1, Header",
+            "analysis": "The contract number is clearly stated in the header and follows the standard format for Navy contracts..."
+        }
+        """
+    
+    if question_config.get("aiEvaluation"):
+        base_prompt += f"\nSpecific Evaluation Criteria:\n"
+        for criterion in question_config["aiEvaluation"].get("evaluationPoints", []):
+            base_prompt += f"- {criterion}\n"
+    
+    base_prompt += "\nIMPORTANT: Keep 'value' fields concise and directly usable in a form - save all explanation and context for the 'analysis' field."
+    
+    head, tail = base_prompt.split(_PROPOSAL_TEXT_SLOT)
+    return head, tail
+
 class TechnicalEvaluator:
-    def __init__(self, model_name: str = model_name):
+    def __init__(self, model_name: str = model_name, plan=None, model_routing: Dict = None,
+                 pages: List[str] = None):
         self.model_name = model_name
+        # Proposal text per page, used by the fast-path extractors for page references
+        self.pages = pages
+        # Ids of questions answered by a fast-path extractor instead of the model
+        self.fast_path_answers = []
+        # Optional compiled EvaluationPlan providing question lookups and prompt fragments
+        self.plan = plan
+        # The schema's metadata.modelRouting table, taken from the plan when not given
+        if model_routing is None and plan is not None:
+            model_routing = plan.schema.get("metadata", {}).get("modelRouting")
+        self.model_routing = model_routing
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger(__name__)
+        self.speculation_stats = SpeculationStats()
+        self.cascade_stats = CascadeStats()
         
+    def _question(self, section_config: Dict, question_id: str) -> Dict:
+        """
+        Looks up a question config in a section, using the compiled plan's index when available
+        """
+        if self.plan:
+            question = self.plan.questions_by_section.get(section_config.get("id"), {}).get(question_id)
+            if question is not None:
+                return question
+        return next(q for q in section_config["questions"] if q["id"] == question_id)
+
+    def _fast_path_result(self, question_config: Dict, proposal_text: str) -> Optional[EvaluationResult]:
+        """
+        Answers a question with its registered field extractor, or returns None
+        """
+        pages = self.pages if self.pages else [proposal_text]
+        extraction = extract_field(question_config, pages)
+        if extraction is None:
+            return None
+
+        self.fast_path_answers.append(question_config["id"])
+        self.logger.info(f"Answered {question_config['id']} without a model call")
+        return EvaluationResult(
+            value=extraction.value,
+            confidence="High",
+            source_location=f"Page {extraction.page + 1}" if self.pages else "Proposal text",
+            analysis=f'Extracted from "{extraction.snippet}"',
+            questioned_items=None,
+            justification=None
+        )
+
+    def _model_route(self, question_config: Dict) -> str:
+        """
+        Model route for a question, precomputed by the compiled plan when available
+        """
+        if self.plan:
+            route = self.plan.model_routes.get(question_config.get("id"))
+            if route is not None:
+                return route
+        return resolve_route(question_config, self.model_routing)
+
     def evaluate_section(self, section_config: Dict, proposal_text: str) -> Dict:
         """
         Evaluates an entire section of the technical evaluation form
@@ -102,14 +384,19 @@ class TechnicalEvaluator:
             EvaluationResult containing the evaluation
         """
         response_type = question_config["responseType"]
+
+        # Answer locally when a registered extractor finds a single unambiguous value
+        fast_result = self._fast_path_result(question_config, proposal_text)
+        if fast_result is not None:
+            return fast_result
         
         # Build the evaluation prompt
         prompt = self._build_evaluation_prompt(question_config, proposal_text)
-        
-        try:
+
+        def attempt(model):
             # Get response from AI model
             response = openai.chat.completions.create(
-                model=self.model_name,
+                model=model,
                 messages=[
                     {"role": "system", "content": "You are a technical evaluator for government contracts."},
                     {"role": "user", "content": prompt}
@@ -117,10 +404,30 @@ class TechnicalEvaluator:
                 temperature=0.1,
                 response_format={ "type": "json_object" }
             )
-            
-            # Parse and validate the response
-            result = self._parse_evaluation_response(response.choices[0].message.content, 
-                                                  question_config)
+            content = response.choices[0].message.content
+            return content, self._parse_evaluation_response(content, question_config)
+
+        def escalation_reason(outcome):
+            content, result = outcome
+            if result.confidence == "Low":
+                return "lowConfidence"
+            try:
+                if not validate_evaluation_result(json.loads(content), question_config):
+                    return "validation"
+            except json.JSONDecodeError:
+                return "validation"
+            return None
+        
+        try:
+            # Parse and validate the response, escalating to the strong model if needed
+            _, result = run_cascade(
+                self._model_route(question_config),
+                attempt,
+                escalation_reason,
+                response_type,
+                strong_model=self.model_name,
+                stats=self.cascade_stats
+            )
             
             return result
             
@@ -128,6 +435,142 @@ class TechnicalEvaluator:
             self.logger.error(f"Evaluation failed for question {question_config['id']}: {str(e)}")
             raise  
     
+    def reevaluate_question(self, section_config: Dict, question_id: str, proposal_text: str,
+                            responses: Dict) -> Dict:
+        """
+        Re-evaluates one question and every question in the section that depends on it
+        
+        Args:
+            section_config: Configuration for the section containing the question
+            question_id: Id of the question to re-evaluate
+            proposal_text: The relevant proposal text
+            responses: The section's existing responses, used as context for dependents
+            
+        Returns:
+            Dict of question id to new result for the question and its dependents
+        """
+        if self.plan:
+            dependents = self.plan.dependencies
+        else:
+            dependents = QUESTION_DEPENDENTS.get(section_config.get("id"), {})
+        updated = {}
+        pending = [question_id]
+        while pending:
+            current_id = pending.pop(0)
+            if current_id in updated:
+                continue
+            self.logger.info(f"Re-evaluating question {current_id} in {section_config.get('id')}")
+            updated[current_id] = self.evaluate_section_question(
+                section_config, current_id, proposal_text, {**responses, **updated}
+            )
+            pending.extend(dependents.get(current_id, []))
+        return updated
+
+    def evaluate_section_question(self, section_config: Dict, question_id: str, proposal_text: str,
+                                  responses: Dict) -> Union[EvaluationResult, Dict]:
+        """
+        Evaluates a single question the same way its section evaluator would
+        
+        Args:
+            section_config: Configuration for the section containing the question
+            question_id: Id of the question to evaluate
+            proposal_text: The relevant proposal text
+            responses: Responses of the section's other questions, used as context
+            
+        Returns:
+            EvaluationResult, or a dict for the labor acceptability summary
+        """
+        config = self._question(section_config, question_id)
+        section_id = section_config.get("id")
+
+        if section_id == "laborSection":
+            if question_id == "laborHoursSummary":
+                return self._evaluate_labor_summary(config, proposal_text)
+            if question_id == "questionedHours" and _response_value(responses.get("laborHoursSummary")):
+                return self._not_questioned_result(question_id)
+        elif section_id == "materialsSection":
+            if question_id == "materialsTechnicalAcceptability":
+                return self._evaluate_materials_acceptability(config, proposal_text)
+            if question_id == "questionedMaterials":
+                if _response_value(responses.get("materialsTechnicalAcceptability")):
+                    return self._not_questioned_result(question_id)
+                return self._evaluate_questioned_materials(config, proposal_text)
+        elif section_id == "travelSection":
+            if question_id == "travelAcceptability":
+                return self._evaluate_travel_acceptability(config, proposal_text)
+            if question_id == "questionedTravel":
+                if _response_value(responses.get("travelAcceptability")):
+                    return self._not_questioned_result(question_id)
+                return self._evaluate_questioned_travel(config, proposal_text)
+        elif section_id == "odcSection":
+            odc_list = _response_value(responses.get("odcList")) or []
+            if question_id == "odcList":
+                return self._evaluate_odc_list(config, proposal_text)
+            if question_id == "odcAcceptability":
+                return self._evaluate_odc_acceptability(config, proposal_text, odc_list)
+            if question_id == "questionedODCs":
+                if _response_value(responses.get("odcAcceptability")):
+                    return self._not_questioned_result(question_id)
+                return self._evaluate_questioned_odcs(config, proposal_text, odc_list)
+        elif section_id == "section3":
+            if question_id == "references":
+                return self._evaluate_references(config, proposal_text)
+            if question_id == "standardAttachments":
+                return self._evaluate_standard_attachments(config, proposal_text)
+            if question_id == "otherAttachments":
+                return self._evaluate_other_attachments(config, proposal_text)
+        elif section_id == "section4":
+            if question_id == "areasToNegotiate":
+                return self._evaluate_negotiation_areas(config, proposal_text)
+            if question_id == "additionalComments":
+                areas = _response_value(responses.get("areasToNegotiate")) or []
+                return self._evaluate_additional_comments(config, proposal_text, areas)
+            if question_id == "preparer":
+                return self._evaluate_preparer_info(config, proposal_text)
+            if question_id in ("signature", "date"):
+                raise ValueError(f"Question {question_id} is set by the system and cannot be re-evaluated")
+
+        return self.evaluate_question(config, proposal_text)
+
+    def _start_speculation(self, section_id: str, questioned_fn: Callable[[], EvaluationResult]) -> Optional[Future]:
+        """
+        Starts the questioned-items call ahead of the acceptability verdict when the policy allows
+        """
+        if SPECULATION_POLICY == "always":
+            speculate = True
+        elif SPECULATION_POLICY == "adaptive":
+            rate = speculation_history.unacceptable_rate(section_id)
+            speculate = rate is None or rate >= SPECULATION_MIN_HIT_RATE
+        else:
+            speculate = False
+        if not speculate:
+            return None
+        self.logger.info(f"Speculatively evaluating questioned items for {section_id}")
+        return _speculation_executor.submit(questioned_fn)
+
+    def _resolve_questioned(self, section_id: str, question_id: str, acceptability,
+                            questioned_fn: Callable[[], EvaluationResult],
+                            speculative: Optional[Future] = None) -> EvaluationResult:
+        """
+        Returns the questioned-items result for an acceptability verdict
+        
+        Uses the speculative call when one was started and is needed, discards it when
+        the section is acceptable, and otherwise makes the call now.
+        """
+        unacceptable = not _response_value(acceptability)
+        speculated = speculative is not None
+        self.speculation_stats.record(section_id, unacceptable, speculated)
+        speculation_history.record(section_id, unacceptable, speculated)
+
+        if not unacceptable:
+            if speculated:
+                # A call already running cannot be stopped; its result is ignored
+                speculative.cancel()
+            return self._not_questioned_result(question_id)
+        if speculated:
+            return speculative.result()
+        return questioned_fn()
+
     def _evaluate_labor_section(self, section_config: Dict, proposal_text: str) -> Dict:
         """
         Specialized handling for labor section evaluation
@@ -139,76 +582,31 @@ class TechnicalEvaluator:
         }
 
         try:
+            questioned_hours_config = self._question(section_config, "questionedHours")
+            evaluate_questioned_hours = lambda: self.evaluate_question(questioned_hours_config, proposal_text)
+            speculative = self._start_speculation(section_config["id"], evaluate_questioned_hours)
+
             # Evaluate labor hours summary first
-            labor_summary_config = next(q for q in section_config["questions"] if q["id"] == "laborHoursSummary")
-            summary_prompt = f"""
-            Analyze the following proposal text for labor hours technical acceptability.
-            Consider: project timeline, milestones, deliverables, and resource allocation.
-            Also determine the basis for acceptance from these options:
-            - Same or Similar Effort (provide contract number)
-            - Estimating Method/Software Model (provide methodology)
-            - Subject Matter Expertise (provide credentials)
-
-            Required JSON Response Format:
-            {{
-                "value": true/false,
-                "confidence": "High/Medium/Low",
-                "source_location": "string",
-                "analysis": "detailed analysis",
-                "justification": "brief justification",
-                "acceptanceBasis": {{
-                    "type": "sameOrSimilar/estimatingMethod/expertise",
-                    "details": {{
-                        "contractNumber": "string" (if sameOrSimilar),
-                        "methodology": "string" (if estimatingMethod),
-                        "credentials": "string" (if expertise)
-                    }}
-                }}
-            }}
-            """
-
-            labor_summary = self._evaluate_labor_with_prompt(labor_summary_config, proposal_text, summary_prompt)
-            
-            # Structure the response to include basis for acceptance
-            results["responses"]["laborHoursSummary"] = {
-                "value": labor_summary.get("value", False),
-                "confidence": labor_summary.get("confidence", "Low"),
-                "source_location": labor_summary.get("source_location"),
-                "analysis": labor_summary.get("analysis"),
-                "justification": labor_summary.get("justification"),
-                "questioned_items": [],
-                "acceptanceBasis": labor_summary.get("acceptanceBasis", {
-                    "type": "estimatingMethod",
-                    "details": {
-                        "methodology": labor_summary.get("justification", "")
-                    }
-                })
-            }
+            labor_summary_config = self._question(section_config, "laborHoursSummary")
+            labor_summary = self._evaluate_labor_summary(labor_summary_config, proposal_text)
+            results["responses"]["laborHoursSummary"] = labor_summary
 
             # Evaluate proposed hours
-            proposed_hours_config = next(q for q in section_config["questions"] if q["id"] == "proposedHours")
+            proposed_hours_config = self._question(section_config, "proposedHours")
             proposed_hours = self.evaluate_question(proposed_hours_config, proposal_text)
             results["responses"]["proposedHours"] = proposed_hours.to_dict()
 
             # Evaluate recommended hours
-            recommended_hours_config = next(q for q in section_config["questions"] if q["id"] == "recommendedHours")
+            recommended_hours_config = self._question(section_config, "recommendedHours")
             recommended_hours = self.evaluate_question(recommended_hours_config, proposal_text)
             results["responses"]["recommendedHours"] = recommended_hours.to_dict()
 
             # Handle questioned hours if necessary
-            if not labor_summary.get("value", False):
-                questioned_hours_config = next(q for q in section_config["questions"] if q["id"] == "questionedHours")
-                questioned_hours = self.evaluate_question(questioned_hours_config, proposal_text)
-                results["responses"]["questionedHours"] = questioned_hours.to_dict()
-            else:
-                results["responses"]["questionedHours"] = {
-                    "value": [],
-                    "confidence": "High",
-                    "source_location": None,
-                    "analysis": "No questioned hours as labor hours are technically acceptable",
-                    "questioned_items": None,
-                    "justification": None
-                }
+            questioned_hours = self._resolve_questioned(
+                section_config["id"], "questionedHours", labor_summary,
+                evaluate_questioned_hours, speculative
+            )
+            results["responses"]["questionedHours"] = questioned_hours.to_dict()
 
         except Exception as e:
             self.logger.error(f"Error in labor section evaluation: {str(e)}")
@@ -216,6 +614,67 @@ class TechnicalEvaluator:
 
         return results
     
+    def _evaluate_labor_summary(self, config: Dict, proposal_text: str) -> Dict:
+        """
+        Evaluates labor hours acceptability together with the basis for acceptance
+        """
+        summary_prompt = f"""
+        Analyze the following proposal text for labor hours technical acceptability.
+        Consider: project timeline, milestones, deliverables, and resource allocation.
+        Also determine the basis for acceptance from these options:
+        - Same or Similar Effort (provide contract number)
+        - Estimating Method/Software Model (provide methodology)
+        - Subject Matter Expertise (provide credentials)
+
+        Required JSON Response Format:
+        {{
+            "value": true/false,
+            "confidence": "High/Medium/Low",
+            "source_location": "string",
+            "analysis": "detailed analysis",
+            "justification": "brief justification",
+            "acceptanceBasis": {{
+                "type": "sameOrSimilar/estimatingMethod/expertise",
+                "details": {{
+                    "contractNumber": "string" (if sameOrSimilar),
+                    "methodology": "string" (if estimatingMethod),
+                    "credentials": "string" (if expertise)
+                }}
+            }}
+        }}
+        """
+
+        labor_summary = self._evaluate_labor_with_prompt(config, proposal_text, summary_prompt)
+
+        # Structure the response to include basis for acceptance
+        return {
+            "value": labor_summary.get("value", False),
+            "confidence": labor_summary.get("confidence", "Low"),
+            "source_location": labor_summary.get("source_location"),
+            "analysis": labor_summary.get("analysis"),
+            "justification": labor_summary.get("justification"),
+            "questioned_items": [],
+            "acceptanceBasis": labor_summary.get("acceptanceBasis", {
+                "type": "estimatingMethod",
+                "details": {
+                    "methodology": labor_summary.get("justification", "")
+                }
+            })
+        }
+
+    def _not_questioned_result(self, question_id: str) -> EvaluationResult:
+        """
+        Placeholder for a questioned-items question skipped because the section is acceptable
+        """
+        return EvaluationResult(
+            value=[],
+            confidence="High",
+            source_location=None,
+            analysis=NOT_QUESTIONED_ANALYSIS[question_id],
+            questioned_items=None,
+            justification=None
+        )
+
     def _evaluate_labor_with_prompt(self, config: Dict, proposal_text: str, prompt: str) -> Dict:
         """
         Helper method for evaluating with specific prompt
@@ -291,15 +750,19 @@ class TechnicalEvaluator:
         }
         
         try:
+            questioned_config = self._question(materials_config, "questionedMaterials")
+            evaluate_questioned = lambda: self._evaluate_questioned_materials(questioned_config, proposal_text)
+            speculative = self._start_speculation(results["sectionId"], evaluate_questioned)
+
             # Evaluate materials purpose using standard evaluate_question
             purpose_result = self.evaluate_question(
-                next(q for q in materials_config["questions"] if q["id"] == "materialsPurpose"),
+                self._question(materials_config, "materialsPurpose"),
                 proposal_text
             )
             results["responses"]["materialsPurpose"] = purpose_result.to_dict()
             
             # Evaluate technical acceptability using specialized method
-            acceptability_config = next(q for q in materials_config["questions"] if q["id"] == "materialsTechnicalAcceptability")
+            acceptability_config = self._question(materials_config, "materialsTechnicalAcceptability")
             acceptability_result = self._evaluate_materials_acceptability(
                 acceptability_config,
                 proposal_text
@@ -307,22 +770,11 @@ class TechnicalEvaluator:
             results["responses"]["materialsTechnicalAcceptability"] = acceptability_result.to_dict()
             
             # If materials are not acceptable, evaluate questioned materials with specialized method
-            if not acceptability_result.value:
-                questioned_config = next(q for q in materials_config["questions"] if q["id"] == "questionedMaterials")
-                questioned_result = self._evaluate_questioned_materials(
-                    questioned_config,
-                    proposal_text
-                )
-                results["responses"]["questionedMaterials"] = questioned_result.to_dict()
-            else:
-                results["responses"]["questionedMaterials"] = {
-                    "value": [],
-                    "confidence": "High",
-                    "source_location": None,
-                    "analysis": "No questioned materials as all materials are technically acceptable",
-                    "questioned_items": None,
-                    "justification": None
-                }
+            questioned_result = self._resolve_questioned(
+                results["sectionId"], "questionedMaterials", acceptability_result,
+                evaluate_questioned, speculative
+            )
+            results["responses"]["questionedMaterials"] = questioned_result.to_dict()
             
             # Validate the entire section
             self._validate_materials_section(results)
@@ -540,36 +992,29 @@ class TechnicalEvaluator:
         }
         
         try:
+            questioned_config = self._question(section_config, "questionedTravel")
+            evaluate_questioned = lambda: self._evaluate_questioned_travel(questioned_config, proposal_text)
+            speculative = self._start_speculation(results["sectionId"], evaluate_questioned)
+
             # Evaluate travel purpose
             purpose_result = self.evaluate_question(
-                next(q for q in section_config["questions"] if q["id"] == "travelPurpose"),
+                self._question(section_config, "travelPurpose"),
                 proposal_text
             )
             results["responses"]["travelPurpose"] = purpose_result
             
             # Evaluate travel acceptability
             acceptability_result = self._evaluate_travel_acceptability(
-                next(q for q in section_config["questions"] if q["id"] == "travelAcceptability"),
+                self._question(section_config, "travelAcceptability"),
                 proposal_text
             )
             results["responses"]["travelAcceptability"] = acceptability_result
             
             # If travel is not acceptable, evaluate questioned travel
-            if not acceptability_result.value:
-                questioned_result = self._evaluate_questioned_travel(
-                    next(q for q in section_config["questions"] if q["id"] == "questionedTravel"),
-                    proposal_text
-                )
-                results["responses"]["questionedTravel"] = questioned_result
-            else:
-                results["responses"]["questionedTravel"] = EvaluationResult(
-                    value=[],
-                    confidence="High",
-                    source_location=None,
-                    analysis="No questioned travel as all travel elements are technically acceptable",
-                    questioned_items=None,
-                    justification=None
-                )
+            results["responses"]["questionedTravel"] = self._resolve_questioned(
+                results["sectionId"], "questionedTravel", acceptability_result,
+                evaluate_questioned, speculative
+            )
             
             self._validate_travel_section(results)
             self.logger.info("Successfully evaluated travel section")
@@ -780,17 +1225,17 @@ class TechnicalEvaluator:
         
         try:
             # Process references
-            references_config = next(q for q in section_config["questions"] if q["id"] == "references")
+            references_config = self._question(section_config, "references")
             references_result = self._evaluate_references(references_config, proposal_text)
             results["responses"]["references"] = references_result
             
             # Process standard attachments
-            std_attachments_config = next(q for q in section_config["questions"] if q["id"] == "standardAttachments")
+            std_attachments_config = self._question(section_config, "standardAttachments")
             std_attachments_result = self._evaluate_standard_attachments(std_attachments_config, proposal_text)
             results["responses"]["standardAttachments"] = std_attachments_result
             
             # Process other attachments
-            other_attachments_config = next(q for q in section_config["questions"] if q["id"] == "otherAttachments")
+            other_attachments_config = self._question(section_config, "otherAttachments")
             other_attachments_result = self._evaluate_other_attachments(other_attachments_config, proposal_text)
             results["responses"]["otherAttachments"] = other_attachments_result
             
@@ -825,36 +1270,30 @@ class TechnicalEvaluator:
         try:
             # Evaluate ODC list
             odc_list_result = self._evaluate_odc_list(
-                next(q for q in section_config["questions"] if q["id"] == "odcList"),
+                self._question(section_config, "odcList"),
                 proposal_text
             )
             results["responses"]["odcList"] = odc_list_result
+
+            questioned_config = self._question(section_config, "questionedODCs")
+            evaluate_questioned = lambda: self._evaluate_questioned_odcs(
+                questioned_config, proposal_text, odc_list_result.value
+            )
+            speculative = self._start_speculation(results["sectionId"], evaluate_questioned)
             
             # Evaluate ODC acceptability
             acceptability_result = self._evaluate_odc_acceptability(
-                next(q for q in section_config["questions"] if q["id"] == "odcAcceptability"),
+                self._question(section_config, "odcAcceptability"),
                 proposal_text,
                 odc_list_result.value  # Pass the ODC list for context
             )
             results["responses"]["odcAcceptability"] = acceptability_result
             
             # If ODCs are not acceptable, evaluate questioned ODCs
-            if not acceptability_result.value:
-                questioned_result = self._evaluate_questioned_odcs(
-                    next(q for q in section_config["questions"] if q["id"] == "questionedODCs"),
-                    proposal_text,
-                    odc_list_result.value
-                )
-                results["responses"]["questionedODCs"] = questioned_result
-            else:
-                results["responses"]["questionedODCs"] = EvaluationResult(
-                    value=[],
-                    confidence="High",
-                    source_location=None,
-                    analysis="No questioned ODCs as all ODCs are technically acceptable",
-                    questioned_items=None,
-                    justification=None
-                )
+            results["responses"]["questionedODCs"] = self._resolve_questioned(
+                results["sectionId"], "questionedODCs", acceptability_result,
+                evaluate_questioned, speculative
+            )
             
             self._validate_odc_section(results)
             self.logger.info("Successfully evaluated ODC section")
@@ -1328,126 +1767,11 @@ class TechnicalEvaluator:
         """
         Builds a specific prompt based on question type and configuration
         """
-        base_prompt = f"""
-        Analyze the following proposal text and provide a JSON response for technical evaluation.
-        Keep the 'value' field concise and suitable for direct form input - use only the specific data requested.
-        Include detailed analysis and context in the 'analysis' field instead.
-        
-        Question: {question_config['query']}
-        Response Type: {question_config['responseType']}
-        
-        Proposal Text:
-        {proposal_text}
-        
-        Evaluation Guidelines:
-        1. The 'value' field should contain ONLY the specific data requested, not full sentences
-        2. Put any explanation, context, or analysis in the 'analysis' field
-        3. Provide specific evidence from the proposal to support your evaluation
-        4. Follow federal acquisition guidelines
-        """
-
-        if question_config["id"] in ["proposedHours", "recommendedHours"]:
-            base_prompt += """
-            For labor hours evaluation:
-            1. Look for explicit mentions of total labor hours
-            2. Consider all labor categories and their individual hours
-            3. Verify against project timeline and deliverables
-            4. Ensure the number returned is the total hours, not per category
-            5. Include source location and justification for the hours determination
-            
-            Response format:
-            {
-                "value": number,
-                "confidence": "High/Medium/Low",
-                "sourceLocation": "specific section reference",
-                "analysis": "detailed explanation of how hours were determined",
-                "justification": "technical basis for the hours determination"
-            }
-            """
-
-        # Handle date type specifically
-        if question_config["responseType"] == "date":
-            base_prompt += """
-            Provide your response in the following JSON format:
-            {
-                "value": "MM-dd-yyyy",
-                "confidence": "High/Medium/Low",
-                "sourceLocation": "Reference to relevant proposal sections",
-                "analysis": "Context about the date"
-            }
-            
-            Example:
-            {
-                "value": "10-15-2024",
-                "confidence": "High",
-                "sourceLocation": "Section 2.1",
-                "analysis": "The response date is clearly stated in the document header"
-            }
-            """
-        
-        if question_config["responseType"] == "acceptability":
-            base_prompt += """
-            Provide your response in the following JSON format:
-            {
-                "status": "Acceptable" or "Not Acceptable",
-                "confidence": "High/Medium/Low",
-                "justification": "Brief technical justification",
-                "questionedItems": [] (if not acceptable),
-                "sourceLocation": "Reference to relevant proposal sections",
-                "analysis": "Detailed technical analysis and context"
-            }
-            """
-        elif question_config["responseType"] == "object":
-            base_prompt += f"""
-            Provide your response in the following JSON format:
-            {{
-                "value": {{
-                    {', '.join(f'"{field["id"]}": "specific value only"' for field in question_config.get('subfields', []))}
-                }},
-                "confidence": "High/Medium/Low",
-                "sourceLocation": "Reference to relevant proposal sections",
-                "analysis": "Detailed context and explanation"
-            }}
-            
-            Example:
-            {{
-                "value": {{
-                    "name": "John Smith",
-                    "code": "ABC123",
-                    "telephone": "555-0123"
-                }},
-                "confidence": "High",
-                "sourceLocation": "Section 2.1",
-                "analysis": "Detailed explanation of the POC's role and qualifications..."
-            }}
-            """
-        elif question_config["responseType"] == "text":
-            base_prompt += """
-            Provide your response in the following JSON format:
-            {
-                "value": "specific data only, no full sentences",
-                "confidence": "High/Medium/Low",
-                "sourceLocation": "Reference to relevant proposal sections",
-                "analysis": "Detailed context and explanation"
-            }
-            
-            Example for a contract number:
-            {
-                "value": "N00014-22-C-1234",
-                "confidence": "High",
-                "sourceLocation": "Page 1, Header",
-                "analysis": "The contract number is clearly stated in the header and follows the standard format for Navy contracts..."
-            }
-            """
-        
-        if question_config.get("aiEvaluation"):
-            base_prompt += f"\nSpecific Evaluation Criteria:\n"
-            for criterion in question_config["aiEvaluation"].get("evaluationPoints", []):
-                base_prompt += f"- {criterion}\n"
-        
-        base_prompt += "\nIMPORTANT: Keep 'value' fields concise and directly usable in a form - save all explanation and context for the 'analysis' field."
-        
-        return base_prompt
+        fragments = self.plan.prompt_fragments.get(question_config["id"]) if self.plan else None
+        if fragments is None:
+            fragments = build_evaluation_prompt_fragments(question_config)
+        head, tail = fragments
+        return f"{head}{proposal_text}{tail}"
     
     def _evaluate_recommendation_section(self, section_config: Dict, proposal_text: str) -> Dict:
         """
@@ -1464,14 +1788,14 @@ class TechnicalEvaluator:
         try:
             # Evaluate areas to negotiate
             areas_result = self._evaluate_negotiation_areas(
-                next(q for q in section_config["questions"] if q["id"] == "areasToNegotiate"),
+                self._question(section_config, "areasToNegotiate"),
                 proposal_text
             )
             results["responses"]["areasToNegotiate"] = areas_result
             
             # Evaluate additional comments
             comments_result = self._evaluate_additional_comments(
-                next(q for q in section_config["questions"] if q["id"] == "additionalComments"),
+                self._question(section_config, "additionalComments"),
                 proposal_text,
                 areas_result.value  # Pass negotiation areas for context
             )
@@ -1479,13 +1803,13 @@ class TechnicalEvaluator:
             
             # Evaluate preparer information
             preparer_result = self._evaluate_preparer_info(
-                next(q for q in section_config["questions"] if q["id"] == "preparer"),
+                self._question(section_config, "preparer"),
                 proposal_text
             )
             results["responses"]["preparer"] = preparer_result
             
             # Handle signature (placeholder until actual signature system integration)
-            signature_config = next(q for q in section_config["questions"] if q["id"] == "signature")
+            signature_config = self._question(section_config, "signature")
             results["responses"]["signature"] = EvaluationResult(
                 value={
                     "signatureData": "[Placeholder for Digital Signature]",
@@ -1865,7 +2189,10 @@ def evaluate_technical_proposal(
     proposal_text: str, 
     model_name: str = model_name,
     project_id: str = None,
-    progress_callback: callable = None
+    progress_callback: callable = None,
+    plan=None,
+    pages: List[str] = None,
+    tables: List[Dict] = None
 ) -> Dict:
     """
     Main function to evaluate a technical proposal using the provided schema
@@ -1876,8 +2203,16 @@ def evaluate_technical_proposal(
         model_name: The AI model to use
         project_id: Optional project ID for progress tracking
         progress_callback: Optional callback function for progress updates
+        plan: Optional compiled EvaluationPlan for the schema
+        pages: Optional proposal text per page, for page references in fast-path answers
+        tables: Optional tables extracted from the proposal, sent to the cost subsections
     """
-    evaluator = TechnicalEvaluator(model_name)
+    evaluator = TechnicalEvaluator(
+        model_name,
+        plan=plan,
+        model_routing=schema.get("metadata", {}).get("modelRouting"),
+        pages=pages
+    )
     results = {
         "metadata": {
             "evaluationDate": datetime.now().isoformat(),
@@ -1890,6 +2225,9 @@ def evaluate_technical_proposal(
     evaluation_questions = schema.get("evaluationQuestions", {})
     completed_questions = 0
     total_sections = len(evaluation_questions)
+    # Cost subsections get only the proposal segments they need
+    route_pages = pages or [proposal_text]
+    results["metadata"]["contextRouting"] = {}
     
     # Process each main section
     for section_name, section_config in evaluation_questions.items():
@@ -1912,8 +2250,12 @@ def evaluate_technical_proposal(
                             logging.info("Processing materials section with config:")
                             logging.info(subsec_config)
                             
+                        subsection_text, routing = route_section_context(
+                            route_pages, subsec_config.get("id"), tables
+                        )
+                        results["metadata"]["contextRouting"][subsec_name] = routing
                         subsection_results[subsec_name] = evaluator.evaluate_section(
-                            subsec_config, proposal_text
+                            subsec_config, subsection_text
                         )
                         # Update progress after each subsection
                         completed_questions += len(subsec_config.get("questions", []))
@@ -1953,6 +2295,10 @@ def evaluate_technical_proposal(
                 "title": section_config.get("title", "")
             }
     
+    results["metadata"]["speculation"] = evaluator.speculation_stats.to_dict()
+    results["metadata"]["cascade"] = evaluator.cascade_stats.to_dict()
+    results["metadata"]["fastPathAnswers"] = list(evaluator.fast_path_answers)
+
     # Verify materials section is present in the results
     if "technicalEvaluation" in results["sections"]:
         tech_eval = results["sections"]["technicalEvaluation"]
@@ -0,0 +1,225 @@
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+from .model_cascade import resolve_route
+from .req_res_processor import (
+    NOT_QUESTIONED_ANALYSIS,
+    QUESTION_DEPENDENTS,
+    build_evaluation_prompt_fragments,
+)
+
+logger = logging.getLogger(__name__)
+
+REQ_RES_SCHEMA_PATH = "evaluations/tech_eval_req_res.json"
+
+# Questions filled in by the system rather than evaluated, by section id
+STATIC_QUESTIONS = {
+    "section4": ("signature", "date"),
+}
+
+
+class SchemaValidationError(ValueError):
+    """Raised when an evaluation schema is malformed"""
+
+
+@dataclass(frozen=True)
+class EvaluationPlan:
+    """
+    Immutable, precomputed view of an evaluation schema.
+
+    Attributes:
+        source_path: Path of the schema file the plan was compiled from
+        mtime_ns: Modification time of the file when it was compiled
+        schema: Deep-frozen copy of the schema
+        questions_by_id: Question id to question config
+        questions_by_section: Section id to {question id: question config}
+        question_paths: Question id to its "section.subsection.questionId" path
+        dependencies: Question id to the ids of questions that depend on it
+        total_questions: Number of questions, used for progress tracking
+        estimated_calls: Section path to (min, max) LLM calls for that section
+        prompt_fragments: Question id to the static (head, tail) prompt text
+        model_routes: Question id to its model route (see model_cascade.MODEL_ROUTES)
+    """
+    source_path: str
+    mtime_ns: int
+    schema: Mapping[str, Any]
+    questions_by_id: Mapping[str, Mapping[str, Any]]
+    questions_by_section: Mapping[str, Mapping[str, Mapping[str, Any]]]
+    question_paths: Mapping[str, str]
+    dependencies: Mapping[str, Tuple[str, ...]]
+    total_questions: int
+    estimated_calls: Mapping[str, Tuple[int, int]]
+    prompt_fragments: Mapping[str, Tuple[str, str]]
+    model_routes: Mapping[str, str]
+
+    def section_config(self, section_name: str, subsection_name: str = None) -> Mapping[str, Any]:
+        """Returns a section or subsection config by its schema keys, or None"""
+        section = self.schema.get("evaluationQuestions", {}).get(section_name)
+        if section is not None and subsection_name:
+            section = section.get("subsections", {}).get(subsection_name)
+        return section
+
+    @property
+    def estimated_total_calls(self) -> Tuple[int, int]:
+        """(min, max) LLM calls for a full evaluation run"""
+        return (
+            sum(low for low, _ in self.estimated_calls.values()),
+            sum(high for _, high in self.estimated_calls.values()),
+        )
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively converts dicts and lists into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _iter_sections(schema: Dict[str, Any]):
+    """Yields (path, section config) for every section holding questions"""
+    for section_name, section in schema.get("evaluationQuestions", {}).items():
+        yield section_name, section
+        for subsection_name, subsection in section.get("subsections", {}).items():
+            yield f"{section_name}.{subsection_name}", subsection
+
+
+def compile_schema(schema: Dict[str, Any], source_path: str = "<memory>", mtime_ns: int = 0) -> EvaluationPlan:
+    """
+    Validates an evaluation schema and precomputes everything evaluation needs.
+
+    Args:
+        schema: The parsed evaluation schema
+        source_path: Where the schema was loaded from, for error messages
+        mtime_ns: Modification time of the source file
+
+    Returns:
+        EvaluationPlan for the schema
+
+    Raises:
+        SchemaValidationError: If the schema is malformed
+    """
+    if not isinstance(schema.get("evaluationQuestions"), dict):
+        raise SchemaValidationError(f"{source_path}: missing 'evaluationQuestions' object")
+
+    frozen = _freeze(schema)
+    questions_by_id = {}
+    questions_by_section = {}
+    question_paths = {}
+    estimated_calls = {}
+    prompt_fragments = {}
+    model_routes = {}
+    total_questions = 0
+    routing = frozen.get("metadata", {}).get("modelRouting")
+
+    for path, section in _iter_sections(frozen):
+        questions = section.get("questions", ())
+        section_id = section.get("id")
+        if questions and not section_id:
+            raise SchemaValidationError(f"{source_path}: section '{path}' has questions but no id")
+        if section_id in questions_by_section:
+            raise SchemaValidationError(f"{source_path}: duplicate section id '{section_id}'")
+
+        section_index = {}
+        for question in questions:
+            question_id = question.get("id")
+            if not question_id or not question.get("responseType"):
+                raise SchemaValidationError(
+                    f"{source_path}: question in '{path}' is missing an id or responseType"
+                )
+            if question_id in questions_by_id:
+                raise SchemaValidationError(f"{source_path}: duplicate question id '{question_id}'")
+            questions_by_id[question_id] = question
+            section_index[question_id] = question
+            question_paths[question_id] = f"{path}.{question_id}"
+            if question.get("query"):
+                prompt_fragments[question_id] = build_evaluation_prompt_fragments(question)
+            try:
+                model_routes[question_id] = resolve_route(question, routing)
+            except ValueError as e:
+                raise SchemaValidationError(f"{source_path}: {e}") from e
+
+        if section_id:
+            questions_by_section[section_id] = MappingProxyType(section_index)
+        total_questions += len(questions)
+
+        if questions:
+            static = set(STATIC_QUESTIONS.get(section_id, ()))
+            evaluated = [q["id"] for q in questions if q["id"] not in static]
+            conditional = [qid for qid in evaluated if qid in NOT_QUESTIONED_ANALYSIS]
+            estimated_calls[path] = (len(evaluated) - len(conditional), len(evaluated))
+
+    dependencies = {}
+    for section_id, edges in QUESTION_DEPENDENTS.items():
+        section_index = questions_by_section.get(section_id)
+        if section_index is None:
+            continue
+        for question_id, dependents in edges.items():
+            missing = [qid for qid in (question_id, *dependents) if qid not in section_index]
+            if missing:
+                raise SchemaValidationError(
+                    f"{source_path}: section '{section_id}' is missing dependent questions {missing}"
+                )
+            dependencies[question_id] = tuple(dependents)
+
+    return EvaluationPlan(
+        source_path=source_path,
+        mtime_ns=mtime_ns,
+        schema=frozen,
+        questions_by_id=MappingProxyType(questions_by_id),
+        questions_by_section=MappingProxyType(questions_by_section),
+        question_paths=MappingProxyType(question_paths),
+        dependencies=MappingProxyType(dependencies),
+        total_questions=total_questions,
+        estimated_calls=MappingProxyType(estimated_calls),
+        prompt_fragments=MappingProxyType(prompt_fragments),
+        model_routes=MappingProxyType(model_routes),
+    )
+
+
+_plans: Dict[str, EvaluationPlan] = {}
+_plans_lock = threading.Lock()
+
+
+def get_evaluation_plan(path: str = REQ_RES_SCHEMA_PATH) -> EvaluationPlan:
+    """
+    Returns the compiled plan for a schema file, recompiling when the file changes.
+
+    A file that fails to parse or validate after a change is logged and the
+    previously compiled plan keeps being served.
+
+    Args:
+        path: Path to the schema JSON file
+
+    Returns:
+        The current EvaluationPlan for the file
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _plans_lock:
+        plan = _plans.get(path)
+        if plan is not None and plan.mtime_ns == mtime_ns:
+            return plan
+
+        try:
+            with open(path, "r") as f:
+                schema = json.load(f)
+            compiled = compile_schema(schema, source_path=path, mtime_ns=mtime_ns)
+        except (json.JSONDecodeError, SchemaValidationError) as e:
+            if plan is None:
+                raise
+            logger.error(f"Keeping previous evaluation plan for {path}: {e}")
+            return plan
+
+        _plans[path] = compiled
+        low, high = compiled.estimated_total_calls
+        logger.info(
+            f"Compiled evaluation plan for {path}: {compiled.total_questions} questions, "
+            f"{low}-{high} LLM calls per run"
+        )
+        return compiled
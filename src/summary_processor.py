@@ -0,0 +1,403 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .prompt_manager import (
+    generate_partial_summary,
+    generate_summary_assessment,
+    stream_summary_assessment,
+)
+from .utils import flatten_evaluation_object, strip_metadata
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the tokens of evaluation data placed in any single summary prompt
+SUMMARY_INPUT_TOKEN_BUDGET = int(os.getenv("SUMMARY_INPUT_TOKEN_BUDGET", "12000"))
+# Longest string kept for any single field before it is truncated
+SUMMARY_FIELD_CHAR_LIMIT = int(os.getenv("SUMMARY_FIELD_CHAR_LIMIT", "1200"))
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))
+
+# Fields that only locate evidence in the proposal and do not inform the summary
+SUMMARY_DROPPED_FIELDS = {
+    "source_location",
+    "sourceLocation",
+    "sourceLocations",
+    "location",
+    "pageRef",
+    "response_type",
+    "additionalContext",
+}
+
+# Evaluation results that get their own summary before the combined one
+SUMMARY_CATEGORIES = (
+    "req_res_evaluation",
+    "work_products_evaluation",
+    "derived_requirements_evaluation",
+)
+
+
+def build_summary_inputs(metadata: Dict[str, Any]) -> Dict[str, List[Dict]]:
+    """
+    Collects the per-category evaluation results used for the summaries.
+
+    Args:
+        metadata: The project metadata
+
+    Returns:
+        Dict mapping each summary category to its cleaned responses
+    """
+    evaluation_results = {
+        "req_res_evaluation": flatten_evaluation_object(
+            metadata.get("req_res_evaluation", {})
+        ),
+        "work_products_evaluation": metadata.get("work_products_evaluation"),
+        "derived_requirements_evaluation": metadata.get(
+            "derived_requirements_evaluation"
+        ),
+    }
+    return {
+        key: strip_metadata(value or [])
+        for key, value in evaluation_results.items()
+    }
+
+
+def _serialized_size(item: Any) -> int:
+    """Characters an item takes in a prompt, which embeds the compact JSON of the item list"""
+    return len(json.dumps(item, separators=(",", ":")))
+
+
+def _budget_chars(budget: int) -> int:
+    """Longest serialized text whose estimate_tokens is within the budget"""
+    return max(budget, 1) * 4 - 1
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """
+    Cuts text so its JSON serialization takes at most max_chars, marking the cut.
+
+    Escaping (newlines, quotes, non-ASCII) makes the serialized text longer
+    than the text, so the cut is found by bisecting on the serialized size.
+    """
+    if _serialized_size(text) <= max_chars:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _serialized_size(text[:middle] + "...") <= max_chars:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + "..."
+
+
+def _compact_value(value: Any) -> Any:
+    """Drop unused and empty fields and truncate long strings of an evaluation item"""
+    if isinstance(value, dict):
+        compacted = {}
+        for key, item in value.items():
+            if key in SUMMARY_DROPPED_FIELDS:
+                continue
+            item = _compact_value(item)
+            if item in (None, "", [], {}):
+                continue
+            compacted[key] = item
+        return compacted
+    if isinstance(value, list):
+        return [item for item in (_compact_value(v) for v in value) if item not in (None, "", [], {})]
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        if len(value) > SUMMARY_FIELD_CHAR_LIMIT:
+            return value[:SUMMARY_FIELD_CHAR_LIMIT - 3] + "..."
+    return value
+
+
+def compact_summary_input(analysis_results: List[Any]) -> List[Any]:
+    """
+    Reduces evaluation results to the fields the summary prompt uses.
+
+    Evaluation items (dicts) are compacted field by field. Strings are
+    previously generated summaries and are kept whole; they are only cut
+    when a single one exceeds the reduce budget.
+
+    Args:
+        analysis_results: Evaluation items or previously generated summaries
+
+    Returns:
+        List of compacted items, empty items removed
+    """
+    compacted = []
+    for item in analysis_results or []:
+        item = item.strip() if isinstance(item, str) else _compact_value(item)
+        if item not in (None, "", [], {}):
+            compacted.append(item)
+    return compacted
+
+
+def _fit_item(item: Any, max_chars: int) -> Any:
+    """Guarantee a single item serializes within max_chars, converting it to text and truncating if needed"""
+    if _serialized_size(item) <= max_chars:
+        return item
+    text = item if isinstance(item, str) else json.dumps(item, separators=(",", ":"))
+    return _truncate(text, max_chars)
+
+
+def chunk_by_token_budget(items: List[Any], budget: int) -> List[List[Any]]:
+    """
+    Groups items in order so that each group stays within the token budget.
+
+    Groups are measured as the prompts send them: the compact JSON of the
+    list, escapes, brackets and commas included.
+
+    Args:
+        items: Compacted evaluation items or summaries
+        budget: Maximum estimated tokens per group
+
+    Returns:
+        List of item groups; every group is non-empty and its serialized
+        list is within budget
+    """
+    max_chars = _budget_chars(budget)
+    chunks = []
+    # A list of n items serializes to their sizes plus the brackets and n - 1 commas
+    current, current_chars = [], 1
+    for item in items:
+        item = _fit_item(item, max_chars - 2)
+        size = _serialized_size(item) + 1
+        if current and current_chars + size > max_chars:
+            chunks.append(current)
+            current, current_chars = [], 1
+        current.append(item)
+        current_chars += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def reduce_summary_input(
+    analysis_results: List[Any],
+    budget: int = SUMMARY_INPUT_TOKEN_BUDGET
+) -> List[Any]:
+    """
+    Map-reduces evaluation results until they fit a single summary prompt.
+
+    Inputs that already fit are only compacted. Larger inputs are chunked by
+    the token budget, each chunk is condensed in parallel, and the condensed
+    notes are grouped and condensed again until they fit.
+
+    Args:
+        analysis_results: Evaluation items or previously generated summaries
+        budget: Maximum estimated tokens of data in the final prompt
+
+    Returns:
+        A list whose serialized size is within the budget
+    """
+    items = compact_summary_input(analysis_results)
+    # Two truncated notes must fit in one chunk for the reduce rounds to converge
+    budget = max(budget, 4)
+    # Notes are capped so any two fit together in a serialized list and
+    # every reduce round at least halves the number of items
+    note_chars = (_budget_chars(budget) - 3) // 2
+    level = 0
+    while True:
+        chunks = chunk_by_token_budget(items, budget)
+        if len(chunks) <= 1:
+            return chunks[0] if chunks else []
+
+        level += 1
+        logger.info(f"Summary input exceeds {budget} tokens, condensing {len(chunks)} chunks (level {level})")
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_MAX_WORKERS, len(chunks))) as executor:
+            notes = list(executor.map(generate_partial_summary, chunks))
+        items = [_truncate(note, note_chars) for note in notes]
+
+
+def fingerprint_summary_input(analysis_results: List[Any]) -> str:
+    """
+    Hashes the compacted summary input so unchanged categories can be detected.
+
+    Args:
+        analysis_results: Evaluation items for one summary category
+
+    Returns:
+        Hex digest that changes only when the summarized content changes
+    """
+    compacted = compact_summary_input(analysis_results)
+    payload = json.dumps(compacted, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def plan_summary_regeneration(
+    summary_inputs: Dict[str, List[Dict]],
+    metadata: Dict[str, Any],
+    force: bool = False
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Works out which stored summaries can be reused for the current inputs.
+
+    Args:
+        summary_inputs: Output of build_summary_inputs
+        metadata: The project metadata holding previous summaries and fingerprints
+        force: Regenerate everything regardless of fingerprints
+
+    Returns:
+        Tuple of (fingerprints for the current inputs, reusable summaries keyed
+        like the summaries dict). The combined summary is only reusable when
+        every category summary is.
+    """
+    fingerprints = {
+        key: fingerprint_summary_input(value)
+        for key, value in summary_inputs.items()
+    }
+    previous_summaries = metadata.get("summaries") or {}
+    previous_fingerprints = metadata.get("summary_fingerprints") or {}
+    if force:
+        return fingerprints, {}
+
+    reused = {}
+    for key, fingerprint in fingerprints.items():
+        summary_key = f"summary_{key}"
+        if previous_fingerprints.get(key) == fingerprint and previous_summaries.get(summary_key):
+            reused[summary_key] = previous_summaries[summary_key]
+
+    if len(reused) == len(fingerprints) and previous_summaries.get("combined_summary"):
+        reused["combined_summary"] = previous_summaries["combined_summary"]
+    return fingerprints, reused
+
+
+def generate_summaries(
+    summary_inputs: Dict[str, List[Dict]],
+    reused: Optional[Dict[str, str]] = None,
+    progress_callback: Optional[Callable[[int, str], None]] = None
+) -> Dict[str, str]:
+    """
+    Generates the per-category summaries concurrently, then the combined one.
+
+    Args:
+        summary_inputs: Output of build_summary_inputs
+        reused: Summaries that are still current and should not be regenerated
+        progress_callback: Optional callback receiving (completed_steps, message)
+
+    Returns:
+        Dict with a summary_<category> entry per category and combined_summary
+    """
+    summaries = dict(reused or {})
+    stale = {
+        key: value for key, value in summary_inputs.items()
+        if f"summary_{key}" not in summaries
+    }
+    completed = len(summary_inputs) - len(stale)
+    if stale:
+        with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+            futures = {
+                executor.submit(_summarize, value): key
+                for key, value in stale.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                summaries[f"summary_{key}"] = future.result()
+                completed += 1
+                logger.info(f"Generated summary for {key} successfully.")
+                if progress_callback:
+                    progress_callback(
+                        completed,
+                        f"Generated summary for {key.replace('_', ' ').title()}"
+                    )
+
+    if "combined_summary" not in summaries:
+        if progress_callback:
+            progress_callback(len(summary_inputs), "Generating combined summary")
+
+        # Keep the combined prompt in category order regardless of completion order
+        ordered = [summaries[f"summary_{key}"] for key in summary_inputs]
+        summaries["combined_summary"] = _summarize(ordered)
+    return summaries
+
+
+def _summarize(analysis_results: List[Any]) -> str:
+    return generate_summary_assessment(reduce_summary_input(analysis_results))
+
+
+def stream_summaries(
+    summary_inputs: Dict[str, List[Dict]],
+    reused: Optional[Dict[str, str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the per-category summaries concurrently, then the combined summary.
+
+    Token deltas from the category summaries are interleaved as they arrive;
+    the combined summary starts once all of them have finished. Reused
+    summaries are emitted immediately as summary events.
+
+    Args:
+        summary_inputs: Output of build_summary_inputs
+        reused: Summaries that are still current and should not be regenerated
+
+    Yields:
+        Event dicts with an "event" key of "token", "summary", or "done".
+        Token events carry "key" and "content"; summary events carry the
+        finished "key", "content" and "reused"; the final done event carries
+        "summaries".
+    """
+    summaries = dict(reused or {})
+    for key, content in summaries.items():
+        yield {"event": "summary", "key": key, "content": content, "reused": True}
+
+    stale = {
+        key: value for key, value in summary_inputs.items()
+        if f"summary_{key}" not in summaries
+    }
+    events = queue.Queue()
+    finished = object()
+
+    def produce(key, value):
+        try:
+            for delta in stream_summary_assessment(reduce_summary_input(value)):
+                events.put((key, delta))
+        except Exception as e:
+            events.put((key, e))
+        finally:
+            events.put((key, finished))
+
+    threads = [
+        threading.Thread(target=produce, args=(key, value), daemon=True)
+        for key, value in stale.items()
+    ]
+    for thread in threads:
+        thread.start()
+
+    parts = {key: [] for key in stale}
+    pending = len(threads)
+    error = None
+    while pending:
+        key, item = events.get()
+        if item is finished:
+            pending -= 1
+            if error is None:
+                summaries[f"summary_{key}"] = "".join(parts[key]).strip()
+                yield {"event": "summary", "key": f"summary_{key}",
+                       "content": summaries[f"summary_{key}"], "reused": False}
+        elif isinstance(item, Exception):
+            error = error or item
+            logger.error(f"Error streaming summary for {key}: {str(item)}")
+        else:
+            parts[key].append(item)
+            yield {"event": "token", "key": f"summary_{key}", "content": item}
+
+    if error is not None:
+        raise error
+
+    if "combined_summary" not in summaries:
+        combined_parts = []
+        ordered = [summaries[f"summary_{key}"] for key in summary_inputs]
+        for delta in stream_summary_assessment(reduce_summary_input(ordered)):
+            combined_parts.append(delta)
+            yield {"event": "token", "key": "combined_summary", "content": delta}
+
+        summaries["combined_summary"] = "".join(combined_parts).strip()
+        yield {"event": "summary", "key": "combined_summary",
+               "content": summaries["combined_summary"], "reused": False}
+    yield {"event": "done", "summaries": summaries}
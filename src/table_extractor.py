@@ -0,0 +1,173 @@
+import logging
+import re
+from typing import Dict, List, Optional, Sequence
+
+from .blob_store import read_derived, write_derived
+from .document_model import load_document
+from .utils import SECTION_HEADING_PATTERN, read_pdf_pages
+
+try:
+    import pdfplumber
+except ImportError:  # Optional; tables are detected from the extracted text instead
+    pdfplumber = None
+
+logger = logging.getLogger(__name__)
+
+# Consecutive rows needed before a block of lines is treated as a table
+MIN_TABLE_ROWS = 2
+# Longest cell kept in the compact table text sent to prompts
+TABLE_CELL_CHAR_LIMIT = 80
+
+_COLUMN_SPLIT = re.compile(r"\s{2,}|\t")
+_KEY_VALUE_LINE = re.compile(r"^\s*[-•*]?\s*([^:]{2,80}?)\s*:\s*(.*\d.*?)\s*$")
+
+
+def _clean_cell(cell) -> str:
+    return " ".join(str(cell or "").split())
+
+
+def _table(page: int, title: Optional[str], header: Optional[List[str]], rows: List[List[str]], source: str) -> Dict:
+    return {"page": page, "title": title, "header": header, "rows": rows, "source": source}
+
+
+def _column_rows(lines: Sequence[str]) -> List[Optional[List[str]]]:
+    """Cells of each line split on runs of whitespace, or None for single-cell lines"""
+    split = []
+    for line in lines:
+        cells = [cell for cell in (_clean_cell(c) for c in _COLUMN_SPLIT.split(line.strip())) if cell]
+        split.append(cells if len(cells) >= 3 else None)
+    return split
+
+
+def detect_text_tables(page_text: str, page: int) -> List[Dict]:
+    """
+    Finds tables in extracted page text.
+
+    Two layouts are recognised: whitespace-aligned columns (three or more cells
+    with the same count on consecutive lines) and runs of "label: value" lines
+    whose values contain numbers, as used for cost breakdowns.
+
+    Args:
+        page_text: Text of one page
+        page: Zero-based page index
+
+    Returns:
+        Tables as {"page", "title", "header", "rows", "source"} dicts
+    """
+    lines = [line for line in (page_text or "").splitlines() if line.strip()]
+    columns = _column_rows(lines)
+    tables = []
+    index = 0
+    while index < len(lines):
+        cells = columns[index]
+        if cells is not None:
+            end = index
+            while end + 1 < len(lines) and columns[end + 1] is not None and len(columns[end + 1]) == len(cells):
+                end += 1
+            if end - index + 1 >= MIN_TABLE_ROWS:
+                block = columns[index:end + 1]
+                header = block[0] if not any(char.isdigit() for char in "".join(block[0])) else None
+                rows = block[1:] if header else block
+                title = lines[index - 1].strip() if index > 0 else None
+                tables.append(_table(page, title, header, rows, "text"))
+                index = end + 1
+                continue
+
+        match = _KEY_VALUE_LINE.match(lines[index])
+        if match:
+            end = index
+            while end + 1 < len(lines) and _KEY_VALUE_LINE.match(lines[end + 1]):
+                end += 1
+            if end - index + 1 >= MIN_TABLE_ROWS:
+                rows = [list(_KEY_VALUE_LINE.match(line).groups()) for line in lines[index:end + 1]]
+                title = None
+                for previous in reversed(lines[:index]):
+                    if SECTION_HEADING_PATTERN.match(previous) or not _KEY_VALUE_LINE.match(previous):
+                        title = previous.strip()
+                        break
+                tables.append(_table(page, title, ["item", "value"], [[_clean_cell(c) for c in row] for row in rows], "text"))
+                index = end + 1
+                continue
+        index += 1
+    return tables
+
+
+def extract_tables(pdf_path: str, pages: Optional[Sequence[str]] = None) -> List[Dict]:
+    """
+    Extracts the tables of a document as structured rows per page.
+
+    For PDFs, uses pdfplumber's ruling-line detection when it is installed and
+    finds tables on a page; otherwise, and for Word documents (whose table rows
+    are extracted as tab-separated lines), falls back to detect_text_tables
+    over the extracted text.
+
+    Args:
+        pdf_path: Path to the document
+        pages: Already extracted page text, to avoid reading the PDF again
+
+    Returns:
+        Tables in page order
+    """
+    if pages is None:
+        pages = read_pdf_pages(pdf_path)
+
+    plumbed = {}
+    if pdfplumber is not None and pdf_path.lower().endswith(".pdf"):
+        try:
+            with pdfplumber.open(pdf_path) as pdf:
+                for page_index, page in enumerate(pdf.pages):
+                    found = []
+                    for raw_table in page.extract_tables():
+                        rows = [[_clean_cell(cell) for cell in row] for row in raw_table if any(row)]
+                        if len(rows) >= MIN_TABLE_ROWS:
+                            found.append(_table(page_index, None, rows[0], rows[1:], "pdfplumber"))
+                    if found:
+                        plumbed[page_index] = found
+        except Exception as e:
+            logger.warning(f"pdfplumber table extraction failed for '{pdf_path}', using text detection: {e}")
+            plumbed = {}
+
+    tables = []
+    for page_index, page_text in enumerate(pages):
+        tables.extend(plumbed.get(page_index) or detect_text_tables(page_text, page_index))
+    logger.info(f"Extracted {len(tables)} tables from '{pdf_path}'")
+    return tables
+
+
+# Derived-artifact name tables are stored under, per document blob
+TABLES_ARTIFACT = "tables.json"
+
+
+def save_tables(document_path: str, tables: List[Dict]) -> str:
+    return write_derived(load_document(document_path).content_hash, TABLES_ARTIFACT, tables)
+
+
+def load_tables(document_path: str) -> List[Dict]:
+    """
+    Loads the stored tables of a document, extracting and storing them if missing.
+
+    Tables are stored by the document's content hash, so every project using
+    the same file shares them.
+    """
+    document = load_document(document_path)
+    tables = read_derived(document.content_hash, TABLES_ARTIFACT)
+    if tables is None:
+        tables = extract_tables(document_path, document.pages())
+        write_derived(document.content_hash, TABLES_ARTIFACT, tables)
+    return tables
+
+
+def format_tables(tables: Sequence[Dict]) -> str:
+    """
+    Renders tables as compact pipe-separated rows with page references.
+    """
+    blocks = []
+    for table in tables:
+        label = f"[Table, page {table['page'] + 1}]"
+        if table.get("title"):
+            label += f" {table['title']}"
+        lines = [label]
+        for row in ([table["header"]] if table.get("header") else []) + table["rows"]:
+            lines.append(" | ".join(cell[:TABLE_CELL_CHAR_LIMIT] for cell in row))
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
@@ -11,6 +11,7 @@ logger = logging.getLogger(__name__)
 logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+from .model_cascade import CascadeStats
 from .prompt_manager import evaluate_req_res_question, validate_evaluation_result
 
 
@@ -19,6 +20,8 @@ class TechnicalEvaluationProcessor:
         self.form_structure = form_structure
         self.sole_source_response = sole_source_response
         self.evaluations = {}
+        self.model_routing = form_structure.get('metadata', {}).get('modelRouting')
+        self.cascade_stats = CascadeStats()
         
     def process_form(self) -> Dict[str, Any]:
         """Process the entire form structure and collect evaluations"""
@@ -161,7 +164,9 @@ class TechnicalEvaluationProcessor:
             
             evaluation = evaluate_req_res_question(
                 evaluation_config, 
-                self.sole_source_response
+                self.sole_source_response,
+                model_routing=self.model_routing,
+                stats=self.cascade_stats
             )
 
             if not validate_evaluation_result(evaluation, evaluation_config):
@@ -242,7 +247,12 @@ class TechnicalEvaluationProcessor:
             if is_array_field:
                 field_config['arrayField'] = True
                 
-            evaluation = evaluate_req_res_question(field_config, self.sole_source_response)
+            evaluation = evaluate_req_res_question(
+                field_config,
+                self.sole_source_response,
+                model_routing=self.model_routing,
+                stats=self.cascade_stats
+            )
             # logger.info(f"{field_config} response: {evaluation}")
 
             # Validate the result
@@ -289,7 +299,8 @@ def process_technical_evaluation(form_structure: Dict[str, Any], sole_source_res
             "evaluations": evaluations,
             "metadata": {
                 "processedAt": datetime.now().isoformat(),
-                "formVersion": form_structure.get('metadata', {}).get('version', '1.0')
+                "formVersion": form_structure.get('metadata', {}).get('version', '1.0'),
+                "cascade": processor.cascade_stats.to_dict()
             }
         }
     except Exception as e:
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import uuid
+import zipfile
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from flask import Request
+
+logger = logging.getLogger(__name__)
+
+# Largest accepted document, whole or assembled from chunks
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "500"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+# Bytes copied per read while streaming an upload to disk
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+# Chunk size suggested to clients of resumable upload sessions
+UPLOAD_CHUNK_MB = int(os.getenv("UPLOAD_CHUNK_MB", "8"))
+# Where uploads are written while they arrive; on the same disk as the blob store
+# so finished files are moved, not copied
+UPLOAD_TEMP_DIR = os.getenv(
+    "UPLOAD_TEMP_DIR", os.path.join(os.getenv("BASE_UPLOAD_FOLDER", "uploads"), ".incoming")
+)
+
+_OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(Exception):
+    """An upload that cannot be accepted; status is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff_type(head: bytes) -> Optional[str]:
+    """
+    Identifies a document type from its first bytes.
+
+    Returns:
+        "pdf", "docx" (any zip; checked further by verify_type) or "doc", or None
+    """
+    # PDF allows a little junk before the header
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "docx"
+    if head.startswith(_OLE2_MAGIC):
+        return "doc"
+    return None
+
+
+def verify_type(path: str, head: bytes, extension: str) -> None:
+    """
+    Checks that the content of an upload matches its file extension.
+
+    Raises:
+        UploadError: With status 415 when it does not
+    """
+    sniffed = sniff_type(head)
+    if sniffed == "docx":
+        try:
+            with zipfile.ZipFile(path) as archive:
+                if "word/document.xml" not in archive.namelist():
+                    sniffed = None
+        except zipfile.BadZipFile:
+            sniffed = None
+    if sniffed != extension:
+        raise UploadError(
+            f"File content is {sniffed or 'not a supported document'}, not .{extension}", 415
+        )
+
+
+def receive_stream(stream: BinaryIO, path: str, max_bytes: int = MAX_UPLOAD_BYTES, digest=None,
+                   mode: str = "wb", received: int = 0) -> int:
+    """
+    Copies a request body to disk in fixed-size reads, hashing it on the way.
+
+    Args:
+        stream: The body to read
+        path: File to write
+        max_bytes: Total size allowed, counting bytes already received
+        digest: hashlib object updated with every byte written
+        mode: "ab" to continue a partial file
+        received: Bytes already in the file
+
+    Returns:
+        Total bytes in the file
+
+    Raises:
+        UploadError: With status 413 as soon as the limit is passed; the
+        partial file is left for the caller to discard
+    """
+    with open(path, mode) as f:
+        while True:
+            block = stream.read(UPLOAD_BUFFER_SIZE)
+            if not block:
+                break
+            received += len(block)
+            if received > max_bytes:
+                raise UploadError(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit", 413)
+            if digest is not None:
+                digest.update(block)
+            f.write(block)
+    return received
+
+
+class HashingUploadFile:
+    """
+    Disk file that multipart parsing writes an uploaded file into.
+
+    Hashes the bytes, keeps the first KB for type sniffing and stops the
+    upload once it passes the size limit, all while the body is parsed, so
+    the file is never read back before it is stored.
+    """
+
+    def __init__(self, max_bytes: int = MAX_UPLOAD_BYTES):
+        os.makedirs(UPLOAD_TEMP_DIR, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=UPLOAD_TEMP_DIR, suffix=".upload", delete=False)
+        self.path = self._file.name
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadError(f"Upload exceeds the {self.max_bytes // (1024 * 1024)} MB limit", 413)
+        if len(self.head) < 1024:
+            self.head += bytes(data[:1024 - len(self.head)])
+        self.digest.update(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def discard(self) -> None:
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class StreamingUploadRequest(Request):
+    """Request whose uploaded files are streamed into HashingUploadFile objects"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload = HashingUploadFile()
+        self.__dict__.setdefault("_uploads", []).append(upload)
+        return upload
+
+    def _load_form_data(self) -> None:
+        try:
+            super()._load_form_data()
+        except Exception:
+            # Parsing stopped part way; nothing refers to the files written so far
+            self.discard_uploads()
+            raise
+
+    def discard_uploads(self) -> None:
+        """Removes every received file that was not moved into the blob store"""
+        for upload in self.__dict__.pop("_uploads", []):
+            upload.discard()
+
+
+def _session_paths(session_id: str) -> Tuple[str, str]:
+    if not _SESSION_ID.match(session_id or ""):
+        raise UploadError("Unknown upload session", 404)
+    base = os.path.join(UPLOAD_TEMP_DIR, session_id)
+    return f"{base}.json", f"{base}.part"
+
+
+class UploadSessions:
+    """
+    Resumable uploads sent as sequential chunks.
+
+    A session records the target project, document type, file name and total
+    size. Chunks must arrive in order at the current offset, so the content
+    hash is computed as they are written; after a restart the hash is rebuilt
+    from the partial file. Clients resume by asking for the received offset.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._digests: Dict[str, "hashlib._Hash"] = {}
+        self._session_locks: Dict[str, threading.Lock] = {}
+
+    def create(self, project_id: str, type: str, filename: str, size: int) -> Dict:
+        if size <= 0:
+            raise UploadError("Upload size must be positive")
+        if size > MAX_UPLOAD_BYTES:
+            raise UploadError(f"Upload exceeds the {MAX_UPLOAD_MB} MB limit", 413)
+        os.makedirs(UPLOAD_TEMP_DIR, exist_ok=True)
+        session_id = uuid.uuid4().hex
+        meta_path, part_path = _session_paths(session_id)
+        session = {"projectId": project_id, "type": type, "filename": filename, "size": size}
+        with open(meta_path, "w") as f:
+            json.dump(session, f)
+        open(part_path, "wb").close()
+        return self.status(session_id)
+
+    def _load(self, session_id: str) -> Dict:
+        meta_path, _ = _session_paths(session_id)
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError("Unknown upload session", 404)
+
+    def status(self, session_id: str) -> Dict:
+        session = self._load(session_id)
+        _, part_path = _session_paths(session_id)
+        return {
+            "sessionId": session_id,
+            **session,
+            "received": os.path.getsize(part_path),
+            "chunkSize": UPLOAD_CHUNK_MB * 1024 * 1024,
+        }
+
+    def _digest(self, session_id: str, part_path: str):
+        digest = self._digests.get(session_id)
+        if digest is None:
+            digest = hashlib.sha256()
+            with open(part_path, "rb") as f:
+                for block in iter(lambda: f.read(UPLOAD_BUFFER_SIZE), b""):
+                    digest.update(block)
+            self._digests[session_id] = digest
+        return digest
+
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        with self._lock:
+            return self._session_locks.setdefault(session_id, threading.Lock())
+
+    def append(self, session_id: str, offset: int, stream: BinaryIO) -> Dict:
+        """
+        Appends a chunk written at offset.
+
+        Raises:
+            UploadError: 409 with the expected offset when the chunk is out of order
+        """
+        session = self._load(session_id)
+        _, part_path = _session_paths(session_id)
+        with self._session_lock(session_id):
+            received = os.path.getsize(part_path)
+            if offset != received:
+                raise UploadError(f"Expected a chunk at offset {received}", 409)
+            digest = self._digest(session_id, part_path)
+            try:
+                receive_stream(stream, part_path, session["size"], digest, mode="ab", received=received)
+            except Exception:
+                # The digest no longer matches the file; roll the file back to the chunk start
+                self._digests.pop(session_id, None)
+                with open(part_path, "ab") as f:
+                    f.truncate(received)
+                raise
+        return self.status(session_id)
+
+    def complete(self, session_id: str) -> Tuple[Dict, str, str, bytes]:
+        """
+        Closes a fully received session.
+
+        Returns:
+            Tuple of (session, path of the assembled file, its SHA-256, its
+            first KB); the file is the caller's to move, the session record
+            is removed
+        """
+        session = self._load(session_id)
+        meta_path, part_path = _session_paths(session_id)
+        with self._session_lock(session_id):
+            received = os.path.getsize(part_path)
+            if received != session["size"]:
+                raise UploadError(f"Received {received} of {session['size']} bytes", 409)
+            content_hash = self._digest(session_id, part_path).hexdigest()
+            self._digests.pop(session_id, None)
+            os.remove(meta_path)
+        with self._lock:
+            self._session_locks.pop(session_id, None)
+        with open(part_path, "rb") as f:
+            head = f.read(1024)
+        return session, part_path, content_hash, head
+
+    def cancel(self, session_id: str) -> None:
+        meta_path, part_path = _session_paths(session_id)
+        with self._lock:
+            self._digests.pop(session_id, None)
+            self._session_locks.pop(session_id, None)
+        for path in (meta_path, part_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# Global upload session registry
+upload_sessions = UploadSessions()
@@ -1,48 +1,465 @@
 import os
+import re
 import json
+import hashlib
 import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from PyPDF2 import PdfReader
 
 logger = logging.getLogger(__name__)
 
 
-def read_pdf(pdf_path):
+# Worker processes for page-sharded PDF extraction; 0 or 1 extracts in the calling thread
+PDF_EXTRACT_PROCESSES = int(os.getenv("PDF_EXTRACT_PROCESSES", str(min(os.cpu_count() or 1, 8))))
+# Documents shorter than this are extracted serially, where process start-up would dominate
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+
+# How worker processes are started. Forking the threaded server can copy a lock
+# held by another thread (e.g. a logging handler's) into the child and hang it
+PROCESS_START_METHOD = os.getenv("PROCESS_START_METHOD", "forkserver")
+
+def process_pool_context():
+    """Multiprocessing context for worker pools; spawn where forkserver is unavailable"""
+    if PROCESS_START_METHOD in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context(PROCESS_START_METHOD)
+    return multiprocessing.get_context("spawn")
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_PROCESSES, mp_context=process_pool_context())
+        return _pdf_pool
+
+def _reset_pdf_pool():
+    """Drops a broken pool so the next read starts a fresh one"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False)
+        _pdf_pool = None
+
+def _extract_page_range(pdf_path, start, end):
     """
-    Reads the text content of a PDF file.
+    Extracts pages [start, end) of a PDF, returning (text, seconds) per page.
+
+    Runs in a worker process, so it opens its own reader.
+    """
+    reader = PdfReader(pdf_path)
+    results = []
+    for index in range(start, end):
+        started = time.perf_counter()
+        page_text = reader.pages[index].extract_text() or ''
+        results.append((page_text, time.perf_counter() - started))
+    return results
+
+def _page_shards(page_count, workers):
+    """Contiguous page ranges, a few per worker so slow pages even out"""
+    shard_size = max(1, -(-page_count // (workers * 4)))
+    return [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+
+def read_pdf_pages(pdf_path, timings=None):
+    """
+    Reads the text content of a PDF file, one string per page.
+
+    Long documents are extracted in page shards across a process pool and
+    reassembled in page order.
+
+    Args:
+        pdf_path: Path to the PDF
+        timings: Optional list that receives {"page", "seconds"} per page
     """
     if not os.path.isfile(pdf_path):
         logger.error(f"PDF file '{pdf_path}' not found.")
         raise FileNotFoundError(f"PDF file '{pdf_path}' not found.")
 
     try:
-        reader = PdfReader(pdf_path)
-        text = ''
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
-            else:
-                logger.warning(f"No text found on a page in '{pdf_path}'. It may be an image-based PDF.")
-        if not text:
+        started = time.perf_counter()
+        page_count = len(PdfReader(pdf_path).pages)
+        results = None
+        if PDF_EXTRACT_PROCESSES > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+            try:
+                pool = _get_pdf_pool()
+                futures = [
+                    pool.submit(_extract_page_range, pdf_path, start, end)
+                    for start, end in _page_shards(page_count, PDF_EXTRACT_PROCESSES)
+                ]
+                results = [page for future in futures for page in future.result()]
+            except BrokenProcessPool as e:
+                logger.warning(f"PDF process pool failed, extracting '{pdf_path}' serially: {e}")
+                _reset_pdf_pool()
+        if results is None:
+            results = _extract_page_range(pdf_path, 0, page_count)
+
+        pages = []
+        for index, (page_text, seconds) in enumerate(results):
+            if not page_text:
+                logger.warning(f"No text found on page {index + 1} in '{pdf_path}'. It may be an image-based PDF.")
+            pages.append(page_text)
+            if timings is not None:
+                timings.append({"page": index + 1, "seconds": round(seconds, 4)})
+        if not any(pages):
             logger.warning(f"No extractable text found in the entire PDF '{pdf_path}'.")
-        return text
+
+        if results:
+            slowest = max(range(len(results)), key=lambda index: results[index][1])
+            logger.info(
+                f"Extracted {page_count} pages from '{pdf_path}' in {time.perf_counter() - started:.2f}s "
+                f"(slowest page {slowest + 1}: {results[slowest][1]:.2f}s)"
+            )
+        return pages
     except Exception as e:
         logger.error(f"Failed to read PDF '{pdf_path}': {e}")
         raise e
 
-def chunk_text(text, chunk_size=100):
+def read_pdf(pdf_path, timings=None):
     """
-    Splits text into chunks of approximately the specified number of sentences.
+    Reads the text content of a PDF file.
+    """
+    return ''.join(read_pdf_pages(pdf_path, timings))
+
+def file_sha256(file_path, block_size=1024 * 1024):
+    """
+    Computes the SHA-256 hex digest of a file's contents, reading it in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Target estimated tokens per retrieval chunk, and tokens repeated from the previous chunk
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+# Most estimated tokens and texts sent in one embedding request
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "8000"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+
+# Sentence ends: punctuation followed by whitespace and a capital, so "15.403-4"
+# and decimals stay whole
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9("\'])')
+
+def _chunk_units(text, start, max_tokens):
+    """
+    Yields (offset, text) units of a section: lines, split into sentences and
+    then by characters when a line alone exceeds the budget.
+    """
+    for line in text.splitlines(keepends=True):
+        if estimate_tokens(line) <= max_tokens:
+            yield start, line
+        else:
+            position = 0
+            for match in list(_SENTENCE_END.finditer(line)) + [None]:
+                end = match.end() if match else len(line)
+                sentence = line[position:end]
+                if not sentence:
+                    continue
+                # estimate_tokens adds one token, so a full slice must stay a token short
+                max_chars = max(1, max_tokens * 4 - 4)
+                for i in range(0, len(sentence), max_chars):
+                    yield start + position + i, sentence[i:i + max_chars]
+                position = end
+        start += len(line)
+
+def chunk_pages(pages, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Splits page text into chunks of about chunk_tokens with source offsets.
+
+    Chunks are built from whole lines (long lines split at sentence ends) and
+    close early at a heading or page break once they are half full, so a chunk
+    rarely straddles two sections; a heading always shares a chunk with the
+    line after it. Neighbouring chunks within a section share about
+    overlap_tokens of text.
+
+    Args:
+        pages: Document text, one entry per page
+        chunk_tokens: Target estimated tokens per chunk
+        overlap_tokens: Estimated tokens repeated at the start of the next chunk
+
+    Returns:
+        list: {"text", "start", "end", "firstPage", "lastPage", "tokens"} dicts,
+        where start and end are character offsets into the joined page text
+    """
+    chunks = []
+    units = []  # (offset, text, page, tokens)
+    tokens = 0
+
+    def flush(keep_overlap):
+        nonlocal units, tokens
+        if not units:
+            return
+        text = ''.join(unit[1] for unit in units)
+        if text.strip():
+            chunks.append({
+                "text": text,
+                "start": units[0][0],
+                "end": units[-1][0] + len(units[-1][1]),
+                "firstPage": units[0][2],
+                "lastPage": units[-1][2],
+                "tokens": tokens,
+            })
+        kept, kept_tokens = [], 0
+        if keep_overlap:
+            for unit in reversed(units[1:]):
+                if kept_tokens + unit[3] > overlap_tokens:
+                    break
+                kept.insert(0, unit)
+                kept_tokens += unit[3]
+        units, tokens = kept, kept_tokens
+
+    offset = 0
+    for page_index, page_text in enumerate(pages):
+        page_text = page_text or ''
+        if tokens >= chunk_tokens // 2:
+            flush(False)
+        section_offset = offset
+        for section in split_into_sections(page_text):
+            first_line = section.splitlines(keepends=True)[0] if section else ''
+            heading = bool(SECTION_HEADING_PATTERN.match(first_line))
+            if tokens >= chunk_tokens // 2 and heading:
+                flush(False)
+            # Body units leave room for the heading so the two fit in one chunk
+            heading_tokens = estimate_tokens(first_line) if heading else 0
+            section_units = list(_chunk_units(section, section_offset, max(1, chunk_tokens - heading_tokens)))
+            for index, (unit_offset, unit) in enumerate(section_units):
+                unit_tokens = estimate_tokens(unit)
+                needed = unit_tokens
+                if heading and index == 0 and len(section_units) > 1:
+                    # A heading only goes into a chunk with room for the line after it
+                    needed += estimate_tokens(section_units[1][1])
+                if units and tokens + needed > chunk_tokens:
+                    flush(not (heading and index == 0))
+                units.append((unit_offset, unit, page_index, unit_tokens))
+                tokens += unit_tokens
+            section_offset += len(section)
+        offset += len(page_text)
+    flush(False)
+    return chunks
+
+def chunk_text(text, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Splits text into overlapping chunks of about chunk_tokens estimated tokens.
     """
     if not text:
         logger.warning("Empty text provided to chunking function. Returning an empty list.")
         return []
 
-    sentences = text.split('.')
-    chunks = ['.'.join(sentences[i:i + chunk_size]) for i in range(0, len(sentences), chunk_size)]
+    chunks = [chunk["text"] for chunk in chunk_pages([text], chunk_tokens, overlap_tokens)]
     logger.info(f"Text split into {len(chunks)} chunks.")
     return chunks
 
+def pack_embedding_batches(texts, max_tokens=EMBEDDING_BATCH_TOKENS, max_size=EMBEDDING_BATCH_SIZE):
+    """
+    Groups texts, in order, into as few embedding requests as the limits allow.
+
+    Returns:
+        list: Lists of indexes into texts, one per request
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for index, text in enumerate(texts):
+        text_tokens = estimate_tokens(text)
+        if current and (current_tokens + text_tokens > max_tokens or len(current) >= max_size):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += text_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate for prompt budgeting (roughly four characters per token).
+    """
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+class JsonObjectStreamParser:
+    """
+    Incrementally extracts complete top-level objects from a JSON array as text arrives.
+
+    Objects are returned as soon as their closing brace is seen, so a partial or
+    truncated array still yields every object that was completed.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer = []
+
+    def feed(self, text):
+        """
+        Consumes more text and returns the objects completed by it.
+        """
+        completed = []
+        for char in text:
+            if self._depth > 0:
+                self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = self._depth > 0
+            elif char == '{':
+                if self._depth == 0:
+                    self._buffer = ['{']
+                self._depth += 1
+            elif char == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads(''.join(self._buffer)))
+                    except json.JSONDecodeError:
+                        logger.warning("Skipping malformed object in streamed JSON.")
+                    self._buffer = []
+        return completed
+
+def parse_requirements(requirements_str):
+    """Parse requirements from a string, keeping complete entries of a truncated array."""
+    cleaned_str = re.sub(r"```json|```", "", requirements_str or "").strip()
+    if not cleaned_str:
+        return []
+    try:
+        return json.loads(cleaned_str)
+    except json.JSONDecodeError:
+        salvaged = JsonObjectStreamParser().feed(cleaned_str)
+        if salvaged:
+            logger.warning(f"Requirements JSON was incomplete; kept {len(salvaged)} complete entries.")
+        return salvaged
+
+# Lines that start a new section: numbered headings, lettered headings, SECTION/ARTICLE/PART
+# labels, or short all-caps titles
+SECTION_HEADING_PATTERN = re.compile(
+    r"^\s*(?:(?:\d+(?:\.\d+)*\.?|[A-Z]\.|[IVX]+\.)\s+\S.{0,100}"
+    r"|(?:SECTION|ARTICLE|PART|ATTACHMENT)\s+[\w.-]+.{0,100}"
+    r"|[A-Z][A-Z0-9 ,&/()-]{3,80})\s*$"
+)
+
+def split_into_sections(text):
+    """
+    Splits text into sections at heading-like lines.
+    """
+    sections = []
+    current = []
+    for line in text.splitlines(keepends=True):
+        if current and SECTION_HEADING_PATTERN.match(line):
+            sections.append(''.join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append(''.join(current))
+    return sections
+
+def _split_oversized(text, max_tokens):
+    """Splits a block larger than the budget at line boundaries, then by characters."""
+    pieces = []
+    current, current_tokens = [], 0
+    for line in text.splitlines(keepends=True):
+        line_tokens = estimate_tokens(line)
+        if line_tokens > max_tokens:
+            max_chars = max_tokens * 4
+            pieces.extend(line[i:i + max_chars] for i in range(0, len(line), max_chars))
+            continue
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append(''.join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append(''.join(current))
+    return pieces
+
+def split_text_by_token_budget(text, max_tokens):
+    """
+    Splits text into chunks of at most max_tokens, keeping sections together where possible.
+
+    Args:
+        text: The document text
+        max_tokens: Maximum estimated tokens per chunk
+
+    Returns:
+        list: Chunks in document order
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for section in split_into_sections(text or ''):
+        section_tokens = estimate_tokens(section)
+        pieces = [section] if section_tokens <= max_tokens else _split_oversized(section, max_tokens)
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(''.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+# Word-overlap ratio above which two requirements are treated as the same requirement
+REQUIREMENTS_DUPLICATE_THRESHOLD = float(os.getenv("REQUIREMENTS_DUPLICATE_THRESHOLD", "0.8"))
+
+def _requirement_words(query):
+    return frozenset(re.findall(r"[a-z0-9]+", query.lower()))
+
+def iter_unique_requirements(requirements, threshold=REQUIREMENTS_DUPLICATE_THRESHOLD):
+    """
+    Yields requirements in order, dropping near-duplicates and reassigning ids.
+
+    Works on a lazily produced sequence, so each requirement is yielded as soon
+    as it arrives unless it duplicates an earlier one.
+
+    Args:
+        requirements: Iterable of {id, query} dicts, in document order
+        threshold: Word-set Jaccard similarity at which a requirement is a duplicate
+
+    Yields:
+        dict: Requirements with sequential ids starting at 0
+    """
+    seen = []
+    for requirement in requirements:
+        query = requirement.get("query") if isinstance(requirement, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            continue
+        words = _requirement_words(query)
+        if any(
+            len(words & other) / len(words | other) >= threshold
+            for other in seen if words or other
+        ):
+            continue
+        yield {"id": len(seen), "query": query.strip()}
+        seen.append(words)
+
+def merge_requirements(requirement_lists, threshold=REQUIREMENTS_DUPLICATE_THRESHOLD):
+    """
+    Merges requirement lists in order, dropping near-duplicates and reassigning ids.
+
+    Args:
+        requirement_lists: Lists of {id, query} dicts, in document order
+        threshold: Word-set Jaccard similarity at which a requirement is a duplicate
+
+    Returns:
+        list: Requirements with sequential ids starting at 0
+    """
+    return list(iter_unique_requirements(
+        (requirement for requirements in requirement_lists for requirement in requirements),
+        threshold
+    ))
+
 def save_to_json(data, file_name):
     """
     Saves the given data to a JSON file.
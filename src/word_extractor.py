@@ -0,0 +1,154 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import zipfile
+from typing import List
+from xml.etree.ElementTree import iterparse
+
+logger = logging.getLogger(__name__)
+
+# Seconds allowed for converting a legacy .doc file
+DOC_CONVERT_TIMEOUT = int(os.getenv("DOC_CONVERT_TIMEOUT", "120"))
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _style_is_heading(style: str) -> bool:
+    style = style.lower()
+    return style.startswith("heading") or style in ("title", "subtitle")
+
+
+def read_docx_pages(docx_path: str) -> List[str]:
+    """
+    Reads the text of a .docx file, one string per page.
+
+    word/document.xml is parsed as a stream straight from the zip, so the
+    document is never unpacked or loaded as a whole tree. Paragraphs become
+    lines, headings get a blank line before them so they stand out as
+    section starts, and table rows become tab-separated lines. Pages split
+    where Word last rendered a page break, or at explicit page breaks for
+    documents that were never laid out.
+
+    Args:
+        docx_path: Path to the .docx file
+
+    Returns:
+        Page texts in document order
+    """
+    if not os.path.isfile(docx_path):
+        logger.error(f"Word file '{docx_path}' not found.")
+        raise FileNotFoundError(f"Word file '{docx_path}' not found.")
+
+    started = time.perf_counter()
+    # Each page break is recorded for both kinds, then one kind is used to split
+    rendered_pages, explicit_pages = [[]], [[]]
+    paragraph, row, cells, table_depth = [], None, None, 0
+    style = ""
+
+    def emit(line):
+        rendered_pages[-1].append(line)
+        explicit_pages[-1].append(line)
+
+    try:
+        with zipfile.ZipFile(docx_path) as archive, archive.open("word/document.xml") as xml:
+            for event, element in iterparse(xml, events=("start", "end")):
+                tag = element.tag
+                if event == "start":
+                    if tag == f"{_W}tbl":
+                        table_depth += 1
+                    elif tag == f"{_W}tr" and table_depth == 1:
+                        row = []
+                    elif tag == f"{_W}tc" and table_depth == 1:
+                        cells = []
+                    elif tag == f"{_W}p":
+                        paragraph, style = [], ""
+                    continue
+
+                if tag == f"{_W}t":
+                    paragraph.append(element.text or "")
+                elif tag == f"{_W}tab":
+                    paragraph.append("\t")
+                elif tag in (f"{_W}br", f"{_W}cr"):
+                    if element.get(f"{_W}type") == "page":
+                        explicit_pages.append([])
+                    else:
+                        paragraph.append("\n")
+                elif tag == f"{_W}lastRenderedPageBreak":
+                    rendered_pages.append([])
+                elif tag == f"{_W}pStyle":
+                    style = element.get(f"{_W}val") or ""
+                elif tag == f"{_W}p":
+                    text = "".join(paragraph).strip()
+                    if cells is not None:
+                        if text:
+                            cells.append(text)
+                    elif text:
+                        emit(f"\n{text}\n" if _style_is_heading(style) else f"{text}\n")
+                    paragraph = []
+                elif tag == f"{_W}tc" and table_depth == 1:
+                    row.append(" ".join(cells))
+                    cells = None
+                elif tag == f"{_W}tr" and table_depth == 1:
+                    if any(row):
+                        emit("\t".join(row) + "\n")
+                    row = None
+                elif tag == f"{_W}tbl":
+                    table_depth -= 1
+                    if not table_depth:
+                        emit("\n")
+                # Text is collected as elements close, so finished subtrees can go
+                if tag in (f"{_W}p", f"{_W}tbl"):
+                    element.clear()
+    except (zipfile.BadZipFile, KeyError) as e:
+        logger.error(f"Failed to read Word document '{docx_path}': {e}")
+        raise ValueError(f"'{docx_path}' is not a readable .docx file: {e}")
+
+    pages = rendered_pages if len(rendered_pages) > 1 else explicit_pages
+    pages = ["".join(lines) for lines in pages]
+    logger.info(f"Extracted {len(pages)} pages from '{docx_path}' in {time.perf_counter() - started:.2f}s")
+    return pages
+
+
+def read_doc_pages(doc_path: str) -> List[str]:
+    """
+    Reads a legacy .doc file by converting it to .docx with a local LibreOffice.
+
+    Falls back to antiword's plain text, as a single page, when LibreOffice is
+    not installed.
+
+    Raises:
+        ValueError: If no converter is available or the conversion fails
+    """
+    if not os.path.isfile(doc_path):
+        logger.error(f"Word file '{doc_path}' not found.")
+        raise FileNotFoundError(f"Word file '{doc_path}' not found.")
+
+    soffice = shutil.which("soffice") or shutil.which("libreoffice")
+    if soffice:
+        with tempfile.TemporaryDirectory() as out_dir:
+            try:
+                subprocess.run(
+                    [soffice, "--headless", "--convert-to", "docx", "--outdir", out_dir, doc_path],
+                    check=True, capture_output=True, timeout=DOC_CONVERT_TIMEOUT,
+                )
+            except (subprocess.SubprocessError, OSError) as e:
+                logger.error(f"Failed to convert '{doc_path}' with LibreOffice: {e}")
+                raise ValueError(f"Could not convert '{doc_path}' to .docx: {e}")
+            converted = os.path.join(out_dir, os.path.splitext(os.path.basename(doc_path))[0] + ".docx")
+            return read_docx_pages(converted)
+
+    antiword = shutil.which("antiword")
+    if antiword:
+        try:
+            result = subprocess.run(
+                [antiword, doc_path], check=True, capture_output=True, timeout=DOC_CONVERT_TIMEOUT,
+            )
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.error(f"Failed to read '{doc_path}' with antiword: {e}")
+            raise ValueError(f"Could not read '{doc_path}': {e}")
+        return [result.stdout.decode("utf-8", errors="replace")]
+
+    raise ValueError(f"Reading '{doc_path}' needs LibreOffice or antiword installed")
@@ -0,0 +1,42 @@
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache, text_digest
+
+
+def test_eviction_keeps_vectors_matched_to_texts(tmp_path):
+    # Room for 3 vectors of dimension 2
+    cache = EmbeddingCache(str(tmp_path), max_bytes=3 * 2 * 4)
+    vectors = {text: [float(len(text)), float(len(text)) + 0.5] for text in ("a", "bb", "ccc", "dddd")}
+
+    cache.put_many([text_digest("a"), text_digest("bb")], [vectors["a"], vectors["bb"]])
+    cache.get_many([text_digest("a")])
+    cache.put_many([text_digest("ccc"), text_digest("dddd")], [vectors["ccc"], vectors["dddd"]])
+
+    assert len(cache) == 3
+    results, missing = cache.get_many([text_digest(text) for text in vectors])
+    assert missing == [1]  # "bb" was the least recently used
+    for text, result in zip(vectors, results):
+        if result is not None:
+            np.testing.assert_array_equal(result, np.float32(vectors[text]))
+
+    # The same holds after reopening the files
+    reopened = EmbeddingCache(str(tmp_path), max_bytes=3 * 2 * 4)
+    results, missing = reopened.get_many([text_digest(text) for text in ("a", "ccc", "dddd")])
+    assert missing == []
+    for text, result in zip(("a", "ccc", "dddd"), results):
+        np.testing.assert_array_equal(result, np.float32(vectors[text]))
+
+
+def test_slot_overwritten_by_another_instance_is_a_miss(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_bytes=2 * 2 * 4)
+    cache.put_many([text_digest("a"), text_digest("bb")], [[1.0, 1.0], [2.0, 2.0]])
+
+    # A second instance on the same files evicts "a" and stores "ccc" in its slot
+    other = EmbeddingCache(str(tmp_path), max_bytes=2 * 2 * 4)
+    other.get_many([text_digest("bb")])
+    other.put_many([text_digest("ccc")], [[3.0, 3.0]])
+
+    results, missing = cache.get_many([text_digest("a"), text_digest("bb")])
+    assert missing == [0]
+    assert results[0] is None
+    np.testing.assert_array_equal(results[1], np.float32([2.0, 2.0]))